@@ -10,14 +10,15 @@ import os
 import sys
 import json
 import time
+import hashlib
 import logging
-import argparse
 import asyncio
 from concurrent.futures import ThreadPoolExecutor
-from pathlib import Path
-from typing import List, Dict, Optional, Set
+from functools import cached_property
+from typing import Awaitable, Iterator, List, Dict, Optional, Set, Tuple
 from datetime import datetime
 from dotenv import load_dotenv
+import httpx
 
 # Chargement des variables d'environnement
 load_dotenv()
@@ -27,24 +28,104 @@ from rich.console import Console
 from rich.progress import Progress, SpinnerColumn, TextColumn
 from rich.logging import RichHandler
 from rich.panel import Panel
-from rich.table import Table
 
 from utils.gemini_agent import GeminiAgent
 from utils.todo_manager import TodoManager
 from utils.claude_agent import ClaudeAgent
 from utils.chatgpt_agent import ChatGPTAgent
+from utils.http_clients import DEFAULT_MAX_CONNECTIONS, HTTP_TIMEOUT, http_limits
+from utils.semantic_cache import SemanticCache, DEFAULT_THRESHOLD
+from utils.tokens import compact_code, split_code, DEFAULT_MAX_TOKENS_PER_CALL
 
-# Configuration du logging
+# Initialisation de Rich
+console = Console()
+
+# Configuration du logging: le handler partage la console de la barre de progression
+# pour que les messages s'affichent au-dessus d'elle sans la corrompre
 logging.basicConfig(
     level=logging.INFO,
     format="%(message)s",
     datefmt="[%X]",
-    handlers=[RichHandler(rich_tracebacks=True)]
+    handlers=[RichHandler(console=console, rich_tracebacks=True)]
 )
 logger = logging.getLogger("llm_code_agent")
 
-# Initialisation de Rich
-console = Console()
+# Extensions des fichiers analysés
+ANALYZED_EXTENSIONS = frozenset({'.py', '.js', '.java', '.cpp', '.h', '.hpp'})
+
+# Marqueur des fichiers minifiés (app.min.js), ignorés: leur analyse coûte cher sans rien apprendre
+MINIFIED_MARKER = '.min.'
+
+# Manifeste des empreintes des fichiers analysés, stocké avec les rapports
+MANIFEST_FILE = '.manifest.json'
+
+# Rapports générés par fichier: (suffixe du fichier, clé du résultat)
+REPORT_FILES = (
+    ('claude_analysis', 'claude_analysis'),
+    ('chatgpt_review', 'gpt_review'),
+    ('gemini_suggestions', 'gemini_suggestions'),
+)
+
+# Séparateur des rapports des blocs d'un fichier découpé
+CHUNK_SEPARATOR = "\n\n---\n\n"
+
+# Gabarit des rapports HTML
+HTML_TEMPLATE = """
+            <!DOCTYPE html>
+            <html>
+            <head>
+                <meta charset="utf-8">
+                <title>Rapport d'Analyse</title>
+                <style>
+                    body {{ font-family: Arial, sans-serif; margin: 40px; }}
+                    h1 {{ color: #2c3e50; }}
+                    h2 {{ color: #34495e; margin-top: 30px; }}
+                    h3 {{ color: #7f8c8d; }}
+                    pre {{ background-color: #f8f9fa; padding: 15px; border-radius: 5px; }}
+                    code {{ background-color: #f8f9fa; padding: 2px 5px; border-radius: 3px; }}
+                    table {{ border-collapse: collapse; width: 100%; margin: 20px 0; }}
+                    th, td {{ border: 1px solid #ddd; padding: 8px; text-align: left; }}
+                    th {{ background-color: #f8f9fa; }}
+                </style>
+            </head>
+            <body>
+                {body}
+            </body>
+            </html>
+            """
+
+def _is_error_report(report: str) -> bool:
+    """Indique si un rapport d'agent (ou l'un des blocs d'un rapport découpé) est un rapport d'erreur."""
+    return report.lstrip().startswith('# Erreur') or '\n# Erreur' in report
+
+def _report_path(file_path: str, output_dir: str, suffix: str) -> str:
+    """
+    Chemin d'un rapport par fichier. Le nom du fichier est suivi d'une empreinte de son
+    chemin: deux fichiers de même nom dans des dossiers différents ont chacun leurs rapports.
+    
+    Args:
+        file_path (str): Chemin du fichier analysé
+        output_dir (str): Dossier de sortie
+        suffix (str): Suffixe du rapport (claude_analysis...)
+        
+    Returns:
+        str: Chemin du rapport
+    """
+    path_digest = hashlib.sha256(os.path.abspath(file_path).encode('utf-8')).hexdigest()[:8]
+    return os.path.join(output_dir, f"{os.path.basename(file_path)}_{path_digest}_{suffix}.md")
+
+def _stat_fingerprint(stat_result: os.stat_result) -> List[int]:
+    """
+    Empreinte rapide d'un fichier (date de modification, taille, inode) tirée de os.stat.
+    Tant qu'elle ne change pas, le fichier n'a pas besoin d'être relu ni haché.
+    
+    Args:
+        stat_result (os.stat_result): Résultat de os.stat
+        
+    Returns:
+        List[int]: [mtime_ns, taille, inode]
+    """
+    return [stat_result.st_mtime_ns, stat_result.st_size, stat_result.st_ino]
 
 class LLMCodeAgent:
     """
@@ -60,9 +141,28 @@ class LLMCodeAgent:
             config (Dict, optional): Configuration personnalisée
         """
         self.config = config or {}
+        self.max_concurrency = int(
+            self.config.get('max_concurrency', os.getenv("LLM_MAX_CONCURRENCY", "8"))
+        )
+        self.max_tokens_per_call = int(
+            self.config.get('max_tokens_per_call', os.getenv("LLM_MAX_TOKENS_PER_CALL", DEFAULT_MAX_TOKENS_PER_CALL))
+        )
+        # Nombre de fichiers à partir duquel un projet passe par les API Batch (0: jamais)
+        self.batch_min_files = int(
+            self.config.get('batch_min_files', os.getenv("LLM_BATCH_MIN_FILES", "0"))
+        )
+        self.http_client = self._create_http_client()
         self.setup_agents()
+        self.semantic_cache = self._setup_semantic_cache()
         self.todo_manager = TodoManager()
+        self.output_dir = self.config.get('output_dir', 'analysis_reports')
         self.processed_files: Set[str] = set()
+        # Rapports par fichier déjà écrits pendant l'analyse: (fichier, dossier de sortie)
+        self._written_reports: Set[Tuple[str, str]] = set()
+        self._manifest: Dict[str, Dict] = self._load_manifest()
+        # Analyses en cours ou terminées, par (empreinte du contenu, extension)
+        self._content_analyses: Dict[Tuple[str, str], asyncio.Future] = {}
+        self._provider_slots = self._create_provider_slots()
         self.stats = {
             'start_time': time.time(),
             'files_processed': 0,
@@ -70,17 +170,273 @@ class LLMCodeAgent:
             'errors': 0
         }
     
+    @cached_property
+    def _markdown(self):
+        """
+        Convertisseur partagé par tous les rapports HTML, créé au premier rapport:
+        les extensions (et Pygments) ne sont chargées qu'une fois, et seulement si besoin.
+        """
+        import markdown
+        return markdown.Markdown(extensions=['extra', 'codehilite', 'tables'])
+    
+    def _create_provider_slots(self) -> Dict[str, asyncio.Semaphore]:
+        """
+        Crée un sémaphore par fournisseur: chaque étape du pipeline (Claude, puis ChatGPT
+        et Gemini) est bornée à max_concurrency appels indépendamment des autres.
+        
+        Returns:
+            Dict[str, asyncio.Semaphore]: Sémaphores par fournisseur
+        """
+        return {provider: asyncio.Semaphore(self.max_concurrency) for provider in ('anthropic', 'openai', 'google')}
+    
+    async def _call_provider(self, provider: str, call: Awaitable[str]) -> str:
+        """
+        Exécute un appel d'agent dans la limite de concurrence de son fournisseur.
+        
+        Args:
+            provider (str): Fournisseur appelé (anthropic, openai, google)
+            call (Awaitable[str]): Appel de l'agent
+            
+        Returns:
+            str: Rapport produit par l'agent
+        """
+        async with self._provider_slots[provider]:
+            return await call
+    
+    @property
+    def _max_connections(self) -> int:
+        """Taille des pools de connexions: deux connexions par appel simultané, 64 au moins."""
+        return max(DEFAULT_MAX_CONNECTIONS, self.max_concurrency * 2)
+    
+    def _create_http_client(self) -> httpx.Client:
+        """
+        Crée le client HTTP synchrone partagé par les clients des API Batch des agents.
+        Les analyses passent par les clients asynchrones de chaque agent, créés avec les
+        mêmes délai et limites de connexions (voir utils.http_clients).
+        
+        Returns:
+            httpx.Client: Client HTTP avec pool de connexions
+        """
+        return httpx.Client(http2=True, timeout=HTTP_TIMEOUT, limits=http_limits(self._max_connections))
+    
     def setup_agents(self):
         """Initialise les agents LLM."""
         try:
-            self.claude_agent = ClaudeAgent()
-            self.gpt_agent = ChatGPTAgent()
-            self.gemini_agent = GeminiAgent()
+            self.claude_agent = ClaudeAgent(http_client=self.http_client, max_connections=self._max_connections)
+            self.gpt_agent = ChatGPTAgent(http_client=self.http_client, max_connections=self._max_connections)
+            # Le fallback de Gemini réutilise l'agent Claude: un seul pool de connexions vers Anthropic
+            self.gemini_agent = GeminiAgent(http_client=self.http_client, claude_fallback=self.claude_agent)
             logger.info("Agents LLM initialisés avec succès")
         except Exception as e:
-            logger.error(f"Erreur lors de l'initialisation des agents: {str(e)}")
+            logger.error("Erreur lors de l'initialisation des agents: %s", e)
             raise
     
+    def close(self):
+        """Ferme le client HTTP partagé et libère les connexions ouvertes."""
+        self.http_client.close()
+    
+    def _load_manifest(self) -> Dict[str, Dict]:
+        """
+        Charge le manifeste {fichier: {'sha256': ..., 'stat': [...]}} de la précédente exécution.
+        Les manifestes des versions précédentes ({fichier: empreinte SHA256}) restent lisibles.
+        
+        Returns:
+            Dict[str, Dict]: Empreintes des fichiers déjà analysés
+        """
+        manifest_path = os.path.join(self.output_dir, MANIFEST_FILE)
+        try:
+            with open(manifest_path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+            return {
+                file_path: entry if isinstance(entry, dict) else {'sha256': entry}
+                for file_path, entry in manifest.items()
+            }
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            logger.warning("Manifeste %s illisible, ignoré: %s", manifest_path, e)
+            return {}
+    
+    def _save_manifest(self) -> None:
+        """Enregistre le manifeste des empreintes dans le dossier de sortie."""
+        manifest_path = os.path.join(self.output_dir, MANIFEST_FILE)
+        with open(manifest_path, 'w', encoding='utf-8') as f:
+            json.dump(self._manifest, f, indent=2, sort_keys=True)
+    
+    def _install_executor(self) -> None:
+        """
+        Installe comme exécuteur par défaut de la boucle courante un pool de threads
+        dimensionné sur la concurrence: un thread par agent et par analyse simultanée.
+        Les appels bloquants restants (lecture et écriture des rapports, embeddings,
+        API Batch, via asyncio.to_thread) ne sont ainsi plus limités par
+        la taille du pool par défaut (min(32, nombre de CPU + 4)). Le pool est arrêté
+        par asyncio.run à la fin de la boucle.
+        """
+        asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(
+            max_workers=self.max_concurrency * 3,
+            thread_name_prefix='llm_call'
+        ))
+    
+    def _setup_semantic_cache(self) -> Optional[SemanticCache]:
+        """Initialise le cache sémantique s'il est activé (config ou LLM_SEMANTIC_CACHE=1)."""
+        enabled = self.config.get('semantic_cache', os.getenv('LLM_SEMANTIC_CACHE') == '1')
+        if not enabled:
+            return None
+        threshold = float(self.config.get('semantic_threshold', DEFAULT_THRESHOLD))
+        return SemanticCache(threshold=threshold)
+    
+    def _build_result(self, file_path: str, claude_analysis: str, gpt_review: str, gemini_suggestions: str) -> Dict:
+        """
+        Extrait les TODOs des trois analyses d'un fichier et construit son résultat.
+        
+        Args:
+            file_path (str): Chemin du fichier analysé
+            claude_analysis (str): Analyse de Claude
+            gpt_review (str): Review de ChatGPT
+            gemini_suggestions (str): Suggestions de Gemini
+            
+        Returns:
+            Dict: Résultats de l'analyse
+        """
+        # Extraction des TODOs
+        todos = self.todo_manager.extract_todos(claude_analysis, gpt_review, gemini_suggestions, file_path)
+        
+        # Ajout des TODOs au gestionnaire
+        self.todo_manager.add_todos(todos, "Multi-Agent Analysis")
+        
+        # Mise à jour des statistiques
+        self.stats['files_processed'] += 1
+        self.stats['total_todos'] += len(todos)
+        logger.info("Fichier analysé: %s (%d TODOs)", file_path, len(todos))
+        
+        return {
+            'file': file_path,
+            'claude_analysis': claude_analysis,
+            'gpt_review': gpt_review,
+            'gemini_suggestions': gemini_suggestions,
+            'todos': todos
+        }
+    
+    def _iter_files(self, directory: str) -> Iterator[str]:
+        """
+        Parcourt récursivement un répertoire et produit les fichiers qui restent à analyser.
+        `os.scandir` évite un appel `stat()` par entrée et les fichiers sont produits
+        au fil du parcours, sans construire la liste complète.
+        
+        Args:
+            directory (str): Répertoire à parcourir
+            
+        Yields:
+            str: Chemin d'un fichier à analyser
+        """
+        try:
+            entries = os.scandir(directory)
+        except OSError as e:
+            logger.warning("Répertoire ignoré %s: %s", directory, e)
+            return
+        
+        with entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    yield from self._iter_files(entry.path)
+                elif (os.path.splitext(entry.name)[1] in ANALYZED_EXTENSIONS
+                      and MINIFIED_MARKER not in entry.name
+                      and entry.path not in self.processed_files):
+                    yield entry.path
+    
+    def _find_files(self, project_path: str) -> List[str]:
+        """
+        Recherche les fichiers d'un projet qui restent à analyser.
+        
+        Args:
+            project_path (str): Chemin du projet
+            
+        Returns:
+            List[str]: Chemins des fichiers à analyser
+        """
+        return list(self._iter_files(project_path))
+    
+    async def _analyze_code(self, code_content: str, file_path: str) -> Tuple[str, str, str]:
+        """
+        Analyse un bloc de code avec les trois agents LLM.
+        
+        Args:
+            code_content (str): Code à analyser (fichier entier ou bloc)
+            file_path (str): Chemin du fichier analysé
+            
+        Returns:
+            Tuple[str, str, str]: Analyse Claude, review ChatGPT et suggestions Gemini
+        """
+        # Analyse avec Claude
+        claude_analysis = await self._call_provider(
+            'anthropic', self.claude_agent.analyze_code(code_content, file_path)
+        )
+        
+        # Validation ChatGPT et suggestions Gemini: toutes deux ne dépendent que
+        # de l'analyse de Claude et sont lancées en parallèle, pendant que le créneau
+        # Claude libéré sert déjà au fichier suivant
+        gpt_review, gemini_suggestions = await asyncio.gather(
+            self._call_provider('openai', self.gpt_agent.analyze_code(
+                code_content, self.claude_agent.summarize(claude_analysis), file_path
+            )),
+            self._call_provider('google', self.gemini_agent.suggest_refactoring(
+                code_content, claude_analysis, file_path
+            ))
+        )
+        return claude_analysis, gpt_review, gemini_suggestions
+    
+    async def _analyze_content(self, code_content: str, file_path: str) -> Tuple[str, str, str]:
+        """
+        Analyse le contenu d'un fichier: réutilisation d'une analyse quasi identique
+        (cache sémantique) ou analyse par les trois agents, bloc par bloc si nécessaire.
+        
+        Args:
+            code_content (str): Contenu du fichier
+            file_path (str): Chemin du fichier analysé
+            
+        Returns:
+            Tuple[str, str, str]: Analyse Claude, review ChatGPT et suggestions Gemini
+        """
+        # Espaces de fin de ligne et lignes vides répétées ne sont pas envoyés aux modèles
+        code_content = compact_code(code_content)
+        
+        # Recherche d'une analyse existante pour un fichier quasi identique
+        embedding = None
+        cached = None
+        if self.semantic_cache is not None:
+            embedding = await asyncio.to_thread(self.semantic_cache.embed, code_content, file_path)
+            cached = self.semantic_cache.search(embedding)
+        
+        if cached is not None:
+            logger.debug("Réutilisation de l'analyse de %s pour %s", cached['file'], file_path)
+            claude_analysis = cached['claude_analysis']
+            gpt_review = cached['gpt_review']
+            gemini_suggestions = cached['gemini_suggestions']
+        else:
+            # Les fichiers dépassant le budget de jetons d'un appel sont analysés par blocs
+            chunks = split_code(code_content, file_path, self.max_tokens_per_call)
+            if len(chunks) > 1:
+                logger.debug("%s découpé en %d blocs", file_path, len(chunks))
+            chunk_reports = await asyncio.gather(*(
+                self._analyze_code(chunk, file_path) for chunk in chunks
+            ))
+            claude_analysis, gpt_review, gemini_suggestions = (
+                CHUNK_SEPARATOR.join(reports) for reports in zip(*chunk_reports)
+            )
+            
+            # Une analyse en échec n'est pas proposée aux fichiers quasi identiques
+            if embedding is not None and not any(
+                _is_error_report(report) for report in (claude_analysis, gpt_review, gemini_suggestions)
+            ):
+                self.semantic_cache.add(embedding, {
+                    'file': file_path,
+                    'claude_analysis': claude_analysis,
+                    'gpt_review': gpt_review,
+                    'gemini_suggestions': gemini_suggestions
+                })
+        
+        return claude_analysis, gpt_review, gemini_suggestions
+    
     async def analyze_file(self, file_path: str) -> Dict:
         """
         Analyse un fichier avec les trois agents LLM.
@@ -92,43 +448,49 @@ class LLMCodeAgent:
             Dict: Résultats de l'analyse
         """
         try:
-            # Vérification du fichier
-            if not os.path.exists(file_path):
-                raise FileNotFoundError(f"Fichier non trouvé: {file_path}")
+            # Empreinte rapide prise avant la lecture (FileNotFoundError s'il n'existe pas):
+            # une modification pendant la lecture change la date et sera vue au prochain passage
+            stat_fingerprint = _stat_fingerprint(os.stat(file_path))
+            manifest_entry = self._manifest.get(file_path, {})
+            
+            # Date, taille et inode inchangés: les rapports sont réutilisés sans relire le fichier
+            if manifest_entry.get('stat') == stat_fingerprint:
+                reports = await asyncio.to_thread(self._read_file_reports, file_path, self.output_dir)
+                if reports is not None:
+                    logger.debug("Fichier non modifié, rapports existants réutilisés: %s", file_path)
+                    return self._build_result(file_path, *reports)
             
-            # Lecture du fichier
             with open(file_path, 'r', encoding='utf-8') as f:
                 code_content = f.read()
             
-            # Analyse avec Claude
-            claude_analysis = await self.claude_agent.analyze_code(code_content, file_path)
-            
-            # Analyse avec ChatGPT
-            gpt_review = await self.gpt_agent.analyze_code(code_content, claude_analysis, file_path)
+            # Contenu inchangé depuis la dernière exécution (fichier seulement touché ou recopié)
+            content_hash = hashlib.sha256(code_content.encode('utf-8')).hexdigest()
+            if manifest_entry.get('sha256') == content_hash:
+                reports = await asyncio.to_thread(self._read_file_reports, file_path, self.output_dir)
+                if reports is not None:
+                    logger.debug("Fichier inchangé, rapports existants réutilisés: %s", file_path)
+                    self._manifest[file_path] = {'sha256': content_hash, 'stat': stat_fingerprint}
+                    return self._build_result(file_path, *reports)
             
-            # Suggestions avec Gemini
-            gemini_suggestions = await self.gemini_agent.suggest_refactoring(code_content, claude_analysis, file_path)
+            # Un contenu identique à celui d'un autre fichier du projet (même extension)
+            # n'est analysé qu'une fois: les doublons attendent l'analyse déjà lancée
+            content_key = (content_hash, os.path.splitext(file_path)[1])
+            analysis = self._content_analyses.get(content_key)
+            if analysis is None:
+                analysis = asyncio.ensure_future(self._analyze_content(code_content, file_path))
+                self._content_analyses[content_key] = analysis
+            else:
+                logger.debug("Contenu identique à un fichier déjà analysé, analyse partagée: %s", file_path)
+            claude_analysis, gpt_review, gemini_suggestions = await asyncio.shield(analysis)
             
-            # Extraction des TODOs
-            todos = self.todo_manager.extract_todos(claude_analysis, gpt_review, gemini_suggestions, file_path)
+            # Seules les analyses complètes sont enregistrées dans le manifeste
+            if not any(_is_error_report(report) for report in (claude_analysis, gpt_review, gemini_suggestions)):
+                self._manifest[file_path] = {'sha256': content_hash, 'stat': stat_fingerprint}
             
-            # Ajout des TODOs au gestionnaire
-            self.todo_manager.add_todos(todos, "Multi-Agent Analysis")
-            
-            # Mise à jour des statistiques
-            self.stats['files_processed'] += 1
-            self.stats['total_todos'] += len(todos)
-            
-            return {
-                'file': file_path,
-                'claude_analysis': claude_analysis,
-                'gpt_review': gpt_review,
-                'gemini_suggestions': gemini_suggestions,
-                'todos': todos
-            }
+            return self._build_result(file_path, claude_analysis, gpt_review, gemini_suggestions)
             
         except Exception as e:
-            logger.error(f"Erreur lors de l'analyse de {file_path}: {str(e)}")
+            logger.error("Erreur lors de l'analyse de %s: %s", file_path, e)
             self.stats['errors'] += 1
             return {
                 'file': file_path,
@@ -138,6 +500,7 @@ class LLMCodeAgent:
     async def analyze_project(self, project_path: str) -> List[Dict]:
         """
         Analyse un projet complet.
+        Un projet d'au moins batch_min_files fichiers est confié à analyze_project_batch.
         
         Args:
             project_path (str): Chemin du projet à analyser
@@ -150,34 +513,127 @@ class LLMCodeAgent:
             if not os.path.exists(project_path):
                 raise FileNotFoundError(f"Projet non trouvé: {project_path}")
             
-            # Recherche des fichiers à analyser
-            files_to_analyze = []
-            for root, _, files in os.walk(project_path):
-                for file in files:
-                    if file.endswith(('.py', '.js', '.java', '.cpp', '.h', '.hpp')):
-                        file_path = os.path.join(root, file)
-                        if file_path not in self.processed_files:
-                            files_to_analyze.append(file_path)
-            
-            # Analyse des fichiers
-            results = []
+            if self.batch_min_files and len(self._find_files(project_path)) >= self.batch_min_files:
+                logger.info("Au moins %d fichiers à analyser, passage par les API Batch", self.batch_min_files)
+                return await self.analyze_project_batch(project_path)
+            
+            self._install_executor()
+            os.makedirs(self.output_dir, exist_ok=True)
+            # Les analyses partagées et les sémaphores d'une précédente exécution
+            # appartiennent à une autre boucle
+            self._content_analyses.clear()
+            self._provider_slots = self._create_provider_slots()
+            
+            # Producteur/consommateurs: les analyses démarrent pendant le parcours du projet.
+            # Deux fois plus de workers que de créneaux par fournisseur: pendant que ChatGPT
+            # et Gemini traitent un fichier, Claude analyse déjà le suivant
+            workers = self.max_concurrency * 2
+            queue: asyncio.Queue = asyncio.Queue(maxsize=workers * 2)
+            results: Dict[int, Dict] = {}
+            
             with Progress(
                 SpinnerColumn(),
                 TextColumn("[progress.description]{task.description}"),
                 console=console
             ) as progress:
-                task = progress.add_task("Analyse en cours...", total=len(files_to_analyze))
+                task = progress.add_task("Analyse en cours...", total=None)
+                
+                async def produce():
+                    discovered = 0
+                    try:
+                        for index, file_path in enumerate(self._iter_files(project_path)):
+                            await queue.put((index, file_path))
+                            discovered = index + 1
+                            progress.update(task, total=discovered)
+                    finally:
+                        # Un marqueur de fin par worker, même si le parcours a échoué
+                        for _ in range(workers):
+                            await queue.put(None)
+                
+                async def consume():
+                    while (item := await queue.get()) is not None:
+                        index, file_path = item
+                        result = await self.analyze_file(file_path)
+                        results[index] = result
+                        self.processed_files.add(file_path)
+                        # Écriture des rapports dans un thread pour ne pas bloquer la boucle
+                        if 'error' not in result and (file_path, self.output_dir) not in self._written_reports:
+                            await asyncio.to_thread(self._write_file_reports, result, self.output_dir)
+                        progress.update(task, advance=1)
                 
-                for file_path in files_to_analyze:
-                    result = await self.analyze_file(file_path)
-                    results.append(result)
+                # Les tâches TODO de tout le projet sont écrites en une fois, à la fin
+                with self.todo_manager.batch():
+                    await asyncio.gather(produce(), *(consume() for _ in range(workers)))
+            
+            self._save_manifest()
+            
+            return [results[index] for index in sorted(results)]
+            
+        except Exception as e:
+            logger.error("Erreur lors de l'analyse du projet: %s", e)
+            raise
+    
+    async def analyze_project_batch(self, project_path: str) -> List[Dict]:
+        """
+        Analyse un projet complet via les API Batch d'Anthropic et d'OpenAI.
+        Les analyses Claude puis les reviews ChatGPT sont soumises en lots (coût réduit,
+        traitement différé); Gemini, sans API Batch, est interrogé en parallèle en temps réel,
+        les petits fichiers étant regroupés à plusieurs par appel.
+        
+        Args:
+            project_path (str): Chemin du projet à analyser
+            
+        Returns:
+            List[Dict]: Résultats de l'analyse
+        """
+        try:
+            # Vérification du projet
+            if not os.path.exists(project_path):
+                raise FileNotFoundError(f"Projet non trouvé: {project_path}")
+            
+            self._install_executor()
+            
+            # Lecture des fichiers à analyser
+            results: List[Optional[Dict]] = []
+            files: List[Tuple[str, str]] = []
+            for file_path in self._find_files(project_path):
+                try:
+                    with open(file_path, 'r', encoding='utf-8') as f:
+                        files.append((compact_code(f.read()), file_path))
+                    results.append(None)
+                except Exception as e:
+                    logger.error("Erreur lors de la lecture de %s: %s", file_path, e)
+                    self.stats['errors'] += 1
+                    results.append({'file': file_path, 'error': str(e)})
+            
+            with console.status("Analyse Claude en lot..."):
+                claude_analyses = await self.claude_agent.analyze_batch(files)
+            
+            with console.status("Review ChatGPT en lot et suggestions Gemini..."):
+                gpt_reviews, gemini_suggestions = await asyncio.gather(
+                    self.gpt_agent.analyze_batch([
+                        (code_content, self.claude_agent.summarize(claude_analysis), file_path)
+                        for (code_content, file_path), claude_analysis in zip(files, claude_analyses)
+                    ]),
+                    self.gemini_agent.suggest_refactoring_batch([
+                        (code_content, claude_analysis, file_path)
+                        for (code_content, file_path), claude_analysis in zip(files, claude_analyses)
+                    ], concurrency=self.max_concurrency)
+                )
+            
+            analyzed = iter(zip(files, claude_analyses, gpt_reviews, gemini_suggestions))
+            with self.todo_manager.batch():
+                for index, result in enumerate(results):
+                    if result is not None:
+                        continue
+                    (_, file_path), claude_analysis, gpt_review, gemini_suggestion = next(analyzed)
+                    results[index] = self._build_result(file_path, claude_analysis, gpt_review, gemini_suggestion)
                     self.processed_files.add(file_path)
-                    progress.update(task, advance=1)
             
             return results
             
         except Exception as e:
-            logger.error(f"Erreur lors de l'analyse du projet: {str(e)}")
+            logger.error("Erreur lors de l'analyse du projet en lot: %s", e)
             raise
     
     def generate_report(self, results: List[Dict], output_dir: str = "analysis_reports"):
@@ -192,38 +648,55 @@ class LLMCodeAgent:
             # Création du dossier de sortie
             os.makedirs(output_dir, exist_ok=True)
             
-            # Génération des rapports par fichier
+            # Génération des rapports par fichier non encore écrits pendant l'analyse
             for result in results:
-                if 'error' in result:
+                if 'error' in result or (result['file'], output_dir) in self._written_reports:
                     continue
-                
-                file_name = os.path.basename(result['file'])
-                base_name = os.path.splitext(file_name)[0]
-                
-                # Rapport Claude
-                claude_report = os.path.join(output_dir, f"{file_name}_claude_analysis.md")
-                with open(claude_report, 'w', encoding='utf-8') as f:
-                    f.write(result['claude_analysis'])
-                
-                # Rapport GPT
-                gpt_report = os.path.join(output_dir, f"{file_name}_chatgpt_review.md")
-                with open(gpt_report, 'w', encoding='utf-8') as f:
-                    f.write(result['gpt_review'])
-                
-                # Suggestions Gemini
-                gemini_report = os.path.join(output_dir, f"{file_name}_gemini_suggestions.md")
-                with open(gemini_report, 'w', encoding='utf-8') as f:
-                    f.write(result['gemini_suggestions'])
+                self._write_file_reports(result, output_dir)
             
             # Rapport global
             self._generate_global_report(results, output_dir)
             
-            logger.info(f"Rapports générés dans {output_dir}")
+            logger.info("Rapports générés dans %s", output_dir)
             
         except Exception as e:
-            logger.error(f"Erreur lors de la génération des rapports: {str(e)}")
+            logger.error("Erreur lors de la génération des rapports: %s", e)
             raise
     
+    def _write_file_reports(self, result: Dict, output_dir: str):
+        """
+        Écrit les rapports Claude, GPT et Gemini d'un fichier.
+        
+        Args:
+            result (Dict): Résultat de l'analyse du fichier
+            output_dir (str): Dossier de sortie (doit exister)
+        """
+        for suffix, key in REPORT_FILES:
+            with open(_report_path(result['file'], output_dir, suffix), 'w', encoding='utf-8') as f:
+                f.write(result[key])
+        self._written_reports.add((result['file'], output_dir))
+    
+    def _read_file_reports(self, file_path: str, output_dir: str) -> Optional[Tuple[str, str, str]]:
+        """
+        Relit les rapports Claude, GPT et Gemini d'un fichier déjà analysé.
+        
+        Args:
+            file_path (str): Chemin du fichier analysé
+            output_dir (str): Dossier de sortie
+            
+        Returns:
+            Optional[Tuple[str, str, str]]: Les trois rapports, ou None si l'un d'eux manque
+        """
+        reports = []
+        for suffix, _ in REPORT_FILES:
+            try:
+                with open(_report_path(file_path, output_dir, suffix), 'r', encoding='utf-8') as f:
+                    reports.append(f.read())
+            except OSError:
+                return None
+        self._written_reports.add((file_path, output_dir))
+        return tuple(reports)
+    
     def _generate_global_report(self, results: List[Dict], output_dir: str):
         """
         Génère le rapport global du projet.
@@ -260,64 +733,39 @@ class LLMCodeAgent:
             
             # Écriture du rapport
             report_path = os.path.join(output_dir, "master_project_analysis_report.md")
+            report_content = '\n'.join(report)
             with open(report_path, 'w', encoding='utf-8') as f:
-                f.write('\n'.join(report))
+                f.write(report_content)
             
-            # Conversion en HTML
-            self._convert_to_html(report_path)
+            # Conversion en HTML depuis le contenu en mémoire, sans relire le fichier
+            self._convert_to_html(report_path, report_content)
             
         except Exception as e:
-            logger.error(f"Erreur lors de la génération du rapport global: {str(e)}")
+            logger.error("Erreur lors de la génération du rapport global: %s", e)
             raise
     
-    def _convert_to_html(self, markdown_path: str):
+    def _convert_to_html(self, markdown_path: str, md_content: Optional[str] = None):
         """
         Convertit le rapport Markdown en HTML.
         
         Args:
             markdown_path (str): Chemin du fichier Markdown
+            md_content (str, optional): Contenu du rapport s'il est déjà en mémoire
         """
         try:
-            import markdown
-            with open(markdown_path, 'r', encoding='utf-8') as f:
-                md_content = f.read()
-            
-            html_content = markdown.markdown(
-                md_content,
-                extensions=['extra', 'codehilite', 'tables']
-            )
+            if md_content is None:
+                with open(markdown_path, 'r', encoding='utf-8') as f:
+                    md_content = f.read()
             
             # Ajout du style
-            html_content = f"""
-            <!DOCTYPE html>
-            <html>
-            <head>
-                <meta charset="utf-8">
-                <title>Rapport d'Analyse</title>
-                <style>
-                    body {{ font-family: Arial, sans-serif; margin: 40px; }}
-                    h1 {{ color: #2c3e50; }}
-                    h2 {{ color: #34495e; margin-top: 30px; }}
-                    h3 {{ color: #7f8c8d; }}
-                    pre {{ background-color: #f8f9fa; padding: 15px; border-radius: 5px; }}
-                    code {{ background-color: #f8f9fa; padding: 2px 5px; border-radius: 3px; }}
-                    table {{ border-collapse: collapse; width: 100%; margin: 20px 0; }}
-                    th, td {{ border: 1px solid #ddd; padding: 8px; text-align: left; }}
-                    th {{ background-color: #f8f9fa; }}
-                </style>
-            </head>
-            <body>
-                {html_content}
-            </body>
-            </html>
-            """
+            html_content = HTML_TEMPLATE.format_map({'body': self._markdown.reset().convert(md_content)})
             
             html_path = markdown_path.replace('.md', '.html')
             with open(html_path, 'w', encoding='utf-8') as f:
                 f.write(html_content)
             
         except Exception as e:
-            logger.error(f"Erreur lors de la conversion en HTML: {str(e)}")
+            logger.error("Erreur lors de la conversion en HTML: %s", e)
             raise
 
 @click.command()
@@ -325,22 +773,27 @@ class LLMCodeAgent:
 @click.option('--verbose', '-v', is_flag=True, help='Mode verbeux')
 @click.option('--output', '-o', default='analysis_reports', help='Dossier de sortie')
 @click.option('--format', '-f', type=click.Choice(['markdown', 'html', 'json']), default='markdown', help='Format de sortie')
-def main(project_path: str, verbose: bool, output: str, format: str):
+@click.option('--batch-api', is_flag=True, help='Utilise les API Batch (coût réduit, traitement différé)')
+def cli(project_path: str, verbose: bool, output: str, format: str, batch_api: bool) -> int:
     """
     Agent d'analyse de code multi-LLM.
     
     PROJECT_PATH: Chemin vers le projet à analyser
     """
+    agent = None
     try:
         # Configuration du logging
         if verbose:
             logger.setLevel(logging.DEBUG)
         
         # Initialisation de l'agent
-        agent = LLMCodeAgent()
+        agent = LLMCodeAgent({'output_dir': output})
         
         # Analyse du projet
-        results = asyncio.run(agent.analyze_project(project_path))
+        if batch_api:
+            results = asyncio.run(agent.analyze_project_batch(project_path))
+        else:
+            results = asyncio.run(agent.analyze_project(project_path))
         
         # Génération des rapports
         agent.generate_report(results, output)
@@ -356,8 +809,31 @@ def main(project_path: str, verbose: bool, output: str, format: str):
         ))
         
     except Exception as e:
-        logger.error(f"Erreur lors de l'exécution: {str(e)}")
-        sys.exit(1)
+        logger.error("Erreur lors de l'exécution: %s", e)
+        return 1
+    finally:
+        if agent is not None:
+            agent.close()
+    
+    return 0
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    Point d'entrée de la ligne de commande, appelable sans lancer de nouveau processus.
+    
+    Args:
+        argv (List[str], optional): Arguments de la ligne de commande (sys.argv[1:] par défaut)
+        
+    Returns:
+        int: Code de sortie
+    """
+    try:
+        return cli.main(args=argv, prog_name='llm_code_agent', standalone_mode=False)
+    except click.ClickException as e:
+        e.show()
+        return e.exit_code
+    except click.Abort:
+        return 1
 
 if __name__ == '__main__':
-    main()
+    sys.exit(main())
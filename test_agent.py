@@ -9,18 +9,34 @@ Ce module contient les tests unitaires et d'intégration pour les différents co
 import os
 import sys
 import json
+import asyncio
 import logging
+import contextlib
+import io
+import shutil
 import unittest
+from unittest import mock
+import pytest
 from typing import Dict, List, Optional
 from pathlib import Path
+import httpx
 
 # Ajout du répertoire parent au PYTHONPATH
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from utils.gemini_agent import GeminiAgent
-from utils.todo_manager import TodoManager
+from utils.gemini_agent import BATCH_PROMPT_TEMPLATE, GeminiAgent
+from utils.todo_manager import TodoManager, parse_text_todos
 from utils.claude_agent import ClaudeAgent
-from utils.gpt_agent import GPTAgent
+from utils.chatgpt_agent import ChatGPTAgent
+from utils.llm_cache import LLMCache, cached_call
+from utils.retry import BACKOFF_SCHEDULE, RETRY_JITTER, llm_retry
+from utils.rate_limiter import TokenBucket, parse_anthropic_headers, parse_openai_headers, parse_retry_after
+from utils.tokens import compact_code, estimate_tokens, split_code, truncate_tokens
+from utils.languages import detect_language
+from utils.timestamps import report_timestamp
+from utils.file_scanner import FileScanner, _count_lines
+from utils.html_exporter import CSS_FILE_NAME, PARALLEL_MIN_FILES, HTMLExporter
+from llm_code_agent import LLMCodeAgent, main
 
 # Configuration du logging
 logging.basicConfig(
@@ -29,46 +45,178 @@ logging.basicConfig(
 )
 logger = logging.getLogger('test_agent')
 
-class TestGeminiAgent(unittest.TestCase):
-    """Tests unitaires pour l'agent Gemini."""
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'tests', 'fixtures')
+
+# Réponses LLM enregistrées, rejouées à la place des appels aux API
+LLM_RESPONSES_FILE = os.path.join(FIXTURES_DIR, 'llm_responses.json')
+
+# Petit projet analysé par les tests d'intégration
+TEST_PROJECT_DIR = os.path.join(FIXTURES_DIR, 'test_project')
+
+# Fichier Python soumis à l'agent Gemini (lu sur place, jamais modifié)
+SAMPLE_FILE = os.path.join(FIXTURES_DIR, 'sample.py')
+
+# RECORD=1 interroge les vraies API et ajoute les nouvelles réponses au fichier d'enregistrement
+RECORD = os.getenv('RECORD') == '1'
+
+if not RECORD:
+    # Les agents exigent une clé à l'initialisation, même si aucune requête n'est envoyée
+    for api_key_var in ('ANTHROPIC_API_KEY', 'OPENAI_API_KEY', 'GOOGLE_API_KEY'):
+        os.environ.setdefault(api_key_var, 'test-key')
+
+CLAUDE_ANALYSIS = """# Analyse de test.py par Claude 3
+
+La fonction parcourt la liste avec une boucle explicite et ne gère pas les entrées vides.
+"""
+
+def copy_test_project(destination: str) -> str:
+    """
+    Copie le projet de test par liens physiques: seuls les répertoires sont créés.
+    Les fichiers copiés partagent leur contenu avec les originaux et ne doivent pas être modifiés.
+    
+    Args:
+        destination (str): Répertoire à créer
+        
+    Returns:
+        str: Répertoire du projet copié
+    """
+    try:
+        shutil.copytree(TEST_PROJECT_DIR, destination, copy_function=os.link)
+    except (OSError, shutil.Error):
+        # Liens physiques impossibles (Windows, autre système de fichiers): copie classique
+        shutil.rmtree(destination, ignore_errors=True)
+        shutil.copytree(TEST_PROJECT_DIR, destination)
+    return destination
+
+class RecordedLLM:
+    """
+    Remplace les appels aux API LLM par des réponses enregistrées.
+    Les réponses sont indexées par le SHA256 du prompt (et du modèle, comme le cache des appels).
+    """
+    
+    AGENTS = (
+        (ClaudeAgent, "anthropic"),
+        (ChatGPTAgent, "openai"),
+        (GeminiAgent, "google")
+    )
+    
+    def __init__(self, responses_file: str = LLM_RESPONSES_FILE):
+        """
+        Charge les réponses enregistrées.
+        
+        Args:
+            responses_file (str): Fichier JSON des réponses enregistrées
+        """
+        self.responses_file = responses_file
+        self.responses: Dict[str, Dict] = {}
+        if os.path.exists(responses_file):
+            with open(responses_file, 'r', encoding='utf-8') as f:
+                self.responses = json.load(f)
+        self.recorded = False
+        self._patchers = []
+    
+    def _replay(self, provider: str, complete):
+        """Construit le remplaçant de `_complete` pour un fournisseur."""
+        async def _complete(agent, prompt: str) -> str:
+            key = LLMCache.make_key(provider, agent.model, prompt)
+            if key in self.responses:
+                return self.responses[key]['response']
+            if not RECORD:
+                raise KeyError(
+                    f"Aucune réponse enregistrée pour ce prompt {provider} ({key[:12]}), "
+                    "relancez les tests avec RECORD=1 pour l'enregistrer"
+                )
+            response = await complete(agent, prompt)
+            self.responses[key] = {'provider': provider, 'model': agent.model, 'response': response}
+            self.recorded = True
+            return response
+        return _complete
+    
+    def start(self) -> None:
+        """Active le rejeu des réponses pour tous les agents."""
+        for agent_class, provider in self.AGENTS:
+            patcher = mock.patch.object(agent_class, '_complete', self._replay(provider, agent_class._complete))
+            patcher.start()
+            self._patchers.append(patcher)
+    
+    def stop(self) -> None:
+        """Restaure les agents et sauvegarde les réponses enregistrées."""
+        for patcher in reversed(self._patchers):
+            patcher.stop()
+        self._patchers = []
+        if self.recorded:
+            # Relecture du fichier: d'autres workers ont pu y ajouter des réponses
+            responses = {}
+            if os.path.exists(self.responses_file):
+                with open(self.responses_file, 'r', encoding='utf-8') as f:
+                    responses = json.load(f)
+            self.responses = {**responses, **self.responses}
+            os.makedirs(os.path.dirname(self.responses_file), exist_ok=True)
+            with open(self.responses_file, 'w', encoding='utf-8') as f:
+                json.dump(self.responses, f, ensure_ascii=False, indent=2, sort_keys=True)
+                f.write('\n')
+            self.recorded = False
+
+@pytest.fixture(scope="session")
+def gemini_agent() -> GeminiAgent:
+    """Agent Gemini partagé par tous les tests de la session."""
+    return GeminiAgent(use_cache=False)
+
+@pytest.fixture(scope="session")
+def chatgpt_agent() -> ChatGPTAgent:
+    """Agent ChatGPT partagé par tous les tests de la session."""
+    return ChatGPTAgent(use_cache=False)
+
+class TmpPathTestCase(unittest.TestCase):
+    """
+    Classe de base des tests qui écrivent des fichiers.
+    Chaque test dispose de son propre répertoire temporaire (self.tmp_path), ce qui
+    permet d'exécuter la suite en parallèle avec pytest-xdist.
+    """
+    
+    @pytest.fixture(autouse=True)
+    def _use_tmp_path(self, tmp_path):
+        """Expose le répertoire temporaire pytest du test."""
+        self.tmp_path = tmp_path
+
+class RecordedLLMTestCase(TmpPathTestCase):
+    """Classe de base des tests qui sollicitent les agents LLM."""
     
     def setUp(self):
-        """Initialisation avant chaque test."""
-        self.agent = GeminiAgent()
-        self.test_file = "test_files/test.py"
-        self._create_test_file()
+        """Active le rejeu des réponses enregistrées."""
+        self.llm = RecordedLLM()
+        self.llm.start()
+        self.addCleanup(self.llm.stop)
+
+class TestGeminiAgent(RecordedLLMTestCase):
+    """Tests unitaires pour l'agent Gemini."""
     
-    def tearDown(self):
-        """Nettoyage après chaque test."""
-        if os.path.exists(self.test_file):
-            os.remove(self.test_file)
-    
-    def _create_test_file(self):
-        """Crée un fichier de test."""
-        os.makedirs(os.path.dirname(self.test_file), exist_ok=True)
-        with open(self.test_file, 'w') as f:
-            f.write("""
-def calculate_total(items):
-    total = 0
-    for item in items:
-        total += item.price
-    return total
-
-class Item:
-    def __init__(self, price):
-        self.price = price
-""")
+    @pytest.fixture(scope="class", autouse=True)
+    @classmethod
+    def _load_test_file(cls):
+        """Lit le fichier de test une seule fois pour toute la classe."""
+        cls.test_file = SAMPLE_FILE
+        cls.code = Path(SAMPLE_FILE).read_bytes().decode('utf-8')
+    
+    @pytest.fixture(autouse=True)
+    def _use_agent(self, gemini_agent):
+        """Expose l'agent Gemini partagé."""
+        self.agent = gemini_agent
+    
+    def _suggest_refactoring(self) -> str:
+        """Demande des suggestions pour le fichier de test."""
+        return asyncio.run(self.agent.suggest_refactoring(self.code, CLAUDE_ANALYSIS, self.test_file))
     
     def test_suggest_refactoring(self):
         """Test de la méthode suggest_refactoring."""
-        suggestions = self.agent.suggest_refactoring(self.test_file)
+        suggestions = self._suggest_refactoring()
         self.assertIsNotNone(suggestions)
         self.assertIsInstance(suggestions, str)
         self.assertTrue(len(suggestions) > 0)
     
     def test_extract_todos(self):
         """Test de l'extraction des TODOs."""
-        suggestions = self.agent.suggest_refactoring(self.test_file)
+        suggestions = self._suggest_refactoring()
         todos = self.agent.extract_todos_from_suggestions(suggestions)
         self.assertIsInstance(todos, list)
         if todos:
@@ -76,35 +224,241 @@ class Item:
             self.assertIn('description', todos[0])
             self.assertIn('priority', todos[0])
             self.assertIn('effort', todos[0])
+    
+    def test_claude_fallback_is_lazy(self):
+        """Test de la création différée de l'agent Claude de secours."""
+        with mock.patch.dict(os.environ, {'ANTHROPIC_API_KEY': ''}):
+            agent = GeminiAgent(use_cache=False)
+        self.assertNotIn('claude_fallback', vars(agent))
+    
+    def test_suggest_many_bounds_concurrency(self):
+        """Test des suggestions parallèles pour plusieurs fichiers."""
+        running, peak = 0, 0
+        
+        async def fake_generate(agent, prompt):
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+            return "suggestions"
+        
+        files = [(f"x = {i}\n", CLAUDE_ANALYSIS, f"file_{i}.py") for i in range(6)]
+        with mock.patch.object(GeminiAgent, '_generate_with_gemini', fake_generate):
+            reports = asyncio.run(self.agent.suggest_many(files, concurrency=2))
+        
+        self.assertEqual(len(reports), 6)
+        self.assertIn("file_5.py", reports[5])
+        self.assertEqual(peak, 2)
+    
+    def test_suggest_refactoring_batch_groups_files(self):
+        """Test du regroupement de petits fichiers dans un même appel à Gemini."""
+        prompts = []
+        
+        async def fake_generate(agent, prompt):
+            prompts.append(prompt)
+            return "".join(f"=== FICHIER {n} ===\n## Rapport {n}\n" for n in range(1, prompt.count("## Fichier ") + 1))
+        
+        files = [(f"x = {i}\n", CLAUDE_ANALYSIS, f"file_{i}.py") for i in range(3)]
+        with mock.patch.object(GeminiAgent, '_generate_with_gemini', fake_generate):
+            reports = asyncio.run(self.agent.suggest_refactoring_batch(files))
+        
+        self.assertEqual(len(prompts), 1)
+        self.assertIn("file_2.py", reports[2])
+        self.assertTrue(reports[2].endswith("## Rapport 3\n"))
+        self.assertIsNone(GeminiAgent._split_batch_response("=== FICHIER 1 ===\nA", 2))
+    
+    def test_suggest_refactoring_batch_fallback_bounds_concurrency(self):
+        """Test de la reprise fichier par fichier de groupes en échec, dans la limite d'appels simultanés."""
+        prompts = []
+        running, peak = 0, 0
+        
+        async def failing_generate(agent, prompt):
+            prompts.append(prompt)
+            return None
+        
+        async def fake_suggest(agent, code_content, claude_analysis, file_path):
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+            return file_path
+        
+        files = [(f"x = {i}\n", CLAUDE_ANALYSIS, f"file_{i}.py") for i in range(8)]
+        # Budget d'environ deux fichiers par groupe
+        budget = estimate_tokens(BATCH_PROMPT_TEMPLATE) + 2 * estimate_tokens(CLAUDE_ANALYSIS) + 100
+        with mock.patch.object(GeminiAgent, '_generate_with_gemini', failing_generate), \
+                mock.patch.object(GeminiAgent, 'suggest_refactoring', fake_suggest):
+            reports = asyncio.run(self.agent.suggest_refactoring_batch(files, max_prompt_tokens=budget, concurrency=2))
+        
+        self.assertGreater(len(prompts), 1)
+        self.assertEqual(reports, [file_path for _, _, file_path in files])
+        self.assertEqual(peak, 2)
+    
+    def test_complete_rest(self):
+        """Test de l'appel direct à l'API REST de Gemini."""
+        def handler(request):
+            return httpx.Response(200, json={
+                'candidates': [{'content': {'parts': [{'text': 'Suggestions'}, {'text': ' REST'}]}}]
+            })
+        
+        with mock.patch.dict(os.environ, {'ANTHROPIC_API_KEY': ''}):
+            agent = GeminiAgent(use_cache=False)
+        agent._get_async_client = lambda: httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        self.assertEqual(asyncio.run(agent._complete_rest("prompt")), "Suggestions REST")
+    
+    def test_rest_client_closed_with_loop(self):
+        """Test de la fermeture du client REST à l'arrêt de la boucle qui l'a créé."""
+        with mock.patch.dict(os.environ, {'ANTHROPIC_API_KEY': ''}):
+            agent = GeminiAgent(use_cache=False)
+        
+        async def get_client():
+            return agent._get_async_client()
+        
+        first = asyncio.run(get_client())
+        second = asyncio.run(get_client())
+        self.assertIsNot(first, second)
+        self.assertTrue(first.is_closed)
+        self.assertTrue(second.is_closed)
+    
+    def test_extract_todos_from_json_blocks(self):
+        """Test de l'extraction des TODOs de plusieurs blocs JSON, dont un invalide."""
+        with mock.patch.dict(os.environ, {'ANTHROPIC_API_KEY': ''}):
+            agent = GeminiAgent(use_cache=False)
+        content = """```json
+[{"description": "A", "priority": "haute", "effort": "faible"}]
+```
+```json
+{"todos": [{"description": "B", "priority": "basse", "effort": "moyen"}]}
+```
+```json
+{invalide
+```"""
+        todos = agent._extract_todos_from_json(content)
+        self.assertEqual([todo['description'] for todo in todos], ['A', 'B'])
 
-class TestTodoManager(unittest.TestCase):
-    """Tests unitaires pour le gestionnaire de tâches TODO."""
+class TestClaudeAgent(unittest.TestCase):
+    """Tests unitaires pour l'agent Claude."""
     
-    def setUp(self):
-        """Initialisation avant chaque test."""
-        self.todo_file = "test_todos.json"
-        self.manager = TodoManager(self.todo_file)
+    def test_summarize_keeps_problems(self):
+        """Test du résumé d'une analyse limité aux problèmes identifiés."""
+        agent = ClaudeAgent(use_cache=False)
+        analysis = agent._create_report_header("test.py", "test.py") + """## Analyse ligne par ligne
+
+### Erreurs et bugs potentiels
+- `divide` lève ZeroDivisionError quand b vaut 0
+- `average` échoue sur une liste vide
+
+### Lisibilité
+- Les noms de variables sont clairs
+
+## Problèmes de sécurité
+1. Aucune validation des entrées
+"""
+        self.assertEqual(agent.summarize(analysis), "\n".join([
+            "- `divide` lève ZeroDivisionError quand b vaut 0",
+            "- `average` échoue sur une liste vide",
+            "1. Aucune validation des entrées"
+        ]))
+        self.assertLessEqual(estimate_tokens(agent.summarize(analysis * 50, max_tokens=40)), 40)
+
+    def test_async_client_closed_with_loop(self):
+        """Test de la fermeture du client asynchrone à l'arrêt de la boucle qui l'a créé."""
+        agent = ClaudeAgent(use_cache=False, max_connections=8)
+
+        async def get_client():
+            return agent._get_async_client()
+
+        first = asyncio.run(get_client())
+        second = asyncio.run(get_client())
+        self.assertIsNot(first, second)
+        self.assertTrue(first.is_closed())
+        self.assertTrue(second.is_closed())
+
+class TestChatGPTAgent(unittest.TestCase):
+    """Tests unitaires pour l'agent ChatGPT."""
     
-    def tearDown(self):
-        """Nettoyage après chaque test."""
-        if os.path.exists(self.todo_file):
-            os.remove(self.todo_file)
+    @pytest.fixture(autouse=True)
+    def _use_agent(self, chatgpt_agent):
+        """Expose l'agent ChatGPT partagé."""
+        self.agent = chatgpt_agent
     
-    def test_add_todos(self):
-        """Test de l'ajout de tâches TODO."""
-        test_todos = [
+    def test_extract_code_suggestions(self):
+        """Test de l'extraction des suggestions de code d'un rapport."""
+        review = """# Validation de test.py
+
+## Problème 1: accumulation manuelle
+**Priorité: Élevée**
+
+```python
+total = sum(item.price for item in items)
+```
+
+## Suggestion sans code
+Priority: low
+
+## Amélioration 2: annotations
+```python
+def calculate_total(items: list) -> float: ...
+```
+"""
+        suggestions = self.agent.extract_code_suggestions(review)
+        self.assertEqual([s['description'] for s in suggestions], ["Problème 1: accumulation manuelle", "Amélioration 2: annotations"])
+        self.assertEqual(suggestions[0]['code'], "total = sum(item.price for item in items)")
+        self.assertEqual([s['priority'] for s in suggestions], ["Élevé", "Moyen"])
+
+    def test_analyze_many_bounds_concurrency(self):
+        """Test de la validation parallèle de plusieurs fichiers."""
+        running, peak = 0, 0
+        
+        async def fake_complete(agent, prompt):
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+            return "validation"
+        
+        files = [(f"x = {i}\n", CLAUDE_ANALYSIS, f"file_{i}.py") for i in range(6)]
+        with mock.patch.object(ChatGPTAgent, '_complete', fake_complete):
+            reports = asyncio.run(self.agent.analyze_many(files, concurrency=2))
+        
+        self.assertEqual(len(reports), 6)
+        self.assertIn("file_5.py", reports[5])
+        self.assertEqual(peak, 2)
+
+class TestTodoManager:
+    """Tests unitaires pour le gestionnaire de tâches TODO."""
+    
+    @pytest.fixture
+    def manager(self, tmp_path) -> TodoManager:
+        """Gestionnaire vide, propre à chaque test."""
+        return TodoManager(str(tmp_path / "todos.json"))
+    
+    @pytest.fixture(scope="class")
+    @classmethod
+    def filled_manager(cls, tmp_path_factory) -> TodoManager:
+        """Gestionnaire partagé par les tests de filtres, qui ne le modifient pas."""
+        manager = TodoManager(str(tmp_path_factory.mktemp("todos") / "todos.json"))
+        manager.add_todos([
             {
                 "description": "Test task 1",
                 "priority": "Élevée",
                 "effort": "Moyen",
-                "file": "test.py"
+                "file": "test1.py"
+            },
+            {
+                "description": "Test task 2",
+                "priority": "Moyenne",
+                "effort": "Faible",
+                "file": "test2.py"
             }
-        ]
-        self.manager.add_todos(test_todos, "Test")
-        self.assertEqual(len(self.manager.get_todos()), 1)
+        ], "Test")
+        return manager
     
-    def test_mark_completed(self):
-        """Test du marquage d'une tâche comme complétée."""
+    def test_add_todos(self, manager):
+        """Test de l'ajout de tâches TODO."""
         test_todos = [
             {
                 "description": "Test task 1",
@@ -113,35 +467,90 @@ class TestTodoManager(unittest.TestCase):
                 "file": "test.py"
             }
         ]
-        self.manager.add_todos(test_todos, "Test")
-        todo_id = self.manager.get_todos()[0]['id']
-        self.assertTrue(self.manager.mark_completed(todo_id))
-        self.assertTrue(self.manager.get_todos(completed=True)[0]['completed'])
+        manager.add_todos(test_todos, "Test")
+        assert len(manager.get_todos()) == 1
     
-    def test_get_todos_with_filters(self):
-        """Test de la récupération des tâches avec filtres."""
+    def test_mark_completed(self, manager):
+        """Test du marquage d'une tâche comme complétée."""
         test_todos = [
             {
                 "description": "Test task 1",
                 "priority": "Élevée",
                 "effort": "Moyen",
-                "file": "test1.py"
-            },
-            {
-                "description": "Test task 2",
-                "priority": "Moyenne",
-                "effort": "Faible",
-                "file": "test2.py"
+                "file": "test.py"
             }
         ]
-        self.manager.add_todos(test_todos, "Test")
-        
-        # Test des filtres
-        self.assertEqual(len(self.manager.get_todos(file="test1.py")), 1)
-        self.assertEqual(len(self.manager.get_todos(priority="Élevée")), 1)
-        self.assertEqual(len(self.manager.get_todos(effort="Faible")), 1)
+        manager.add_todos(test_todos, "Test")
+        todo_id = manager.get_todos()[0]['id']
+        assert manager.mark_completed(todo_id)
+        assert manager.get_todos(completed=True)[0]['completed']
+    
+    def test_batch_defers_save(self, manager):
+        """Test de l'écriture unique des tâches à la sortie d'un batch()."""
+        with manager.batch():
+            manager.add_todos([
+                {"description": "Test task 1", "priority": "Élevée", "effort": "Moyen", "file": "test.py"},
+                {"description": "Test task 2", "priority": "Faible", "effort": "Faible", "file": "test.py"}
+            ], "Test")
+            manager.mark_completed(manager.get_todos()[0]['id'])
+            assert not os.path.exists(manager.todo_file)
+        assert len(TodoManager(manager.todo_file).get_todos(completed=True)) == 1
+    
+    def test_statistics_follow_changes(self, manager):
+        """Test de l'invalidation des statistiques conservées à chaque modification."""
+        manager.add_todos([
+            {"description": "Test task 1", "priority": "Élevée", "effort": "Moyen", "file": "test.py"}
+        ], "Test")
+        assert manager.get_todo_statistics()['completed'] == 0
+        manager.mark_completed(manager.get_todos()[0]['id'])
+        assert manager.get_todo_statistics()['completed'] == 1
+    
+    def test_compressed_round_trip(self, tmp_path):
+        """Test de la sauvegarde et du rechargement d'un fichier de tâches compressé."""
+        pytest.importorskip("zstandard")
+        manager = TodoManager(str(tmp_path / "todos.json.zst"))
+        manager.add_todos([
+            {"description": "Test task 1", "priority": "Élevée", "effort": "Moyen", "file": "test.py"}
+        ], "Test")
+        assert (tmp_path / "todos.json.zst").read_bytes()[:4] == b'\x28\xb5\x2f\xfd'
+        assert TodoManager(manager.todo_file).get_todos() == manager.get_todos()
     
-    def test_cleanup_duplicates(self):
+    def test_compressed_file_detected_by_signature(self, tmp_path):
+        """Test de la lecture d'un fichier compressé dont le nom n'a pas le suffixe .zst."""
+        zstandard = pytest.importorskip("zstandard")
+        todos = [{"id": "todo_1_0", "description": "Test task 1", "priority": "Faible",
+                  "effort": "Faible", "file": "test.py", "completed": False}]
+        todo_file = tmp_path / "todos.json"
+        todo_file.write_bytes(zstandard.ZstdCompressor().compress(json.dumps(todos).encode('utf-8')))
+        assert TodoManager(str(todo_file)).get_todos() == todos
+    
+    def test_compressed_file_without_zstandard(self, tmp_path):
+        """Test du chargement d'un fichier compressé lorsque zstandard n'est pas installé."""
+        todo_file = tmp_path / "todos.json"
+        todo_file.write_bytes(b'\x28\xb5\x2f\xfd' + b'\x00' * 8)
+        with mock.patch.dict(sys.modules, {'zstandard': None}):
+            assert TodoManager(str(todo_file)).get_todos() == []
+
+    def test_malformed_entries_skipped(self, tmp_path):
+        """Test du chargement d'un fichier contenant des tâches incomplètes."""
+        valid = {"id": "todo_1_0", "description": "Test task 1", "priority": "Faible",
+                 "effort": "Faible", "file": "test.py", "completed": False}
+        todo_file = tmp_path / "todos.json"
+        todo_file.write_text(json.dumps([valid, {"description": "Sans ID ni fichier"}, "texte"]), encoding='utf-8')
+        manager = TodoManager(str(todo_file))
+        assert manager.get_todos() == [valid]
+        assert manager.get_todo_statistics()['total'] == 1
+
+    @pytest.mark.parametrize("filters", [
+        {"file": "test1.py"},
+        {"priority": "Élevée"},
+        {"effort": "Faible"}
+    ])
+    def test_get_todos_with_filters(self, filled_manager, filters):
+        """Test de la récupération des tâches avec filtres."""
+        assert len(filled_manager.get_todos(**filters)) == 1
+    
+    def test_cleanup_duplicates(self, manager):
         """Test du nettoyage des doublons."""
         test_todos = [
             {
@@ -157,48 +566,337 @@ class TestTodoManager(unittest.TestCase):
                 "file": "test.py"
             }
         ]
-        self.manager.add_todos(test_todos, "Test")
-        removed_count = self.manager.cleanup_duplicates()
-        self.assertEqual(removed_count, 1)
-        self.assertEqual(len(self.manager.get_todos()), 1)
+        # add_todos écarte déjà les doublons: l'état dupliqué est construit directement
+        manager.todos.extend(
+            {**todo, "id": f"todo_0_{index}", "source": "Test", "completed": False}
+            for index, todo in enumerate(test_todos)
+        )
+        manager._rebuild_index()
+        removed_count = manager.cleanup_duplicates()
+        assert removed_count == 1
+        assert len(manager.get_todos()) == 1
+    
+    def test_parse_text_todos(self):
+        """Test de l'extraction des TODOs depuis le texte d'une analyse."""
+        todos = parse_text_todos(
+            "Priorité: haute\n"
+            "## TODO: Ajouter des tests\n"
+            "- **Priorité**: Élevée\n"
+            "- **Effort**: Faible\n"
+            "## Amélioration de la sécurité\n"
+            "PRIORITY - critical, effort: high\n"
+        )
+        assert todos == [
+            {'description': 'TODO: Ajouter des tests', 'priority': 'Élevée', 'effort': 'Faible'},
+            {'description': 'Amélioration de la sécurité', 'priority': 'Critique', 'effort': 'Élevé'}
+        ]
 
-class TestIntegration(unittest.TestCase):
-    """Tests d'intégration pour l'ensemble du système."""
+class TestLLMCache(TmpPathTestCase):
+    """Tests unitaires pour le cache des réponses LLM."""
     
     def setUp(self):
         """Initialisation avant chaque test."""
-        self.test_dir = "test_files"
-        self.todo_file = "test_todos.json"
-        os.makedirs(self.test_dir, exist_ok=True)
-        
-        # Initialisation des agents
-        self.gemini_agent = GeminiAgent()
-        self.todo_manager = TodoManager(self.todo_file)
+        self.cache_file = str(self.tmp_path / "llm_cache.sqlite3")
+        self.cache = LLMCache(self.cache_file)
     
     def tearDown(self):
         """Nettoyage après chaque test."""
-        if os.path.exists(self.todo_file):
-            os.remove(self.todo_file)
-        if os.path.exists(self.test_dir):
-            for file in os.listdir(self.test_dir):
-                os.remove(os.path.join(self.test_dir, file))
-            os.rmdir(self.test_dir)
+        self.cache.close()
+    
+    def test_get_set(self):
+        """Test de l'enregistrement et de la lecture d'une réponse."""
+        key = LLMCache.make_key("anthropic", "claude", "prompt")
+        self.assertIsNone(self.cache.get(key))
+        self.cache.set(key, "# Analyse")
+        self.assertEqual(self.cache.get(key), "# Analyse")
+    
+    def test_key_depends_on_model(self):
+        """Test de la dépendance de la clé au modèle."""
+        self.assertNotEqual(
+            LLMCache.make_key("openai", "gpt-4o", "prompt"),
+            LLMCache.make_key("openai", "gpt-4", "prompt")
+        )
+    
+    def test_ttl_expiry(self):
+        """Test de l'expiration des entrées."""
+        key = LLMCache.make_key("google", "gemini-pro", "prompt")
+        self.cache.set(key, "suggestions")
+        self.cache.ttl = 0
+        self.assertIsNone(self.cache.get(key))
+    
+    def test_cached_call_uses_agent_cache(self):
+        """Test du décorateur avec le cache propre à un agent."""
+        calls = []
+        
+        class FakeAgent:
+            model = "fake-model"
+            
+            def __init__(self, cache):
+                self.cache = cache
+            
+            @cached_call("fake")
+            async def _complete(self, prompt):
+                calls.append(prompt)
+                return f"réponse à {prompt}"
+        
+        agent = FakeAgent(self.cache)
+        for _ in range(2):
+            self.assertEqual(asyncio.run(agent._complete("prompt")), "réponse à prompt")
+        self.assertEqual(len(calls), 1)
+        
+        # Sans cache, chaque appel atteint l'API
+        agent.cache = None
+        asyncio.run(agent._complete("prompt"))
+        self.assertEqual(len(calls), 2)
+
+class TestLLMRetry(unittest.TestCase):
+    """Tests unitaires pour les nouvelles tentatives des appels LLM."""
+    
+    def test_retries_transient_errors(self):
+        """Test de la reprise après une erreur transitoire."""
+        calls = []
+        
+        @llm_retry(TimeoutError)
+        async def flaky():
+            calls.append(1)
+            if len(calls) < 2:
+                raise TimeoutError("timeout")
+            return "ok"
+        
+        flaky.retry.sleep = lambda _: asyncio.sleep(0)
+        self.assertEqual(asyncio.run(flaky()), "ok")
+        self.assertEqual(len(calls), 2)
+    
+    def test_complete_rest_retries_rate_limit(self):
+        """Test de la reprise d'une erreur 429 de l'API REST, avec pause du seau partagé."""
+        statuses = [429, 200]
+        def handler(request):
+            status = statuses.pop(0)
+            if status == 429:
+                return httpx.Response(429, text="quota dépassé")
+            return httpx.Response(200, json={'candidates': [{'content': {'parts': [{'text': 'OK'}]}}]})
+        
+        with mock.patch.dict(os.environ, {'ANTHROPIC_API_KEY': '', 'LLM_GEMINI_REST': '1'}):
+            agent = GeminiAgent(use_cache=False)
+        agent._get_async_client = lambda: httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        bucket = TokenBucket()
+        retrying = GeminiAgent._complete.retry
+        with mock.patch('utils.gemini_agent.get_rate_limiter', return_value=bucket), \
+                mock.patch('utils.rate_limiter.DEFAULT_RATE_LIMIT_PAUSE', 0.01), \
+                mock.patch.object(bucket, 'record_rate_limit', wraps=bucket.record_rate_limit) as record, \
+                mock.patch.object(retrying, 'sleep', lambda _: asyncio.sleep(0)):
+            self.assertEqual(asyncio.run(agent._complete("prompt")), "OK")
+        self.assertEqual(statuses, [])
+        record.assert_called_once()
+    
+    def test_backoff_schedule(self):
+        """Test du calendrier fixe des attentes entre les tentatives."""
+        delays = []
+        
+        async def record_sleep(delay):
+            delays.append(delay)
+        
+        with mock.patch('utils.retry.RETRY_ATTEMPTS', len(BACKOFF_SCHEDULE) + 1):
+            @llm_retry(TimeoutError)
+            async def always_failing():
+                raise TimeoutError("timeout")
+        
+        always_failing.retry.sleep = record_sleep
+        with self.assertRaises(TimeoutError):
+            asyncio.run(always_failing())
+        self.assertEqual(len(delays), len(BACKOFF_SCHEDULE))
+        for delay, expected in zip(delays, BACKOFF_SCHEDULE):
+            self.assertGreaterEqual(delay, expected)
+            self.assertLessEqual(delay, expected + RETRY_JITTER)
+    
+    def test_does_not_retry_other_errors(self):
+        """Test de la propagation immédiate des erreurs non transitoires."""
+        calls = []
+        
+        @llm_retry(TimeoutError)
+        async def failing():
+            calls.append(1)
+            raise ValueError("clé invalide")
+        
+        with self.assertRaises(ValueError):
+            asyncio.run(failing())
+        self.assertEqual(len(calls), 1)
+
+class TestRateLimiter(unittest.TestCase):
+    """Tests unitaires pour la limitation du débit des appels LLM."""
+    
+    def test_acquire_consumes_tokens(self):
+        """Test de la consommation des jetons du seau."""
+        bucket = TokenBucket(1000)
+        asyncio.run(bucket.acquire(400))
+        self.assertLessEqual(bucket._tokens, 601)
+    
+    def test_update_from_headers(self):
+        """Test du recalage du seau sur les en-têtes OpenAI."""
+        limits = parse_openai_headers({
+            'x-ratelimit-remaining-tokens': '1200',
+            'x-ratelimit-reset-tokens': '1m30.5s'
+        })
+        self.assertEqual(limits, (1200.0, 90.5))
+        
+        bucket = TokenBucket()
+        bucket.update(*limits)
+        self.assertEqual(bucket._tokens, 1200.0)
+    
+    def test_missing_headers(self):
+        """Test de l'absence d'en-têtes de limite."""
+        self.assertIsNone(parse_openai_headers({}))
+    
+    def test_request_headers(self):
+        """Test de la lecture des en-têtes de limite de requêtes."""
+        limits = parse_openai_headers({
+            'x-ratelimit-remaining-requests': '49',
+            'x-ratelimit-reset-requests': '1.2s'
+        }, 'requests')
+        self.assertEqual(limits, (49.0, 1.2))
+        self.assertIsNone(parse_anthropic_headers({}, 'requests'))
+    
+    def test_rate_limit_pauses_bucket(self):
+        """Test de la suspension du seau après une erreur 429."""
+        self.assertEqual(parse_retry_after({'retry-after-ms': '1500'}), 1.5)
+        self.assertEqual(parse_retry_after({'retry-after': '20'}), 20.0)
+        self.assertIsNone(parse_retry_after(None))
+        
+        bucket = TokenBucket()
+        bucket.record_rate_limit(0.05)
+        self.assertEqual(bucket._tokens, 0)
+        asyncio.run(bucket.acquire(10))
+        self.assertIsNone(bucket._reset_at)
+
+class TestSplitCode(unittest.TestCase):
+    """Tests unitaires pour le découpage des fichiers volumineux."""
+    
+    def setUp(self):
+        """Initialisation avant chaque test."""
+        self.code = "import os\n\n" + "".join(
+            f"def function_{i}():\n    return {i}\n\n" for i in range(40)
+        )
+    
+    def test_small_file_is_not_split(self):
+        """Test d'un fichier tenant dans le budget."""
+        self.assertEqual(split_code(self.code, "module.py"), [self.code])
+    
+    def test_split_on_top_level_definitions(self):
+        """Test du découpage d'un module Python selon ses définitions."""
+        chunks = split_code(self.code, "module.py", max_tokens=50)
+        self.assertGreater(len(chunks), 1)
+        self.assertEqual("".join(chunks), self.code)
+        for chunk in chunks[1:]:
+            self.assertTrue(chunk.startswith("def function_"))
+        for chunk in chunks:
+            self.assertLessEqual(estimate_tokens(chunk), 50)
+    
+    def test_compact_code(self):
+        """Test du retrait des espaces superflus avant l'envoi du code."""
+        self.assertEqual(compact_code("x = 1   \n  \n\n\n\ty = 2\t\n"), "x = 1\n\n\ty = 2\n")
+    
+    def test_truncate_tokens(self):
+        """Test de la troncature d'un texte à un budget de jetons."""
+        text = "Analyse détaillée du fichier. " * 50
+        truncated = truncate_tokens(text, 20)
+        self.assertTrue(text.startswith(truncated))
+        self.assertLessEqual(estimate_tokens(truncated), 21)
+        self.assertEqual(truncate_tokens("court", 20), "court")
+
+class TestDetectLanguage(unittest.TestCase):
+    """Tests unitaires pour la détection du langage d'un fichier."""
+    
+    def test_detect_language(self):
+        """Test de la détection à partir de l'extension."""
+        self.assertEqual(detect_language("src/app.py"), "Python")
+        self.assertEqual(detect_language("Component.TSX"), "TypeScript React")
+        self.assertEqual(detect_language("archive.tar.json"), "JSON")
+        self.assertEqual(detect_language("notes.txt"), "Code")
+        self.assertEqual(detect_language("dir/.py"), "Code")
+
+class TestFileScanner(TmpPathTestCase):
+    """Tests unitaires pour le scanner de fichiers."""
+    
+    def test_iter_files_skips_ignored_directories(self):
+        """Test du parcours qui ignore les dossiers exclus et les extensions non supportées."""
+        for relative_path in ("main.py", "src/app.JS", "src/notes.txt", "node_modules/lib.js", ".git/hook.py", "src/build/out.py"):
+            path = self.tmp_path / relative_path
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text("x = 1\n", encoding='utf-8')
+        
+        files = [path for path, _ in FileScanner().iter_files(str(self.tmp_path))]
+        self.assertEqual(
+            sorted(os.path.relpath(path, self.tmp_path) for path in files),
+            ["main.py", os.path.join("src", "app.JS")]
+        )
+    
+    def test_count_lines(self):
+        """Test du comptage des lignes, avec ou sans retour à la ligne final."""
+        cases = {"empty.py": b"", "trailing.py": b"a\nb\n", "no_trailing.py": b"a\nb\nc", "crlf.py": b"a\r\nb"}
+        for name, content in cases.items():
+            (self.tmp_path / name).write_bytes(content)
+        # Blocs de deux octets: les fins de ligne tombent à cheval sur les blocs
+        with mock.patch('utils.file_scanner.LINE_COUNT_CHUNK_SIZE', 2):
+            counts = {name: _count_lines(str(self.tmp_path / name)) for name in cases}
+        self.assertEqual(counts, {"empty.py": 0, "trailing.py": 2, "no_trailing.py": 3, "crlf.py": 2})
+    
+    def test_stats_many(self):
+        """Test des statistiques de plusieurs fichiers, dans l'ordre reçu."""
+        (self.tmp_path / "a.py").write_text("x = 1\ny = 2\n", encoding='utf-8')
+        (self.tmp_path / "b.md").write_text("# Titre", encoding='utf-8')
+        scanner = FileScanner()
+        
+        stats = scanner.stats_many([
+            str(self.tmp_path / "b.md"),
+            (str(self.tmp_path / "a.py"), os.stat(self.tmp_path / "a.py")),
+            str(self.tmp_path / "absent.py")
+        ], workers=2)
+        
+        self.assertEqual([(s['name'], s['type'], s['line_count']) for s in stats[:2]],
+                         [("b.md", "markdown", 1), ("a.py", "python", 2)])
+        self.assertEqual(stats[1]['size'], len("x = 1\ny = 2\n"))
+        self.assertIsNone(stats[2])
+
+class TestReportTimestamp(unittest.TestCase):
+    """Tests unitaires pour la date des rapports."""
+    
+    def test_timestamp_cached_per_second(self):
+        """Test du formatage unique de la date pour une même seconde."""
+        with mock.patch('utils.timestamps.time.time', return_value=1700000000.2):
+            first = report_timestamp()
+            with mock.patch('utils.timestamps.time.strftime') as strftime:
+                self.assertEqual(report_timestamp(), first)
+                strftime.assert_not_called()
+        self.assertRegex(first, r'^\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}$')
+
+class TestIntegration(RecordedLLMTestCase):
+    """Tests d'intégration pour l'ensemble du système."""
+    
+    @pytest.fixture(scope="class", autouse=True)
+    @classmethod
+    def _create_test_dir(cls, tmp_path_factory):
+        """Copie le projet de test une seule fois pour toute la classe."""
+        cls.test_dir = copy_test_project(str(tmp_path_factory.mktemp("integration") / "proj"))
+    
+    @pytest.fixture(autouse=True)
+    def _use_agents(self, gemini_agent):
+        """Expose les agents partagés."""
+        self.gemini_agent = gemini_agent
+    
+    def setUp(self):
+        """Initialisation avant chaque test."""
+        super().setUp()
+        self.todo_file = str(self.tmp_path / "todos.json")
+        self.todo_manager = TodoManager(self.todo_file)
     
     def test_full_workflow(self):
         """Test du workflow complet."""
-        # Création d'un fichier de test
-        test_file = os.path.join(self.test_dir, "test.py")
-        with open(test_file, 'w') as f:
-            f.write("""
-def process_data(data):
-    result = []
-    for item in data:
-        result.append(item * 2)
-    return result
-""")
+        test_file = os.path.join(self.test_dir, "calculator.py")
+        with open(test_file, 'r', encoding='utf-8') as f:
+            code = f.read()
         
         # Analyse avec Gemini
-        suggestions = self.gemini_agent.suggest_refactoring(test_file)
+        suggestions = asyncio.run(self.gemini_agent.suggest_refactoring(code, CLAUDE_ANALYSIS, test_file))
         self.assertIsNotNone(suggestions)
         
         # Extraction des TODOs
@@ -215,28 +913,105 @@ def process_data(data):
         self.assertIn('by_priority', stats)
         self.assertIn('by_effort', stats)
 
-def run_tests():
-    """Exécute tous les tests."""
-    # Création de la suite de tests
-    suite = unittest.TestSuite()
+class TestHTMLExporter(TmpPathTestCase):
+    """Tests unitaires pour la conversion des rapports en HTML."""
     
-    # Ajout des tests
-    suite.addTest(unittest.makeSuite(TestGeminiAgent))
-    suite.addTest(unittest.makeSuite(TestTodoManager))
-    suite.addTest(unittest.makeSuite(TestIntegration))
+    def _write_reports(self, count: int) -> Path:
+        """Écrit `count` rapports Markdown dans un répertoire et le retourne."""
+        markdown_dir = self.tmp_path / "md"
+        markdown_dir.mkdir()
+        for index in range(count):
+            (markdown_dir / f"report_{index}.md").write_text(f"# Rapport {index}\n\n```python\nx = {index}\n```\n", encoding='utf-8')
+        return markdown_dir
     
-    # Exécution des tests
-    runner = unittest.TextTestRunner(verbosity=2)
-    result = runner.run(suite)
+    def test_batch_convert_external_css(self):
+        """Test de la feuille de style partagée, qui ne remplace pas un fichier existant."""
+        markdown_dir = self._write_reports(2)
+        exporter = HTMLExporter()
+        
+        # Par défaut, les pages restent autonomes
+        self.assertEqual(exporter.batch_convert(str(markdown_dir), str(self.tmp_path / "inline"), workers=1), 2)
+        self.assertFalse((self.tmp_path / "inline" / CSS_FILE_NAME).exists())
+        self.assertIn("<style>", (self.tmp_path / "inline" / "report_0.html").read_text(encoding='utf-8'))
+        
+        self.assertEqual(exporter.batch_convert(str(markdown_dir), str(self.tmp_path / "shared"), workers=1, external_css=True), 2)
+        self.assertEqual((self.tmp_path / "shared" / CSS_FILE_NAME).read_text(encoding='utf-8'), exporter.css_style)
+        self.assertIn(f'href="{CSS_FILE_NAME}"', (self.tmp_path / "shared" / "report_1.html").read_text(encoding='utf-8'))
+        
+        (markdown_dir / CSS_FILE_NAME).write_text("body { color: red; }", encoding='utf-8')
+        exporter.batch_convert(str(markdown_dir), workers=1, external_css=True)
+        self.assertEqual((markdown_dir / CSS_FILE_NAME).read_text(encoding='utf-8'), "body { color: red; }")
+        self.assertIn("<style>", (markdown_dir / "report_0.html").read_text(encoding='utf-8'))
     
-    # Affichage des résultats
-    print("\nRésultats des tests:")
-    print(f"Tests exécutés: {result.testsRun}")
-    print(f"Tests réussis: {result.testsRun - len(result.failures) - len(result.errors)}")
-    print(f"Tests échoués: {len(result.failures)}")
-    print(f"Tests avec erreurs: {len(result.errors)}")
+    def test_batch_convert_process_pool(self):
+        """Test de la conversion répartie sur un pool de processus."""
+        markdown_dir = self._write_reports(PARALLEL_MIN_FILES)
+        html_dir = self.tmp_path / "html"
+        self.assertEqual(HTMLExporter().batch_convert(str(markdown_dir), str(html_dir), workers=2), PARALLEL_MIN_FILES)
+        for index in range(PARALLEL_MIN_FILES):
+            self.assertIn(f"Rapport {index}", (html_dir / f"report_{index}.html").read_text(encoding='utf-8'))
+
+class TestLLMCodeAgent(TmpPathTestCase):
+    """Tests de l'orchestrateur, avec une analyse simulée."""
     
-    return result.wasSuccessful()
+    def setUp(self):
+        """Exécute le test dans son répertoire temporaire (fichier de tâches compris)."""
+        self.addCleanup(os.chdir, os.getcwd())
+        os.chdir(self.tmp_path)
+    
+    def _create_agent(self) -> LLMCodeAgent:
+        """Crée un orchestrateur sans agents LLM réels."""
+        with mock.patch.object(LLMCodeAgent, 'setup_agents'):
+            return LLMCodeAgent({'output_dir': str(self.tmp_path / "reports")})
+    
+    def test_same_name_files_keep_their_reports(self):
+        """Test de la réutilisation des rapports de deux fichiers de même nom dans des dossiers différents."""
+        project = self.tmp_path / "proj"
+        for directory in ("a", "b"):
+            (project / directory).mkdir(parents=True)
+            (project / directory / "utils.py").write_text(f"DIRECTORY = '{directory}'\n", encoding='utf-8')
+        
+        analyzed = []
+        async def fake_analyze_content(agent, code_content, file_path):
+            analyzed.append(file_path)
+            return f"# Analyse {file_path}\n", "review", "suggestions"
+        
+        with mock.patch.object(LLMCodeAgent, '_analyze_content', fake_analyze_content):
+            asyncio.run(self._create_agent().analyze_project(str(project)))
+            # Deuxième exécution: les fichiers inchangés reprennent leurs propres rapports
+            results = asyncio.run(self._create_agent().analyze_project(str(project)))
+        
+        self.assertEqual(len(analyzed), 2)
+        self.assertEqual(len(results), 2)
+        for result in results:
+            self.assertEqual(result['claude_analysis'], f"# Analyse {result['file']}\n")
+
+class TestCLI(TmpPathTestCase):
+    """Tests de la ligne de commande, exécutée dans le processus des tests."""
+    
+    def _run(self, *args: str):
+        """Exécute la commande et retourne (code de sortie, sortie d'erreur)."""
+        stderr = io.StringIO()
+        with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(stderr):
+            exit_code = main(list(args))
+        return exit_code, stderr.getvalue()
+    
+    def test_help(self):
+        """Test de l'aide de la commande."""
+        self.assertEqual(self._run('--help')[0], 0)
+    
+    def test_missing_project_path(self):
+        """Test d'un chemin de projet inexistant."""
+        exit_code, stderr = self._run(str(self.tmp_path / "absent"))
+        self.assertEqual(exit_code, 2)
+        self.assertIn("PROJECT_PATH", stderr)
+
+def run_tests() -> bool:
+    """
+    Exécute tous les tests avec pytest, répartis sur tous les cœurs (pytest-xdist).
+    Les arguments de la ligne de commande sont transmis à pytest.
+    """
+    return pytest.main([os.path.abspath(__file__), '-v', '-n', 'auto'] + sys.argv[1:]) == 0
 
 if __name__ == '__main__':
     success = run_tests()
@@ -0,0 +1,9 @@
+def calculate_total(items):
+    total = 0
+    for item in items:
+        total += item.price
+    return total
+
+class Item:
+    def __init__(self, price):
+        self.price = price
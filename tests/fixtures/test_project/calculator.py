@@ -0,0 +1,22 @@
+def process_data(data):
+    result = []
+    for item in data:
+        result.append(item * 2)
+    return result
+
+
+def divide(a, b):
+    return a / b
+
+
+class Calculator:
+    def __init__(self):
+        self.history = []
+
+    def add(self, a, b):
+        result = a + b
+        self.history.append(result)
+        return result
+
+    def average(self, values):
+        return sum(values) / len(values)
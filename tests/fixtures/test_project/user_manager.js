@@ -0,0 +1,16 @@
+var users = [];
+
+function addUser(name, email) {
+    users.push({name: name, email: email});
+}
+
+function findUser(name) {
+    for (var i = 0; i < users.length; i++) {
+        if (users[i].name == name) {
+            return users[i];
+        }
+    }
+    return null;
+}
+
+module.exports = { addUser, findUser };
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Module d'exécution des analyses via les API Batch d'OpenAI et d'Anthropic.
+Les requêtes d'un projet entier sont soumises en un seul lot, traitées de manière
+différée par le fournisseur et facturées environ deux fois moins cher.
+"""
+
+import os
+import io
+import time
+import asyncio
+import logging
+from typing import Callable, Dict, List, Optional
+import orjson
+
+from .llm_cache import LLMCache
+
+logger = logging.getLogger('llm_code_agent.batch_runner')
+
+BATCH_POLL_INTERVAL = float(os.getenv('LLM_BATCH_POLL_INTERVAL', '30'))
+
+OPENAI_BATCH_ENDPOINT = "/v1/chat/completions"
+OPENAI_TERMINAL_STATUSES = {'completed', 'failed', 'expired', 'cancelled'}
+
+def submit_anthropic_batch(client, requests: Dict[str, Dict]) -> str:
+    """
+    Soumet un lot de requêtes à l'API Message Batches d'Anthropic.
+
+    Args:
+        client: Client `anthropic.Anthropic`
+        requests (Dict[str, Dict]): Paramètres `messages.create` indexés par identifiant
+
+    Returns:
+        str: Identifiant du lot
+    """
+    batch = client.messages.batches.create(requests=[
+        {"custom_id": custom_id, "params": params}
+        for custom_id, params in requests.items()
+    ])
+    logger.info("Lot Anthropic %s soumis (%d requêtes)", batch.id, len(requests))
+    return batch.id
+
+def wait_anthropic_batch(client, batch_id: str, poll_interval: float = BATCH_POLL_INTERVAL) -> Dict[str, str]:
+    """
+    Attend la fin d'un lot Anthropic et récupère les réponses.
+
+    Args:
+        client: Client `anthropic.Anthropic`
+        batch_id (str): Identifiant du lot
+        poll_interval (float): Intervalle entre deux vérifications, en secondes
+
+    Returns:
+        Dict[str, str]: Texte des réponses réussies, indexé par identifiant de requête
+    """
+    while client.messages.batches.retrieve(batch_id).processing_status != "ended":
+        time.sleep(poll_interval)
+
+    results = {}
+    for entry in client.messages.batches.results(batch_id):
+        if entry.result.type == "succeeded":
+            results[entry.custom_id] = entry.result.message.content[0].text
+        else:
+            logger.warning("Requête %s du lot %s en échec: %s", entry.custom_id, batch_id, entry.result.type)
+    return results
+
+def submit_openai_batch(client, requests: Dict[str, Dict]) -> str:
+    """
+    Soumet un lot de requêtes à l'API Batch d'OpenAI.
+
+    Args:
+        client: Client `openai.OpenAI`
+        requests (Dict[str, Dict]): Paramètres `chat.completions.create` indexés par identifiant
+
+    Returns:
+        str: Identifiant du lot
+    """
+    lines = [
+        orjson.dumps({"custom_id": custom_id, "method": "POST", "url": OPENAI_BATCH_ENDPOINT, "body": body})
+        for custom_id, body in requests.items()
+    ]
+    batch_file = client.files.create(
+        file=("batch.jsonl", io.BytesIO(b"\n".join(lines))),
+        purpose="batch"
+    )
+    batch = client.batches.create(
+        input_file_id=batch_file.id,
+        endpoint=OPENAI_BATCH_ENDPOINT,
+        completion_window="24h"
+    )
+    logger.info("Lot OpenAI %s soumis (%d requêtes)", batch.id, len(requests))
+    return batch.id
+
+def wait_openai_batch(client, batch_id: str, poll_interval: float = BATCH_POLL_INTERVAL) -> Dict[str, str]:
+    """
+    Attend la fin d'un lot OpenAI et récupère les réponses.
+
+    Args:
+        client: Client `openai.OpenAI`
+        batch_id (str): Identifiant du lot
+        poll_interval (float): Intervalle entre deux vérifications, en secondes
+
+    Returns:
+        Dict[str, str]: Texte des réponses réussies, indexé par identifiant de requête
+    """
+    batch = client.batches.retrieve(batch_id)
+    while batch.status not in OPENAI_TERMINAL_STATUSES:
+        time.sleep(poll_interval)
+        batch = client.batches.retrieve(batch_id)
+
+    if batch.status != 'completed' or not batch.output_file_id:
+        raise RuntimeError(f"Lot OpenAI {batch_id} terminé avec le statut {batch.status}")
+
+    results = {}
+    for line in client.files.content(batch.output_file_id).text.splitlines():
+        record = orjson.loads(line)
+        response = record.get('response') or {}
+        if record.get('error') or response.get('status_code') != 200:
+            logger.warning("Requête %s du lot %s en échec", record['custom_id'], batch_id)
+            continue
+        results[record['custom_id']] = response['body']['choices'][0]['message']['content']
+    return results
+
+async def complete_batch(provider: str,
+                         model: str,
+                         prompts: List[str],
+                         submit: Callable[[Dict[str, str]], str],
+                         wait: Callable[[str], Dict[str, str]],
+                         cache: Optional[LLMCache] = None) -> List[Optional[str]]:
+    """
+    Complète une liste de prompts en un seul lot, en servant d'abord ceux déjà en cache.
+
+    Args:
+        provider (str): Fournisseur de l'API, utilisé pour la clé de cache
+        model (str): Modèle utilisé, utilisé pour la clé de cache
+        prompts (List[str]): Prompts à compléter
+        submit (Callable): Soumet un lot `{identifiant: prompt}` et retourne son identifiant
+        wait (Callable): Attend la fin d'un lot et retourne `{identifiant: réponse}`
+        cache (LLMCache, optional): Cache des réponses (aucun cache si None)
+
+    Returns:
+        List[Optional[str]]: Réponses dans l'ordre des prompts (None pour une requête en échec)
+    """
+    responses: List[Optional[str]] = [None] * len(prompts)
+    pending: Dict[str, int] = {}
+
+    for index, prompt in enumerate(prompts):
+        if cache is not None:
+            cached = cache.get(LLMCache.make_key(provider, model, prompt))
+            if cached is not None:
+                responses[index] = cached
+                continue
+        pending[f"req-{index}"] = index
+
+    if not pending:
+        return responses
+
+    logger.info("%d/%d requêtes %s envoyées en lot", len(pending), len(prompts), provider)
+    batch_id = await asyncio.to_thread(submit, {custom_id: prompts[index] for custom_id, index in pending.items()})
+    outputs = await asyncio.to_thread(wait, batch_id)
+
+    for custom_id, index in pending.items():
+        text = outputs.get(custom_id)
+        if text is None:
+            continue
+        responses[index] = text
+        if cache is not None:
+            cache.set(LLMCache.make_key(provider, model, prompts[index]), text)
+
+    return responses
@@ -7,63 +7,41 @@ Ce module est responsable de la validation du code et des suggestions d'amélior
 """
 
 import os
+import re
+import asyncio
 import logging
-import time
-import json
-from openai import OpenAI
+from functools import cached_property
+from typing import Dict, List, Optional, Tuple
+from openai import (
+    AsyncOpenAI, DEFAULT_CONNECTION_LIMITS, DefaultAsyncHttpxClient, Timeout, OpenAI,
+    APIConnectionError, APITimeoutError, AuthenticationError, BadRequestError,
+    InternalServerError, PermissionDeniedError, RateLimitError
+)
+from .llm_cache import cached_call, resolve_cache
+from .retry import llm_retry
+from .http_clients import (
+    DEFAULT_MAX_CONNECTIONS, HTTP_CONNECT_TIMEOUT_SECONDS, HTTP_TIMEOUT_SECONDS, close_on_loop_shutdown, http_limits
+)
+from .rate_limiter import get_rate_limiter, get_request_limiter, parse_openai_headers, parse_retry_after
+from .tokens import estimate_tokens, truncate_tokens
+from .languages import detect_language
+from .timestamps import report_timestamp
+from .batch_runner import complete_batch, submit_openai_batch, wait_openai_batch
 
 logger = logging.getLogger('llm_code_agent.chatgpt_agent')
 
-class ChatGPTAgent:
-    """
-    Agent de validation et de suggestion de code utilisant GPT-4/GPT-4o d'OpenAI.
-    """
-    
-    def __init__(self):
-        """Initialise l'agent ChatGPT avec la configuration nécessaire."""
-        self.api_key = os.getenv('OPENAI_API_KEY')
-        if not self.api_key:
-            logger.error("Clé API OpenAI non trouvée. Veuillez définir OPENAI_API_KEY dans le fichier .env")
-            raise ValueError("Clé API OpenAI manquante")
-        
-        self.client = OpenAI(api_key=self.api_key)
-        self.model = "gpt-4o"  # Utilisation de GPT-4o par défaut, peut être modifié selon disponibilité
-        logger.info(f"Agent ChatGPT initialisé avec le modèle {self.model}")
-    
-    async def analyze_code(self, code_content: str, claude_analysis: str, file_path: str) -> str:
-        """
-        Valide le code et propose des suggestions d'amélioration en s'appuyant sur l'analyse de Claude.
-        
-        Args:
-            code_content (str): Contenu du code à analyser
-            claude_analysis (str): Analyse préalable réalisée par Claude
-            file_path (str): Chemin du fichier analysé
-            
-        Returns:
-            str: Rapport de validation et suggestions au format Markdown
-        """
-        file_name = os.path.basename(file_path)
-        file_extension = os.path.splitext(file_name)[1].lower()
-        
-        logger.info(f"Validation du fichier {file_name} avec ChatGPT")
-        
-        # Détermination du langage de programmation
-        language_map = {
-            '.py': 'Python',
-            '.js': 'JavaScript',
-            '.ts': 'TypeScript',
-            '.tsx': 'TypeScript React',
-            '.jsx': 'JavaScript React',
-            '.html': 'HTML',
-            '.css': 'CSS',
-            '.json': 'JSON',
-            '.md': 'Markdown'
-        }
-        
-        language = language_map.get(file_extension, 'Code')
-        
-        # Construction du prompt pour ChatGPT
-        prompt = f"""
+# Nombre maximal de validations simultanées dans analyze_many
+DEFAULT_CONCURRENCY = 8
+
+# Part de l'analyse de Claude reprise dans le prompt, en jetons
+CLAUDE_ANALYSIS_MAX_TOKENS = 500
+
+# Bornes du nombre de jetons de réponse, ajusté à la taille du prompt
+MIN_OUTPUT_TOKENS = 1500
+MAX_OUTPUT_TOKENS = 4000
+
+# Prompt de validation, complété pour chaque fichier par _build_prompt
+PROMPT_TEMPLATE = """
 # Validation et suggestions de code {language}
 
 Je vais te fournir le contenu d'un fichier {language} ainsi qu'une analyse préalable réalisée par Claude 3.
@@ -98,70 +76,295 @@ Utilise des blocs de code pour illustrer tes suggestions.
 {code_content}
 ```
 
-## Voici l'analyse préalable de Claude:
-{claude_analysis[:2000]}... (analyse tronquée pour la longueur)
+## Voici les problèmes relevés par Claude lors de son analyse préalable:
+{claude_analysis}
 
 Merci de fournir une validation et des suggestions détaillées et concrètes.
 """
 
-        # Appel à l'API OpenAI
-        max_retries = 3
-        retry_delay = 5
-        
-        for attempt in range(max_retries):
-            try:
-                response = self.client.chat.completions.create(
-                    model=self.model,
-                    max_tokens=4000,
-                    temperature=0.2,
-                    messages=[
-                        {"role": "system", "content": "Tu es un expert en développement logiciel spécialisé dans la validation de code et les suggestions d'amélioration. Tu fournis des analyses précises et des solutions concrètes avec des exemples de code."},
-                        {"role": "user", "content": prompt}
-                    ]
-                )
-                
-                review = response.choices[0].message.content
-                
-                # Ajout d'un en-tête au rapport
-                header = f"""# Validation et suggestions pour {file_name} par ChatGPT
+# Expressions de découpage des rapports de validation (extract_code_suggestions)
+_SECTION_RE = re.compile(r'^##.*(?:suggestion|problème|amélioration).*$', re.IGNORECASE | re.MULTILINE)
+_CODE_BLOCK_RE = re.compile(r'^```[^\n]*\n(.*?)^```', re.MULTILINE | re.DOTALL)
+_PRIORITY_RE = re.compile(
+    r'(?:priorité|priority)[^\n]*?\b(critique|critical|élevée?|high|moyenne?|medium|faible|low)\b',
+    re.IGNORECASE
+)
+
+PRIORITY_LEVELS = {
+    'critique': 'Critique', 'critical': 'Critique',
+    'élevé': 'Élevé', 'élevée': 'Élevé', 'high': 'Élevé',
+    'moyen': 'Moyen', 'moyenne': 'Moyen', 'medium': 'Moyen',
+    'faible': 'Faible', 'low': 'Faible'
+}
+
+
+class ChatGPTAgent:
+    """
+    Agent de validation et de suggestion de code utilisant GPT-4/GPT-4o d'OpenAI.
+    """
+    
+    def __init__(self, http_client=None, cache_path: Optional[str] = None, use_cache: bool = True,
+                 max_connections: int = DEFAULT_MAX_CONNECTIONS):
+        """
+        Initialise l'agent ChatGPT avec la configuration nécessaire.
+        
+        Les validations passent par un client asynchrone; le client synchrone ne sert
+        qu'aux appels de l'API Batch, exécutés dans des threads.
+        
+        Args:
+            http_client (httpx.Client, optional): Client HTTP partagé (pool de connexions) du client synchrone
+            cache_path (str, optional): Base SQLite dédiée au cache des réponses (cache partagé sinon)
+            use_cache (bool): False pour interroger systématiquement l'API
+            max_connections (int): Taille du pool de connexions des clients asynchrones
+        """
+        self.api_key = os.getenv('OPENAI_API_KEY')
+        if not self.api_key:
+            logger.error("Clé API OpenAI non trouvée. Veuillez définir OPENAI_API_KEY dans le fichier .env")
+            raise ValueError("Clé API OpenAI manquante")
+        
+        self._http_client = http_client
+        self._max_connections = max_connections
+        self._async_client: Optional[AsyncOpenAI] = None
+        self._async_client_loop = None
+        self._async_client_closer: Optional[asyncio.Task] = None
+        self.model = "gpt-4o"  # Utilisation de GPT-4o par défaut, peut être modifié selon disponibilité
+        self.cache = resolve_cache(cache_path, use_cache)
+        logger.info("Agent ChatGPT initialisé avec le modèle %s", self.model)
+    
+    @cached_property
+    def client(self) -> OpenAI:
+        """Client synchrone de l'API Batch, créé au premier appel (les validations n'en ont pas besoin)."""
+        return OpenAI(api_key=self.api_key, http_client=self._http_client)
+    
+    def _get_async_client(self) -> AsyncOpenAI:
+        """
+        Retourne le client asynchrone de la boucle courante (ses connexions sont liées à la
+        boucle); il est fermé à l'arrêt de la boucle.
+        """
+        loop = asyncio.get_running_loop()
+        if self._async_client is None or self._async_client_loop is not loop:
+            # Les nouvelles tentatives sont gérées par llm_retry (backoff avec gigue), pas par le SDK
+            self._async_client = AsyncOpenAI(
+                api_key=self.api_key,
+                http_client=DefaultAsyncHttpxClient(
+                    http2=True,
+                    # Timeout et Limits du httpx sur lequel repose le SDK
+                    timeout=Timeout(HTTP_TIMEOUT_SECONDS, connect=HTTP_CONNECT_TIMEOUT_SECONDS),
+                    limits=http_limits(self._max_connections, type(DEFAULT_CONNECTION_LIMITS))
+                ),
+                max_retries=0
+            )
+            self._async_client_loop = loop
+            self._async_client_closer = close_on_loop_shutdown(self._async_client.close)
+        return self._async_client
+    
+    @cached_call("openai")
+    @llm_retry(RateLimitError, APITimeoutError, APIConnectionError, InternalServerError)
+    async def _complete(self, prompt: str) -> str:
+        """
+        Envoie un prompt à ChatGPT et retourne le texte de la réponse.
+        
+        Args:
+            prompt (str): Prompt à envoyer
+            
+        Returns:
+            str: Texte généré par le modèle
+        """
+        request_limiter = get_request_limiter("openai")
+        rate_limiter = get_rate_limiter("openai")
+        await request_limiter.acquire(1)
+        await rate_limiter.acquire(estimate_tokens(prompt))
+        
+        # Réponse en flux: le délai de lecture s'applique entre deux fragments et non à
+        # la génération entière, une connexion bloquée est donc détectée (et réessayée) au plus tôt
+        try:
+            stream = await self._get_async_client().chat.completions.create(
+                **self._request_params(prompt),
+                stream=True
+            )
+        except RateLimitError as e:
+            # Les autres appels à OpenAI attendent la fin de la pause avant de repartir
+            rate_limiter.record_rate_limit(parse_retry_after(e.response.headers))
+            raise
+        for limiter, resource in ((rate_limiter, 'tokens'), (request_limiter, 'requests')):
+            limits = parse_openai_headers(stream.response.headers, resource)
+            if limits is not None:
+                limiter.update(*limits)
+        
+        parts = []
+        async for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                parts.append(chunk.choices[0].delta.content)
+        return ''.join(parts)
+    
+    def _request_params(self, prompt: str) -> Dict:
+        """
+        Construit les paramètres d'un appel `chat.completions.create` (partagés avec l'API Batch).
+        
+        Args:
+            prompt (str): Prompt à envoyer
+            
+        Returns:
+            Dict: Paramètres de la requête
+        """
+        return {
+            'model': self.model,
+            # Un petit fichier n'appelle pas une longue réponse; la réservation de jetons
+            # comptée par OpenAI dans la limite de débit reste ainsi proportionnée
+            'max_tokens': min(MAX_OUTPUT_TOKENS, max(MIN_OUTPUT_TOKENS, estimate_tokens(prompt))),
+            'temperature': 0.2,
+            'messages': [
+                {"role": "system", "content": "Tu es un expert en développement logiciel spécialisé dans la validation de code et les suggestions d'amélioration. Tu fournis des analyses précises et des solutions concrètes avec des exemples de code."},
+                {"role": "user", "content": prompt}
+            ]
+        }
+    
+    def _build_prompt(self, code_content: str, claude_analysis: str, file_path: str) -> str:
+        """
+        Construit le prompt de validation d'un fichier.
+        
+        Args:
+            code_content (str): Contenu du code à analyser
+            claude_analysis (str): Analyse préalable de Claude, résumée par ClaudeAgent.summarize
+            file_path (str): Chemin du fichier analysé
+            
+        Returns:
+            str: Prompt à envoyer à ChatGPT
+        """
+        file_name = os.path.basename(file_path)
+        language = detect_language(file_path)
+        
+        return PROMPT_TEMPLATE.format(
+            language=language,
+            file_name=file_name,
+            code_content=code_content,
+            claude_analysis=truncate_tokens(claude_analysis, CLAUDE_ANALYSIS_MAX_TOKENS)
+        )
+    
+    def _create_report_header(self, file_name: str, file_path: str) -> str:
+        """Crée l'en-tête du rapport de validation."""
+        return f"""# Validation et suggestions pour {file_name} par ChatGPT
 
 *Ce rapport a été généré automatiquement par l'agent d'analyse de code multi-LLM.*
 
 **Fichier analysé:** {file_path}  
-**Date d'analyse:** {time.strftime('%Y-%m-%d %H:%M:%S')}  
+**Date d'analyse:** {report_timestamp()}  
 **Modèle utilisé:** {self.model}
 
 ---
 
 """
-                
-                full_review = header + review
-                
-                logger.info(f"Validation de {file_name} terminée avec succès")
-                return full_review
-                
-            except Exception as e:
-                logger.warning(f"Tentative {attempt+1}/{max_retries} échouée: {str(e)}")
-                if attempt < max_retries - 1:
-                    logger.info(f"Nouvelle tentative dans {retry_delay} secondes...")
-                    time.sleep(retry_delay)
-                    retry_delay *= 2  # Backoff exponentiel
-                else:
-                    logger.error(f"Échec de la validation après {max_retries} tentatives")
-                    return f"""# Erreur de validation pour {file_name}
+    
+    def _create_error_report(self, file_name: str, error: Exception) -> str:
+        """Crée le rapport retourné lorsque la validation a échoué."""
+        return f"""# Erreur de validation pour {file_name}
 
 Une erreur s'est produite lors de la validation de ce fichier avec ChatGPT:
 
 ```
-{str(e)}
+{str(error)}
 ```
 
 Veuillez vérifier votre connexion internet et votre clé API, puis réessayer.
 """
+    
+    async def analyze_code(self, code_content: str, claude_analysis: str, file_path: str) -> str:
+        """
+        Valide le code et propose des suggestions d'amélioration en s'appuyant sur l'analyse de Claude.
+        
+        Args:
+            code_content (str): Contenu du code à analyser
+            claude_analysis (str): Analyse préalable de Claude, résumée par ClaudeAgent.summarize
+            file_path (str): Chemin du fichier analysé
+            
+        Returns:
+            str: Rapport de validation et suggestions au format Markdown
+        """
+        file_name = os.path.basename(file_path)
+        
+        logger.debug("Validation du fichier %s avec ChatGPT", file_name)
+        
+        prompt = self._build_prompt(code_content, claude_analysis, file_path)
+        
+        # Appel à l'API OpenAI (les erreurs transitoires sont réessayées par _complete)
+        try:
+            review = await self._complete(prompt)
+        except (AuthenticationError, PermissionDeniedError, BadRequestError) as e:
+            # Erreur définitive (clé invalide, requête refusée): échec immédiat, sans nouvelle tentative
+            logger.error("Requête refusée par OpenAI pour %s: %s", file_name, e)
+            return self._create_error_report(file_name, e)
+        except Exception as e:
+            logger.error("Échec de la validation de %s: %s", file_name, e)
+            return self._create_error_report(file_name, e)
+        
+        logger.debug("Validation de %s terminée avec succès", file_name)
+        return f"{self._create_report_header(file_name, file_path)}{review}"
 
-    def extract_code_suggestions(self, review_content):
+    async def analyze_many(self, files: List[Tuple[str, str, str]], concurrency: int = DEFAULT_CONCURRENCY) -> List[str]:
+        """
+        Valide plusieurs fichiers en parallèle, au plus `concurrency` requêtes à la fois.
+        
+        Args:
+            files (List[Tuple[str, str, str]]): Triplets (contenu du code, analyse de Claude, chemin du fichier)
+            concurrency (int): Nombre maximal de validations simultanées
+            
+        Returns:
+            List[str]: Rapports de validation au format Markdown, dans l'ordre des fichiers
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+        
+        async def analyze_one(code_content: str, claude_analysis: str, file_path: str) -> str:
+            async with semaphore:
+                return await self.analyze_code(code_content, claude_analysis, file_path)
+        
+        results = await asyncio.gather(
+            *(analyze_one(*file) for file in files),
+            return_exceptions=True
+        )
+        return [
+            self._create_error_report(os.path.basename(file_path), result) if isinstance(result, Exception) else result
+            for (_, _, file_path), result in zip(files, results)
+        ]
+
+    async def analyze_batch(self, files: List[Tuple[str, str, str]]) -> List[str]:
+        """
+        Valide plusieurs fichiers en un seul lot via l'API Batch d'OpenAI.
+        Le traitement est différé mais coûte environ deux fois moins cher.
+        
+        Args:
+            files (List[Tuple[str, str, str]]): Triplets (contenu du code, analyse de Claude, chemin du fichier)
+            
+        Returns:
+            List[str]: Rapports de validation au format Markdown, dans l'ordre des fichiers
+        """
+        prompts = [
+            self._build_prompt(code_content, claude_analysis, file_path)
+            for code_content, claude_analysis, file_path in files
+        ]
+        
+        reviews = await complete_batch(
+            "openai", self.model, prompts,
+            submit=lambda requests: submit_openai_batch(
+                self.client, {custom_id: self._request_params(prompt) for custom_id, prompt in requests.items()}
+            ),
+            wait=lambda batch_id: wait_openai_batch(self.client, batch_id),
+            cache=self.cache
+        )
+        
+        reports = []
+        for (_, _, file_path), review in zip(files, reviews):
+            file_name = os.path.basename(file_path)
+            if review is None:
+                reports.append(self._create_error_report(file_name, "Requête en échec dans le lot OpenAI"))
+            else:
+                reports.append(f"{self._create_report_header(file_name, file_path)}{review}")
+        return reports
+
+    def extract_code_suggestions(self, review_content: str) -> List[Dict]:
         """
         Extrait les suggestions de code concrètes à partir du rapport de validation.
+        Chaque titre de suggestion ouvre une section; seules les sections contenant
+        au moins un bloc de code sont retenues.
         
         Args:
             review_content (str): Contenu du rapport de validation
@@ -171,55 +374,21 @@ Veuillez vérifier votre connexion internet et votre clé API, puis réessayer.
         """
         suggestions = []
         
-        # Analyse simple basée sur les titres et les blocs de code
-        lines = review_content.split('\n')
-        current_suggestion = None
-        current_priority = "Moyen"  # Priorité par défaut
-        
-        for line in lines:
-            # Détection des titres qui pourraient indiquer une suggestion
-            if line.startswith('##') and ('suggestion' in line.lower() or 'problème' in line.lower() or 'amélioration' in line.lower()):
-                # Sauvegarder la suggestion précédente si elle existe
-                if current_suggestion:
-                    suggestions.append({
-                        'description': current_suggestion['title'],
-                        'code': current_suggestion['code'],
-                        'priority': current_priority
-                    })
-                
-                # Commencer une nouvelle suggestion
-                current_suggestion = {
-                    'title': line.lstrip('#').strip(),
-                    'code': ''
-                }
-                
-            # Détection de la priorité
-            elif current_suggestion and ('priorité' in line.lower() or 'priority' in line.lower()):
-                if 'critique' in line.lower() or 'critical' in line.lower():
-                    current_priority = "Critique"
-                elif 'élevé' in line.lower() or 'high' in line.lower():
-                    current_priority = "Élevé"
-                elif 'moyen' in line.lower() or 'medium' in line.lower():
-                    current_priority = "Moyen"
-                elif 'faible' in line.lower() or 'low' in line.lower():
-                    current_priority = "Faible"
+        titles = list(_SECTION_RE.finditer(review_content))
+        for index, title in enumerate(titles):
+            section_end = titles[index + 1].start() if index + 1 < len(titles) else len(review_content)
+            section = review_content[title.end():section_end]
             
-            # Capture des blocs de code
-            elif current_suggestion and line.startswith('```'):
-                in_code_block = not in_code_block if 'in_code_block' in locals() else True
-                if not in_code_block and current_suggestion['code']:
-                    current_suggestion['code'] = current_suggestion['code'].strip()
+            code_blocks = [block.strip() for block in _CODE_BLOCK_RE.findall(section)]
+            if not any(code_blocks):
+                continue
             
-            # Ajout du contenu au bloc de code
-            elif current_suggestion and 'in_code_block' in locals() and in_code_block:
-                current_suggestion['code'] += line + '\n'
-        
-        # Ajouter la dernière suggestion si elle existe
-        if current_suggestion and current_suggestion['code']:
+            # Priorité par défaut si la section n'en indique pas
+            priority = _PRIORITY_RE.search(section)
             suggestions.append({
-                'description': current_suggestion['title'],
-                'code': current_suggestion['code'].strip(),
-                'priority': current_priority
+                'description': title.group().lstrip('#').strip(),
+                'code': '\n\n'.join(block for block in code_blocks if block),
+                'priority': PRIORITY_LEVELS[priority.group(1).lower()] if priority else "Moyen"
             })
         
         return suggestions
@@ -240,7 +409,7 @@ if __name__ == "__main__":
             mock_claude_analysis = f"# Analyse de {test_file}\n\nCe fichier présente quelques problèmes potentiels..."
             
             agent = ChatGPTAgent()
-            review = agent.analyze_code(code, mock_claude_analysis, test_file)
+            review = asyncio.run(agent.analyze_code(code, mock_claude_analysis, test_file))
             
             print(review[:500] + "...\n[Validation tronquée pour l'affichage]")
         else:
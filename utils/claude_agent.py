@@ -7,65 +7,33 @@ Ce module est responsable de l'analyse initiale du code source.
 """
 
 import os
+import re
+import asyncio
 import logging
-import time
-from anthropic import Anthropic
+from functools import cached_property
+from typing import Dict, List, Optional, Tuple
+from anthropic import (
+    Anthropic, AsyncAnthropic, DEFAULT_CONNECTION_LIMITS, DefaultAsyncHttpxClient, Timeout,
+    APIConnectionError, APITimeoutError, InternalServerError, RateLimitError
+)
+from .llm_cache import cached_call, resolve_cache
+from .retry import llm_retry
+from .http_clients import (
+    DEFAULT_MAX_CONNECTIONS, HTTP_CONNECT_TIMEOUT_SECONDS, HTTP_TIMEOUT_SECONDS, close_on_loop_shutdown, http_limits
+)
+from .rate_limiter import get_rate_limiter, get_request_limiter, parse_anthropic_headers, parse_retry_after
+from .tokens import estimate_tokens
+from .languages import detect_language
+from .timestamps import report_timestamp
+from .batch_runner import complete_batch, submit_anthropic_batch, wait_anthropic_batch
 
 logger = logging.getLogger('llm_code_agent.claude_agent')
 
-class ClaudeAgent:
-    """
-    Agent d'analyse de code utilisant Claude 3 d'Anthropic.
-    """
-    
-    def __init__(self):
-        """Initialise l'agent Claude avec la configuration nécessaire."""
-        self.api_key = os.getenv('ANTHROPIC_API_KEY')
-        if not self.api_key:
-            logger.error("Clé API Anthropic non trouvée. Veuillez définir ANTHROPIC_API_KEY dans le fichier .env")
-            raise ValueError("Clé API Anthropic manquante")
-        
-        self.client = Anthropic(api_key=self.api_key)
-        self.model = "claude-3-opus-20240229"
-        logger.info(f"Agent Claude initialisé avec le modèle {self.model}")
-    
-    async def analyze_code(self, code_content: str, file_path: str) -> str:
-        """
-        Analyse le code avec Claude 3.
-        
-        Args:
-            code_content (str): Contenu du code à analyser
-            file_path (str): Chemin du fichier analysé
-            
-        Returns:
-            str: Rapport d'analyse au format Markdown
-        """
-        file_name = os.path.basename(file_path)
-        file_extension = os.path.splitext(file_name)[1].lower()
-        
-        logger.info(f"Analyse du fichier {file_name} avec Claude")
-        
-        # Détermination du langage de programmation
-        language_map = {
-            '.py': 'Python',
-            '.js': 'JavaScript',
-            '.ts': 'TypeScript',
-            '.tsx': 'TypeScript React',
-            '.jsx': 'JavaScript React',
-            '.html': 'HTML',
-            '.css': 'CSS',
-            '.json': 'JSON',
-            '.md': 'Markdown'
-        }
-        
-        language = language_map.get(file_extension, 'Code')
-        
-        # Construction du prompt pour Claude
-        prompt = f"""
-# Analyse de code {language}
+# Instructions communes à tous les fichiers. Elles forment le préfixe du prompt mis en
+# cache par Anthropic (cache_control) et ne doivent donc dépendre d'aucun fichier.
+ANALYSIS_INSTRUCTIONS = """Tu es un expert en analyse de code et en bonnes pratiques de programmation. Tu fournis des analyses détaillées, précises et constructives.
 
-Je vais te fournir le contenu d'un fichier {language} et j'aimerais que tu l'analyses en profondeur. 
-Voici le fichier à analyser: `{file_name}`
+Pour chaque fichier qui t'est fourni, analyse le code en profondeur en suivant ces instructions.
 
 ## Instructions d'analyse:
 
@@ -97,6 +65,182 @@ Voici le fichier à analyser: `{file_name}`
 
 ## Format de sortie:
 Ton analyse doit être structurée en sections claires avec des titres en Markdown.
+"""
+
+SYSTEM_BLOCKS = [
+    {"type": "text", "text": ANALYSIS_INSTRUCTIONS, "cache_control": {"type": "ephemeral"}}
+]
+
+# Consigne système des prompts complets (déjà structurés) confiés à Claude en secours de Gemini
+REFACTORING_SYSTEM_PROMPT = "Tu es un expert en refactoring et en architecture logicielle. Tu proposes des suggestions avancées, concrètes et illustrées par des exemples de code."
+
+# Budget de jetons du résumé transmis aux agents de validation
+SUMMARY_MAX_TOKENS = 300
+
+_HEADING_RE = re.compile(r'^#{1,6}\s+(.*)$')
+_PROBLEM_HEADING_RE = re.compile(r'problème|bug|erreur|vulnérabilit|sécurité|anti-pattern', re.IGNORECASE)
+_BULLET_RE = re.compile(r'^\s*(?:[-*+]|\d+\.)\s+')
+
+class ClaudeAgent:
+    """
+    Agent d'analyse de code utilisant Claude 3 d'Anthropic.
+    """
+    
+    def __init__(self, http_client=None, cache_path: Optional[str] = None, use_cache: bool = True,
+                 max_connections: int = DEFAULT_MAX_CONNECTIONS):
+        """
+        Initialise l'agent Claude avec la configuration nécessaire.
+        
+        Les analyses passent par un client asynchrone; le client synchrone ne sert
+        qu'aux appels de l'API Message Batches, exécutés dans des threads.
+        
+        Args:
+            http_client (httpx.Client, optional): Client HTTP partagé (pool de connexions) du client synchrone
+            cache_path (str, optional): Base SQLite dédiée au cache des réponses (cache partagé sinon)
+            use_cache (bool): False pour interroger systématiquement l'API
+            max_connections (int): Taille du pool de connexions des clients asynchrones
+        """
+        self.api_key = os.getenv('ANTHROPIC_API_KEY')
+        if not self.api_key:
+            logger.error("Clé API Anthropic non trouvée. Veuillez définir ANTHROPIC_API_KEY dans le fichier .env")
+            raise ValueError("Clé API Anthropic manquante")
+        
+        self._http_client = http_client
+        self._max_connections = max_connections
+        self._async_client: Optional[AsyncAnthropic] = None
+        self._async_client_loop = None
+        self._async_client_closer: Optional[asyncio.Task] = None
+        self.model = "claude-3-opus-20240229"
+        self.cache = resolve_cache(cache_path, use_cache)
+        logger.info("Agent Claude initialisé avec le modèle %s", self.model)
+    
+    @cached_property
+    def client(self) -> Anthropic:
+        """Client synchrone de l'API Message Batches, créé au premier appel (les analyses n'en ont pas besoin)."""
+        return Anthropic(api_key=self.api_key, http_client=self._http_client)
+    
+    def _get_async_client(self) -> AsyncAnthropic:
+        """
+        Retourne le client asynchrone de la boucle courante (ses connexions sont liées à la
+        boucle); il est fermé à l'arrêt de la boucle.
+        """
+        loop = asyncio.get_running_loop()
+        if self._async_client is None or self._async_client_loop is not loop:
+            # Les nouvelles tentatives sont gérées par llm_retry (backoff avec gigue), pas par le SDK
+            self._async_client = AsyncAnthropic(
+                api_key=self.api_key,
+                http_client=DefaultAsyncHttpxClient(
+                    http2=True,
+                    # Timeout et Limits du httpx sur lequel repose le SDK
+                    timeout=Timeout(HTTP_TIMEOUT_SECONDS, connect=HTTP_CONNECT_TIMEOUT_SECONDS),
+                    limits=http_limits(self._max_connections, type(DEFAULT_CONNECTION_LIMITS))
+                ),
+                max_retries=0
+            )
+            self._async_client_loop = loop
+            self._async_client_closer = close_on_loop_shutdown(self._async_client.close)
+        return self._async_client
+    
+    @cached_call("anthropic")
+    @llm_retry(RateLimitError, APITimeoutError, APIConnectionError, InternalServerError)
+    async def _complete(self, prompt: str) -> str:
+        """
+        Envoie un prompt d'analyse à Claude et retourne le texte de la réponse.
+        
+        Args:
+            prompt (str): Prompt à envoyer
+            
+        Returns:
+            str: Texte généré par le modèle
+        """
+        return await self._raw_complete(prompt, SYSTEM_BLOCKS)
+    
+    @cached_call("anthropic")
+    @llm_retry(RateLimitError, APITimeoutError, APIConnectionError, InternalServerError)
+    async def complete_refactoring(self, prompt: str) -> str:
+        """
+        Envoie tel quel un prompt de suggestions déjà construit (fallback de Gemini), sans
+        l'envelopper dans le prompt d'analyse. Les erreurs sont propagées à l'appelant.
+        
+        Args:
+            prompt (str): Prompt complet à envoyer
+            
+        Returns:
+            str: Texte généré par le modèle
+        """
+        return await self._raw_complete(prompt, REFACTORING_SYSTEM_PROMPT)
+    
+    async def _raw_complete(self, prompt: str, system) -> str:
+        """
+        Appel à l'API Messages (limite de débit comprise), sans cache ni nouvelle tentative.
+        
+        Args:
+            prompt (str): Prompt à envoyer
+            system (str | List[Dict]): Consigne ou blocs système de la requête
+            
+        Returns:
+            str: Texte généré par le modèle
+        """
+        # Seaux partagés par l'agent principal et le fallback de Gemini
+        request_limiter = get_request_limiter("anthropic")
+        rate_limiter = get_rate_limiter("anthropic")
+        await request_limiter.acquire(1)
+        await rate_limiter.acquire(estimate_tokens(prompt))
+        
+        # Réponse en flux: le délai de lecture s'applique entre deux fragments et non à
+        # la génération entière, une connexion bloquée est donc détectée (et réessayée) au plus tôt
+        try:
+            async with self._get_async_client().messages.stream(**self._request_params(prompt, system)) as stream:
+                for limiter, resource in ((rate_limiter, 'tokens'), (request_limiter, 'requests')):
+                    limits = parse_anthropic_headers(stream.response.headers, resource)
+                    if limits is not None:
+                        limiter.update(*limits)
+                parts = [text async for text in stream.text_stream]
+        except RateLimitError as e:
+            # Les autres appels à Anthropic attendent la fin de la pause avant de repartir
+            rate_limiter.record_rate_limit(parse_retry_after(e.response.headers))
+            raise
+        return ''.join(parts)
+    
+    def _request_params(self, prompt: str, system=SYSTEM_BLOCKS) -> Dict:
+        """
+        Construit les paramètres d'un appel `messages.create` (partagés avec l'API Batch).
+        
+        Args:
+            prompt (str): Prompt à envoyer
+            system (str | List[Dict]): Consigne ou blocs système (instructions d'analyse par défaut)
+            
+        Returns:
+            Dict: Paramètres de la requête
+        """
+        return {
+            'model': self.model,
+            'max_tokens': 4000,
+            'temperature': 0.1,
+            'system': system,
+            'messages': [
+                {"role": "user", "content": [{"type": "text", "text": prompt}]}
+            ]
+        }
+    
+    def _build_prompt(self, code_content: str, file_path: str) -> str:
+        """
+        Construit la partie du prompt propre à un fichier (les instructions sont dans SYSTEM_BLOCKS).
+        
+        Args:
+            code_content (str): Contenu du code à analyser
+            file_path (str): Chemin du fichier analysé
+            
+        Returns:
+            str: Prompt à envoyer à Claude
+        """
+        file_name = os.path.basename(file_path)
+        language = detect_language(file_name)
+        
+        return f"""
+# Analyse de code {language}
+
+Voici le fichier {language} à analyser: `{file_name}`
 
 ## Voici le code à analyser:
 ```{language}
@@ -105,61 +249,127 @@ Ton analyse doit être structurée en sections claires avec des titres en Markdo
 
 Merci de fournir une analyse détaillée et constructive.
 """
-
-        # Appel à l'API Claude
-        max_retries = 3
-        retry_delay = 5
-        
-        for attempt in range(max_retries):
-            try:
-                response = self.client.messages.create(
-                    model=self.model,
-                    max_tokens=4000,
-                    temperature=0.1,
-                    system="Tu es un expert en analyse de code et en bonnes pratiques de programmation. Tu fournis des analyses détaillées, précises et constructives.",
-                    messages=[
-                        {"role": "user", "content": prompt}
-                    ]
-                )
-                
-                analysis = response.content[0].text
-                
-                # Ajout d'un en-tête au rapport
-                header = f"""# Analyse de {file_name} par Claude 3
+    
+    def summarize(self, analysis: str, max_tokens: int = SUMMARY_MAX_TOKENS) -> str:
+        """
+        Résume une analyse de Claude en ne gardant que la liste des problèmes identifiés.
+        Les puces des sections consacrées aux problèmes (bugs, erreurs, sécurité...) sont
+        retenues; à défaut, le début de l'analyse est utilisé.
+        
+        Args:
+            analysis (str): Rapport d'analyse de Claude
+            max_tokens (int): Budget de jetons du résumé
+            
+        Returns:
+            str: Résumé de l'analyse
+        """
+        # L'en-tête du rapport n'apporte rien aux agents de validation
+        body = analysis.split('\n---\n', 1)[-1]
+        lines = body.splitlines()
+        
+        problems = []
+        in_problems = False
+        for line in lines:
+            heading = _HEADING_RE.match(line)
+            if heading:
+                in_problems = bool(_PROBLEM_HEADING_RE.search(heading.group(1)))
+            elif in_problems and _BULLET_RE.match(line):
+                problems.append(line.strip())
+        
+        summary_lines = problems or [line for line in lines if line.strip()]
+        summary = []
+        tokens = 0
+        for line in summary_lines:
+            tokens += estimate_tokens(line)
+            if tokens > max_tokens:
+                break
+            summary.append(line)
+        return '\n'.join(summary)
+    
+    def _create_report_header(self, file_name: str, file_path: str) -> str:
+        """Crée l'en-tête du rapport d'analyse."""
+        return f"""# Analyse de {file_name} par Claude 3
 
 *Ce rapport a été généré automatiquement par l'agent d'analyse de code multi-LLM.*
 
 **Fichier analysé:** {file_path}  
-**Date d'analyse:** {time.strftime('%Y-%m-%d %H:%M:%S')}  
+**Date d'analyse:** {report_timestamp()}  
 **Modèle utilisé:** {self.model}
 
 ---
 
 """
-                
-                full_analysis = header + analysis
-                
-                logger.info(f"Analyse de {file_name} terminée avec succès")
-                return full_analysis
-                
-            except Exception as e:
-                logger.warning(f"Tentative {attempt+1}/{max_retries} échouée: {str(e)}")
-                if attempt < max_retries - 1:
-                    logger.info(f"Nouvelle tentative dans {retry_delay} secondes...")
-                    time.sleep(retry_delay)
-                    retry_delay *= 2  # Backoff exponentiel
-                else:
-                    logger.error(f"Échec de l'analyse après {max_retries} tentatives")
-                    return f"""# Erreur d'analyse pour {file_name}
+    
+    def _create_error_report(self, file_name: str, error: Exception) -> str:
+        """Crée le rapport retourné lorsque l'analyse a échoué."""
+        return f"""# Erreur d'analyse pour {file_name}
 
 Une erreur s'est produite lors de l'analyse de ce fichier avec Claude 3:
 
 ```
-{str(e)}
+{str(error)}
 ```
 
 Veuillez vérifier votre connexion internet et votre clé API, puis réessayer.
 """
+    
+    async def analyze_code(self, code_content: str, file_path: str) -> str:
+        """
+        Analyse le code avec Claude 3.
+        
+        Args:
+            code_content (str): Contenu du code à analyser
+            file_path (str): Chemin du fichier analysé
+            
+        Returns:
+            str: Rapport d'analyse au format Markdown
+        """
+        file_name = os.path.basename(file_path)
+        
+        logger.debug("Analyse du fichier %s avec Claude", file_name)
+        
+        prompt = self._build_prompt(code_content, file_path)
+        
+        # Appel à l'API Claude (les erreurs transitoires sont réessayées par _complete)
+        try:
+            analysis = await self._complete(prompt)
+        except Exception as e:
+            logger.error("Échec de l'analyse de %s: %s", file_name, e)
+            return self._create_error_report(file_name, e)
+        
+        logger.debug("Analyse de %s terminée avec succès", file_name)
+        return f"{self._create_report_header(file_name, file_path)}{analysis}"
+
+    async def analyze_batch(self, files: List[Tuple[str, str]]) -> List[str]:
+        """
+        Analyse plusieurs fichiers en un seul lot via l'API Message Batches d'Anthropic.
+        Le traitement est différé mais coûte environ deux fois moins cher.
+        
+        Args:
+            files (List[Tuple[str, str]]): Couples (contenu du code, chemin du fichier)
+            
+        Returns:
+            List[str]: Rapports d'analyse au format Markdown, dans l'ordre des fichiers
+        """
+        prompts = [self._build_prompt(code_content, file_path) for code_content, file_path in files]
+        
+        analyses = await complete_batch(
+            "anthropic", self.model, prompts,
+            submit=lambda requests: submit_anthropic_batch(
+                self.client, {custom_id: self._request_params(prompt) for custom_id, prompt in requests.items()}
+            ),
+            wait=lambda batch_id: wait_anthropic_batch(self.client, batch_id),
+            cache=self.cache
+        )
+        
+        reports = []
+        for (_, file_path), analysis in zip(files, analyses):
+            file_name = os.path.basename(file_path)
+            if analysis is None:
+                reports.append(self._create_error_report(file_name, "Requête en échec dans le lot Anthropic"))
+            else:
+                reports.append(f"{self._create_report_header(file_name, file_path)}{analysis}")
+        return reports
 
 # Test unitaire simple si exécuté directement
 if __name__ == "__main__":
@@ -174,7 +384,7 @@ if __name__ == "__main__":
                 code = f.read()
             
             agent = ClaudeAgent()
-            analysis = agent.analyze_code(code, test_file)
+            analysis = asyncio.run(agent.analyze_code(code, test_file))
             
             print(analysis[:500] + "...\n[Analyse tronquée pour l'affichage]")
         else:
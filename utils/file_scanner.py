@@ -7,11 +7,54 @@ Ce module est responsable de la recherche et du filtrage des fichiers à analyse
 """
 
 import os
+import stat
 import logging
-from pathlib import Path
+from types import MappingProxyType
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, Iterator, List, Optional, Tuple, Union
 
 logger = logging.getLogger('llm_code_agent.file_scanner')
 
+# Taille des blocs lus pour compter les lignes d'un fichier
+LINE_COUNT_CHUNK_SIZE = 1 << 20
+
+# Type de fichier par extension (table en lecture seule partagée par get_file_type)
+EXTENSION_TO_TYPE = MappingProxyType({
+    '.py': 'python',
+    '.js': 'javascript',
+    '.ts': 'typescript',
+    '.tsx': 'typescript_react',
+    '.jsx': 'javascript_react',
+    '.html': 'html',
+    '.css': 'css',
+    '.json': 'json',
+    '.md': 'markdown'
+})
+
+# Nombre de threads de stats_many (la lecture des fichiers libère le GIL)
+DEFAULT_STATS_WORKERS = 16
+
+def _count_lines(file_path: str) -> int:
+    """
+    Compte les lignes d'un fichier en lisant des blocs binaires (sans décodage ni
+    découpage en lignes). Une dernière ligne sans retour à la ligne est comptée.
+    
+    Args:
+        file_path (str): Chemin du fichier
+        
+    Returns:
+        int: Nombre de lignes
+    """
+    line_count = 0
+    last_chunk = b''
+    with open(file_path, 'rb') as f:
+        while chunk := f.read(LINE_COUNT_CHUNK_SIZE):
+            line_count += chunk.count(b'\n')
+            last_chunk = chunk
+    if last_chunk and not last_chunk.endswith(b'\n'):
+        line_count += 1
+    return line_count
+
 class FileScanner:
     """
     Classe responsable de la recherche et du filtrage des fichiers à analyser.
@@ -20,7 +63,7 @@ class FileScanner:
     def __init__(self):
         """Initialise le scanner de fichiers avec les extensions supportées."""
         # Extensions de fichiers supportées pour l'analyse
-        self.supported_extensions = [
+        self.supported_extensions = frozenset({
             '.py',   # Python
             '.js',   # JavaScript
             '.ts',   # TypeScript
@@ -30,10 +73,10 @@ class FileScanner:
             '.css',  # CSS
             '.json', # JSON
             '.md'    # Markdown
-        ]
+        })
         
         # Dossiers à ignorer lors du scan
-        self.ignored_dirs = [
+        self.ignored_dirs = frozenset({
             'node_modules',
             'venv',
             '.git',
@@ -43,9 +86,12 @@ class FileScanner:
             'dist',
             'build',
             'env'
-        ]
+        })
         
-        logger.debug(f"Scanner initialisé avec {len(self.supported_extensions)} extensions supportées")
+        # Tuple des extensions pour un test unique str.endswith par fichier
+        self._extension_suffixes = tuple(self.supported_extensions)
+        
+        logger.debug("Scanner initialisé avec %d extensions supportées", len(self.supported_extensions))
     
     def scan_directory(self, directory_path):
         """
@@ -58,29 +104,46 @@ class FileScanner:
             list: Liste des chemins de fichiers à analyser
         """
         directory_path = os.path.abspath(directory_path)
-        logger.info(f"Scan du répertoire: {directory_path}")
+        logger.info("Scan du répertoire: %s", directory_path)
         
         if not os.path.isdir(directory_path):
-            logger.error(f"Le chemin spécifié n'est pas un répertoire valide: {directory_path}")
+            logger.error("Le chemin spécifié n'est pas un répertoire valide: %s", directory_path)
             return []
         
-        files_to_analyze = []
+        files_to_analyze = [file_path for file_path, _ in self.iter_files(directory_path)]
         
-        for root, dirs, files in os.walk(directory_path):
-            # Filtrer les dossiers ignorés
-            dirs[:] = [d for d in dirs if d not in self.ignored_dirs]
-            
-            for file in files:
-                file_path = os.path.join(root, file)
-                file_extension = os.path.splitext(file)[1].lower()
-                
-                if file_extension in self.supported_extensions:
-                    files_to_analyze.append(file_path)
-                    logger.debug(f"Fichier ajouté pour analyse: {file_path}")
-        
-        logger.info(f"{len(files_to_analyze)} fichiers trouvés pour analyse")
+        logger.info("%d fichiers trouvés pour analyse", len(files_to_analyze))
         return files_to_analyze
     
+    def iter_files(self, directory_path: str) -> Iterator[Tuple[str, os.stat_result]]:
+        """
+        Parcourt récursivement un répertoire avec os.scandir et produit les fichiers à analyser.
+        Le type des entrées est lu dans le répertoire lui-même; seul un stat() par fichier
+        retenu est effectué, et son résultat est transmis pour get_file_stats.
+        
+        Args:
+            directory_path (str): Chemin du répertoire à parcourir
+            
+        Yields:
+            Tuple[str, os.stat_result]: Chemin du fichier et résultat de son stat()
+        """
+        subdirectories = []
+        try:
+            with os.scandir(directory_path) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        if entry.name not in self.ignored_dirs:
+                            subdirectories.append(entry.path)
+                    elif entry.name.lower().endswith(self._extension_suffixes) and entry.is_file():
+                        yield entry.path, entry.stat()
+        except OSError as e:
+            logger.warning("Répertoire ignoré %s: %s", directory_path, e)
+            return
+        
+        # Parcours descendant, comme os.walk: les fichiers d'un dossier avant ses sous-dossiers
+        for subdirectory in subdirectories:
+            yield from self.iter_files(subdirectory)
+    
     def is_supported_file(self, file_path):
         """
         Vérifie si un fichier est supporté pour l'analyse.
@@ -108,51 +171,65 @@ class FileScanner:
             str: Type de fichier (python, javascript, etc.)
         """
         file_extension = os.path.splitext(file_path)[1].lower()
-        
-        extension_to_type = {
-            '.py': 'python',
-            '.js': 'javascript',
-            '.ts': 'typescript',
-            '.tsx': 'typescript_react',
-            '.jsx': 'javascript_react',
-            '.html': 'html',
-            '.css': 'css',
-            '.json': 'json',
-            '.md': 'markdown'
-        }
-        
-        return extension_to_type.get(file_extension, 'unknown')
+        return EXTENSION_TO_TYPE.get(file_extension, 'unknown')
     
-    def get_file_stats(self, file_path):
+    def get_file_stats(self, file_path, stat_result: Optional[os.stat_result] = None):
         """
         Récupère des statistiques sur un fichier.
         
         Args:
             file_path (str): Chemin du fichier
+            stat_result (os.stat_result, optional): Résultat de stat() déjà obtenu (iter_files)
             
         Returns:
             dict: Statistiques du fichier (taille, nombre de lignes, etc.)
         """
-        if not os.path.isfile(file_path):
+        if stat_result is None:
+            try:
+                stat_result = os.stat(file_path)
+            except OSError:
+                return None
+        if not stat.S_ISREG(stat_result.st_mode):
             return None
         
         stats = {
             'path': file_path,
             'name': os.path.basename(file_path),
             'type': self.get_file_type(file_path),
-            'size': os.path.getsize(file_path),
-            'last_modified': os.path.getmtime(file_path)
+            'size': stat_result.st_size,
+            'last_modified': stat_result.st_mtime
         }
         
         # Compter le nombre de lignes
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                stats['line_count'] = sum(1 for _ in f)
-        except Exception as e:
-            logger.warning(f"Impossible de compter les lignes dans {file_path}: {str(e)}")
+            stats['line_count'] = _count_lines(file_path)
+        except OSError as e:
+            logger.warning("Impossible de compter les lignes dans %s: %s", file_path, e)
             stats['line_count'] = 0
         
         return stats
+    
+    def stats_many(self, files: Iterable[Union[str, Tuple[str, os.stat_result]]],
+                   workers: int = DEFAULT_STATS_WORKERS) -> List[Optional[dict]]:
+        """
+        Récupère les statistiques de plusieurs fichiers en parallèle dans un pool de threads.
+        Les couples (chemin, stat) produits par iter_files évitent un nouveau stat():
+        seul le comptage des lignes reste à faire.
+        
+        Args:
+            files (Iterable): Chemins de fichiers ou couples (chemin, résultat de stat())
+            workers (int): Nombre de threads
+            
+        Returns:
+            List[Optional[dict]]: Statistiques des fichiers, dans l'ordre reçu
+        """
+        def file_stats(item):
+            if isinstance(item, tuple):
+                return self.get_file_stats(*item)
+            return self.get_file_stats(item)
+        
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(file_stats, files))
 
 # Test unitaire simple si exécuté directement
 if __name__ == "__main__":
@@ -165,9 +242,8 @@ if __name__ == "__main__":
         test_dir = "."
     
     scanner = FileScanner()
-    files = scanner.scan_directory(test_dir)
+    all_stats = scanner.stats_many(scanner.iter_files(test_dir))
     
-    print(f"Fichiers trouvés ({len(files)}):")
-    for file in files:
-        stats = scanner.get_file_stats(file)
+    print(f"Fichiers trouvés ({len(all_stats)}):")
+    for stats in all_stats:
         print(f"- {stats['name']} ({stats['type']}, {stats['line_count']} lignes)")
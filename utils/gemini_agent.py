@@ -7,62 +7,32 @@ Ce module est responsable des suggestions avancées et des idées d'amélioratio
 """
 
 import os
+import asyncio
 import logging
-import time
-import json
 import re
-from typing import List, Dict, Optional
-import google.generativeai as genai
-from .claude_agent import ClaudeAgent
+import orjson
+from functools import cached_property
+from typing import TYPE_CHECKING, List, Dict, Optional, Tuple
+import httpx
+from google.api_core.exceptions import (
+    DeadlineExceeded, InternalServerError, ResourceExhausted, ServiceUnavailable, from_http_status
+)
+from .llm_cache import cached_call, resolve_cache
+from .retry import llm_retry
+from .http_clients import close_on_loop_shutdown
+from .rate_limiter import get_rate_limiter, get_request_limiter
+from .tokens import estimate_tokens, truncate_tokens
+from .languages import detect_language
+from .timestamps import report_timestamp
+from .todo_manager import parse_text_todos
+
+if TYPE_CHECKING:
+    from .claude_agent import ClaudeAgent
 
 logger = logging.getLogger('llm_code_agent.gemini_agent')
 
-# Constants
-LANGUAGE_MAP = {
-    '.py': 'Python',
-    '.js': 'JavaScript',
-    '.ts': 'TypeScript',
-    '.tsx': 'TypeScript React',
-    '.jsx': 'JavaScript React',
-    '.html': 'HTML',
-    '.css': 'CSS',
-    '.json': 'JSON',
-    '.md': 'Markdown'
-}
-
-MAX_RETRIES = 3
-INITIAL_RETRY_DELAY = 5
-
-class GeminiAgent:
-    """
-    Agent de suggestions avancées de refactoring utilisant Gemini Pro de Google.
-    En cas d'échec, utilise Claude comme fallback.
-    """
-    
-    def __init__(self):
-        """Initialise l'agent Gemini avec la configuration nécessaire."""
-        self.api_key = self._get_api_key()
-        genai.configure(api_key=self.api_key)
-        self.model = "gemini-pro"
-        self.gemini_model = genai.GenerativeModel(self.model)
-        self.claude_fallback = ClaudeAgent()
-        logger.info(f"Agent Gemini initialisé avec le modèle {self.model}")
-    
-    def _get_api_key(self) -> str:
-        """Récupère et valide la clé API Google."""
-        api_key = os.getenv('GOOGLE_API_KEY')
-        if not api_key:
-            logger.error("Clé API Google non trouvée. Veuillez définir GOOGLE_API_KEY dans le fichier .env")
-            raise ValueError("Clé API Google manquante")
-        return api_key
-
-    def _get_language(self, file_extension: str) -> str:
-        """Détermine le langage de programmation à partir de l'extension du fichier."""
-        return LANGUAGE_MAP.get(file_extension.lower(), 'Code')
-
-    def _build_prompt(self, code_content: str, claude_analysis: str, file_name: str, language: str) -> str:
-        """Construit le prompt pour l'analyse de code."""
-        return f"""
+# Prompt de suggestions, complété pour chaque fichier par _build_prompt
+PROMPT_TEMPLATE = """
 # Suggestions avancées de refactoring pour {language}
 
 Je vais te fournir le contenu d'un fichier {language} ainsi qu'une analyse préalable réalisée par Claude 3.
@@ -100,37 +70,234 @@ Termine par une liste de tâches TODO au format JSON pour faciliter l'intégrati
 ```
 
 ## Voici l'analyse préalable de Claude:
-{claude_analysis[:1500]}... (analyse tronquée pour la longueur)
+{claude_analysis}... (analyse tronquée pour la longueur)
 
 Merci de fournir des suggestions avancées et innovantes pour améliorer ce code.
 """
 
-    def _handle_api_error(self, error: Exception, attempt: int, max_retries: int, retry_delay: int) -> None:
-        """Gère les erreurs d'API et les tentatives de retry."""
-        logger.warning(f"Tentative {attempt+1}/{max_retries} échouée: {str(error)}")
-        if attempt < max_retries - 1:
-            logger.info(f"Nouvelle tentative dans {retry_delay} secondes...")
-            time.sleep(retry_delay)
-        else:
-            logger.error(f"Échec de la génération de suggestions après {max_retries} tentatives")
-
-    def _generate_with_gemini(self, prompt: str) -> Optional[str]:
-        """Génère des suggestions avec Gemini Pro."""
-        for attempt in range(MAX_RETRIES):
-            try:
-                response = self.gemini_model.generate_content(prompt)
-                return response.text
-            except Exception as e:
-                retry_delay = INITIAL_RETRY_DELAY * (2 ** attempt)
-                self._handle_api_error(e, attempt, MAX_RETRIES, retry_delay)
-        return None
-
-    def _generate_with_claude(self, prompt: str, file_path: str) -> str:
-        """Génère des suggestions avec Claude en tant que fallback."""
+# Prompt de suggestions pour plusieurs petits fichiers en un appel (suggest_refactoring_batch):
+# les instructions ne sont envoyées qu'une fois, suivies d'un bloc BATCH_FILE_TEMPLATE par fichier
+BATCH_PROMPT_TEMPLATE = """
+# Suggestions avancées de refactoring pour plusieurs fichiers
+
+Je vais te fournir {count} fichiers, chacun avec une analyse préalable réalisée par Claude 3.
+Ton rôle est de proposer, pour chaque fichier, des suggestions avancées de refactoring et d'amélioration du code.
+
+## Instructions:
+
+1. Propose des améliorations avancées pour:
+   - Refactoriser le code pour une meilleure architecture
+   - Améliorer la modularité et la réutilisabilité
+   - Optimiser les performances
+   - Moderniser le code avec les dernières pratiques et fonctionnalités de son langage
+
+2. Pour chaque suggestion:
+   - Explique clairement le bénéfice attendu
+   - Fournis un exemple concret de code refactorisé
+   - Indique le niveau d'effort requis (Faible, Moyen, Élevé)
+   - Attribue une priorité (Critique, Élevée, Moyenne, Faible)
+
+## Format de sortie:
+Rédige un rapport séparé par fichier, dans l'ordre des fichiers.
+Commence chaque rapport par une ligne contenant uniquement `=== FICHIER n ===`, où n est le numéro du fichier.
+Chaque rapport doit être structuré en sections claires avec des titres en Markdown,
+utiliser des blocs de code pour illustrer les suggestions et se terminer par une liste
+de tâches TODO au format JSON.
+{files}
+Merci de fournir des suggestions avancées et innovantes pour améliorer ces fichiers.
+"""
+
+BATCH_FILE_TEMPLATE = """
+## Fichier {index}: `{file_name}` ({language})
+```{language}
+{code_content}
+```
+
+### Analyse préalable de Claude:
+{claude_analysis}... (analyse tronquée pour la longueur)
+"""
+
+# Budget de jetons d'un prompt groupant plusieurs fichiers
+BATCH_MAX_PROMPT_TOKENS = 8000
+
+# Début du rapport d'un fichier dans une réponse groupée
+_BATCH_REPORT_RE = re.compile(r'^=== FICHIER (\d+) ===[ \t]*$', re.MULTILINE)
+
+# Point d'accès REST de Gemini, utilisé à la place du SDK lorsque LLM_GEMINI_REST=1
+GEMINI_REST_URL = "https://generativelanguage.googleapis.com/v1beta/models/{model}:generateContent"
+
+# Statuts HTTP convertis vers l'exception du SDK correspondante: from_http_status en ferait
+# TooManyRequests et GatewayTimeout, que _complete ne réessaie pas
+_REST_STATUS_ERRORS = {429: ResourceExhausted, 504: DeadlineExceeded}
+
+# Délai maximal d'un appel REST, en secondes
+GEMINI_REST_TIMEOUT = 120.0
+
+# Part de l'analyse de Claude reprise dans le prompt, en jetons
+CLAUDE_ANALYSIS_MAX_TOKENS = 375
+
+# Nombre maximal de suggestions simultanées dans suggest_many
+DEFAULT_CONCURRENCY = 8
+
+# Blocs JSON des TODOs en fin de rapport de suggestions
+_JSON_BLOCK_RE = re.compile(r'```json\s*([\s\S]*?)\s*```')
+
+class GeminiAgent:
+    """
+    Agent de suggestions avancées de refactoring utilisant Gemini Pro de Google.
+    En cas d'échec, utilise Claude comme fallback.
+    """
+    
+    def __init__(self, http_client=None, cache_path: Optional[str] = None, use_cache: bool = True,
+                 claude_fallback: Optional['ClaudeAgent'] = None):
+        """
+        Initialise l'agent Gemini avec la configuration nécessaire.
+        Le SDK google-generativeai gère son propre transport: le client HTTP partagé
+        n'est utilisé que par l'agent Claude de secours.
+        
+        Args:
+            http_client (httpx.Client, optional): Client HTTP partagé (pool de connexions)
+            cache_path (str, optional): Base SQLite dédiée au cache des réponses (cache partagé sinon)
+            use_cache (bool): False pour interroger systématiquement l'API
+            claude_fallback (ClaudeAgent, optional): Agent Claude existant à réutiliser comme
+                fallback (ses connexions à l'API Anthropic sont alors partagées); à défaut,
+                il n'est créé qu'au premier échec de Gemini
+        """
+        self.api_key = self._get_api_key()
+        self.model = "gemini-pro"
+        # Appels directs à l'API REST (un client httpx HTTP/2 par boucle d'événements) au lieu du SDK
+        self.use_rest = os.getenv('LLM_GEMINI_REST') == '1'
+        self._async_client: Optional[httpx.AsyncClient] = None
+        self._async_client_loop = None
+        self._async_client_closer: Optional[asyncio.Task] = None
+        self.cache = resolve_cache(cache_path, use_cache)
+        self._http_client = http_client
+        self._cache_path = cache_path
+        self._use_cache = use_cache
+        if claude_fallback is not None:
+            self.claude_fallback = claude_fallback
+        logger.info("Agent Gemini initialisé avec le modèle %s", self.model)
+    
+    @cached_property
+    def gemini_model(self):
+        """
+        Modèle Gemini, créé au premier appel: le SDK google-generativeai, long à importer,
+        n'est chargé que si des suggestions sont réellement demandées.
+        """
+        import google.generativeai as genai
+        genai.configure(api_key=self.api_key)
+        return genai.GenerativeModel(self.model)
+    
+    def _get_async_client(self) -> httpx.AsyncClient:
+        """
+        Retourne le client HTTP asynchrone de la boucle courante (ses connexions sont liées
+        à la boucle); il est fermé à l'arrêt de la boucle.
+        """
+        loop = asyncio.get_running_loop()
+        if self._async_client is None or self._async_client_loop is not loop:
+            self._async_client = httpx.AsyncClient(
+                http2=True,
+                timeout=GEMINI_REST_TIMEOUT,
+                headers={'x-goog-api-key': self.api_key}
+            )
+            self._async_client_loop = loop
+            self._async_client_closer = close_on_loop_shutdown(self._async_client.aclose)
+        return self._async_client
+    
+    @cached_property
+    def claude_fallback(self) -> 'ClaudeAgent':
+        """
+        Agent Claude de secours, créé (clé API Anthropic comprise) au premier échec de Gemini.
+        Le SDK Anthropic n'est importé qu'à ce moment.
+        """
+        from .claude_agent import ClaudeAgent
+        return ClaudeAgent(http_client=self._http_client, cache_path=self._cache_path, use_cache=self._use_cache)
+    
+    def _get_api_key(self) -> str:
+        """Récupère et valide la clé API Google."""
+        api_key = os.getenv('GOOGLE_API_KEY')
+        if not api_key:
+            logger.error("Clé API Google non trouvée. Veuillez définir GOOGLE_API_KEY dans le fichier .env")
+            raise ValueError("Clé API Google manquante")
+        return api_key
+
+    def _build_prompt(self, code_content: str, claude_analysis: str, file_name: str, language: str) -> str:
+        """Construit le prompt pour l'analyse de code."""
+        return PROMPT_TEMPLATE.format(
+            language=language,
+            file_name=file_name,
+            code_content=code_content,
+            claude_analysis=truncate_tokens(claude_analysis, CLAUDE_ANALYSIS_MAX_TOKENS)
+        )
+
+    @cached_call("google")
+    @llm_retry(ResourceExhausted, ServiceUnavailable, DeadlineExceeded, InternalServerError)
+    async def _complete(self, prompt: str) -> str:
+        """Envoie un prompt à Gemini Pro et retourne le texte de la réponse."""
+        # L'API Gemini ne renvoie pas d'en-têtes de limite: seule la limite configurée s'applique
+        rate_limiter = get_rate_limiter("google")
+        await get_request_limiter("google").acquire(1)
+        await rate_limiter.acquire(estimate_tokens(prompt))
+        
+        try:
+            if self.use_rest:
+                return await self._complete_rest(prompt)
+            # Réponse en flux, assemblée par resolve(): une connexion bloquée est détectée entre deux fragments
+            response = await self.gemini_model.generate_content_async(prompt, stream=True)
+            await response.resolve()
+        except ResourceExhausted:
+            # Quota dépassé: les autres appels à Gemini marquent la pause par défaut
+            rate_limiter.record_rate_limit()
+            raise
+        return response.text
+    
+    async def _complete_rest(self, prompt: str) -> str:
+        """
+        Envoie un prompt à l'API REST de Gemini, sans passer par le SDK et son transport.
+        Les erreurs HTTP sont converties en exceptions google.api_core pour être
+        réessayées comme celles du SDK.
+        
+        Args:
+            prompt (str): Prompt à envoyer
+            
+        Returns:
+            str: Texte de la réponse
+        """
+        try:
+            response = await self._get_async_client().post(
+                GEMINI_REST_URL.format(model=self.model),
+                json={"contents": [{"parts": [{"text": prompt}]}]}
+            )
+        except httpx.TimeoutException as e:
+            raise DeadlineExceeded(str(e)) from e
+        except httpx.TransportError as e:
+            raise ServiceUnavailable(str(e)) from e
+        
+        if response.is_error:
+            error_class = _REST_STATUS_ERRORS.get(response.status_code)
+            if error_class is not None:
+                raise error_class(response.text)
+            raise from_http_status(response.status_code, response.text)
+        
+        candidates = response.json().get('candidates') or []
+        if not candidates:
+            raise ValueError("Réponse Gemini sans contenu")
+        return ''.join(part.get('text', '') for part in candidates[0].get('content', {}).get('parts', []))
+
+    async def _generate_with_gemini(self, prompt: str) -> Optional[str]:
+        """Génère des suggestions avec Gemini Pro (les erreurs transitoires sont réessayées par _complete)."""
         try:
-            return self.claude_fallback.analyze_code(prompt, file_path)
+            return await self._complete(prompt)
         except Exception as e:
-            logger.error(f"Échec du fallback avec Claude: {str(e)}")
+            logger.error("Échec de la génération de suggestions avec Gemini: %s", e)
+            return None
+
+    async def _generate_with_claude(self, prompt: str) -> str:
+        """Génère des suggestions avec Claude en tant que fallback, à partir du même prompt."""
+        try:
+            return await self.claude_fallback.complete_refactoring(prompt)
+        except Exception as e:
+            logger.error("Échec du fallback avec Claude: %s", e)
             raise
 
     def _create_report_header(self, file_name: str, file_path: str, model: str) -> str:
@@ -140,7 +307,7 @@ Merci de fournir des suggestions avancées et innovantes pour améliorer ce code
 *Ce rapport a été généré automatiquement par l'agent d'analyse de code multi-LLM.*
 
 **Fichier analysé:** {file_path}  
-**Date d'analyse:** {time.strftime('%Y-%m-%d %H:%M:%S')}  
+**Date d'analyse:** {report_timestamp()}  
 **Modèle utilisé:** {model}
 
 ---
@@ -161,23 +328,22 @@ Merci de fournir des suggestions avancées et innovantes pour améliorer ce code
             str: Rapport de suggestions avancées au format Markdown
         """
         file_name = os.path.basename(file_path)
-        file_extension = os.path.splitext(file_name)[1]
-        language = self._get_language(file_extension)
+        language = detect_language(file_name)
         
-        logger.info(f"Génération de suggestions avancées pour {file_name} avec Gemini")
+        logger.debug("Génération de suggestions avancées pour %s avec Gemini", file_name)
         
         prompt = self._build_prompt(code_content, claude_analysis, file_name, language)
-        suggestions = self._generate_with_gemini(prompt)
+        suggestions = await self._generate_with_gemini(prompt)
         
         if suggestions:
             header = self._create_report_header(file_name, file_path, self.model)
-            return header + suggestions
+            return f"{header}{suggestions}"
         
         logger.info("Utilisation de Claude comme fallback...")
         try:
-            fallback_suggestions = self._generate_with_claude(prompt, file_path)
+            fallback_suggestions = await self._generate_with_claude(prompt)
             header = self._create_report_header(file_name, file_path, "Claude (Fallback)")
-            return header + fallback_suggestions
+            return f"{header}{fallback_suggestions}"
         except Exception as e:
             return f"""# Erreur de génération de suggestions pour {file_name}
 
@@ -190,6 +356,116 @@ Une erreur s'est produite lors de la génération de suggestions avec Gemini Pro
 Veuillez vérifier votre connexion internet et vos clés API, puis réessayer.
 """
 
+    async def suggest_many(self, files: List[Tuple[str, str, str]], concurrency: int = DEFAULT_CONCURRENCY) -> List[str]:
+        """
+        Propose des suggestions pour plusieurs fichiers en parallèle, au plus `concurrency` requêtes à la fois.
+        
+        Args:
+            files (List[Tuple[str, str, str]]): Triplets (contenu du code, analyse de Claude, chemin du fichier)
+            concurrency (int): Nombre maximal de suggestions simultanées
+            
+        Returns:
+            List[str]: Rapports de suggestions au format Markdown, dans l'ordre des fichiers
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+        
+        async def suggest_one(code_content: str, claude_analysis: str, file_path: str) -> str:
+            async with semaphore:
+                return await self.suggest_refactoring(code_content, claude_analysis, file_path)
+        
+        return list(await asyncio.gather(*(suggest_one(*file) for file in files)))
+
+    async def suggest_refactoring_batch(self, files: List[Tuple[str, str, str]],
+                                        max_prompt_tokens: int = BATCH_MAX_PROMPT_TOKENS,
+                                        concurrency: int = DEFAULT_CONCURRENCY) -> List[str]:
+        """
+        Propose des suggestions pour plusieurs fichiers en regroupant les petits fichiers
+        dans un même appel (dans la limite de max_prompt_tokens), ce qui amortit le coût
+        fixe de chaque requête. Un groupe dont la réponse ne peut pas être découpée
+        fichier par fichier est repris fichier par fichier.
+        
+        Args:
+            files (List[Tuple[str, str, str]]): Triplets (contenu du code, analyse de Claude, chemin du fichier)
+            max_prompt_tokens (int): Budget de jetons d'un prompt groupé
+            concurrency (int): Nombre maximal d'appels simultanés
+            
+        Returns:
+            List[str]: Rapports de suggestions au format Markdown, dans l'ordre des fichiers
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+        instructions_tokens = estimate_tokens(BATCH_PROMPT_TEMPLATE)
+        
+        # Groupes de fichiers consécutifs tenant dans le budget
+        groups: List[List[int]] = []
+        file_fields: List[Dict[str, str]] = []
+        group_tokens = 0
+        for index, (code_content, claude_analysis, file_path) in enumerate(files):
+            file_name = os.path.basename(file_path)
+            fields = {
+                'file_name': file_name,
+                'language': detect_language(file_name),
+                'code_content': code_content,
+                'claude_analysis': truncate_tokens(claude_analysis, CLAUDE_ANALYSIS_MAX_TOKENS)
+            }
+            file_fields.append(fields)
+            tokens = estimate_tokens(BATCH_FILE_TEMPLATE.format(index=len(groups), **fields))
+            if not groups or instructions_tokens + group_tokens + tokens > max_prompt_tokens:
+                groups.append([])
+                group_tokens = 0
+            groups[-1].append(index)
+            group_tokens += tokens
+        
+        async def suggest_one(index: int) -> str:
+            async with semaphore:
+                return await self.suggest_refactoring(*files[index])
+        
+        async def suggest_group(group: List[int]) -> List[str]:
+            if len(group) == 1:
+                return [await suggest_one(group[0])]
+            
+            prompt = BATCH_PROMPT_TEMPLATE.format(
+                count=len(group),
+                files=''.join(
+                    BATCH_FILE_TEMPLATE.format(index=number, **file_fields[index])
+                    for number, index in enumerate(group, 1)
+                )
+            )
+            async with semaphore:
+                response = await self._generate_with_gemini(prompt)
+            sections = self._split_batch_response(response, len(group)) if response else None
+            if sections is None:
+                logger.info("Réponse groupée inexploitable, suggestions fichier par fichier")
+                # Même sémaphore que les groupes: la reprise ne dépasse pas la limite d'appels
+                return list(await asyncio.gather(*(suggest_one(index) for index in group)))
+            
+            reports = []
+            for index, section in zip(group, sections):
+                file_path = files[index][2]
+                header = self._create_report_header(os.path.basename(file_path), file_path, self.model)
+                reports.append(f"{header}{section}")
+            return reports
+        
+        group_reports = await asyncio.gather(*(suggest_group(group) for group in groups))
+        return [report for reports in group_reports for report in reports]
+    
+    @staticmethod
+    def _split_batch_response(response: str, count: int) -> Optional[List[str]]:
+        """
+        Découpe la réponse à un prompt groupé en rapports par fichier.
+        
+        Args:
+            response (str): Réponse de Gemini
+            count (int): Nombre de fichiers du groupe
+            
+        Returns:
+            Optional[List[str]]: Rapports dans l'ordre des fichiers, ou None si un rapport manque
+        """
+        parts = _BATCH_REPORT_RE.split(response)
+        sections = {int(number): body.strip() + '\n' for number, body in zip(parts[1::2], parts[2::2])}
+        if sorted(sections) != list(range(1, count + 1)):
+            return None
+        return [sections[number] for number in range(1, count + 1)]
+
     def extract_todos_from_suggestions(self, suggestions_content: str) -> List[Dict]:
         """
         Extrait les tâches TODO à partir du rapport de suggestions.
@@ -215,79 +491,37 @@ Veuillez vérifier votre connexion internet et vos clés API, puis réessayer.
         return todos
 
     def _extract_todos_from_json(self, content: str) -> List[Dict]:
-        """Extrait les TODOs depuis un bloc JSON."""
-        json_pattern = r'```json\s*([\s\S]*?)\s*```'
-        json_matches = re.findall(json_pattern, content)
+        """
+        Extrait les TODOs depuis les blocs JSON du rapport.
+        Les blocs sont d'abord parsés en un seul appel, regroupés dans un tableau;
+        en cas d'erreur, chaque bloc est repris séparément pour conserver les blocs valides.
+        """
+        blobs = [json_str.encode('utf-8') for json_str in _JSON_BLOCK_RE.findall(content)]
+        if not blobs:
+            return []
+        
+        try:
+            blocks = orjson.loads(b'[' + b','.join(blobs) + b']')
+        except orjson.JSONDecodeError:
+            blocks = []
+            for blob in blobs:
+                try:
+                    blocks.append(orjson.loads(blob))
+                except orjson.JSONDecodeError:
+                    logger.warning("Impossible de parser le JSON des TODOs")
         
         todos = []
-        for json_str in json_matches:
-            try:
-                todo_data = json.loads(json_str)
-                if isinstance(todo_data, list):
-                    todos.extend(todo_data)
-                elif isinstance(todo_data, dict) and "todos" in todo_data:
-                    todos.extend(todo_data["todos"])
-            except json.JSONDecodeError:
-                logger.warning("Impossible de parser le JSON des TODOs")
+        for todo_data in blocks:
+            if isinstance(todo_data, list):
+                todos.extend(todo_data)
+            elif isinstance(todo_data, dict) and "todos" in todo_data:
+                todos.extend(todo_data["todos"])
         
         return todos
 
     def _extract_todos_from_text(self, content: str) -> List[Dict]:
         """Extrait les TODOs depuis le texte du rapport."""
-        todos = []
-        lines = content.split('\n')
-        current_todo = None
-        
-        for line in lines:
-            if self._is_todo_title(line):
-                if current_todo:
-                    todos.append(current_todo)
-                current_todo = self._create_todo_from_title(line)
-            elif current_todo:
-                self._update_todo_priority(current_todo, line)
-                self._update_todo_effort(current_todo, line)
-        
-        if current_todo:
-            todos.append(current_todo)
-        
-        return todos
-
-    def _is_todo_title(self, line: str) -> bool:
-        """Vérifie si une ligne est un titre de TODO."""
-        return (line.startswith('##') and 
-                any(keyword in line.lower() for keyword in ['todo', 'tâche', 'amélioration']))
-
-    def _create_todo_from_title(self, title: str) -> Dict:
-        """Crée un nouveau TODO à partir d'un titre."""
-        return {
-            'description': title.lstrip('#').strip(),
-            'priority': 'Moyenne',
-            'effort': 'Moyen'
-        }
-
-    def _update_todo_priority(self, todo: Dict, line: str) -> None:
-        """Met à jour la priorité d'un TODO."""
-        line_lower = line.lower()
-        if 'priorité' in line_lower or 'priority' in line_lower:
-            if 'critique' in line_lower or 'critical' in line_lower:
-                todo['priority'] = 'Critique'
-            elif 'élevée' in line_lower or 'high' in line_lower:
-                todo['priority'] = 'Élevée'
-            elif 'moyenne' in line_lower or 'medium' in line_lower:
-                todo['priority'] = 'Moyenne'
-            elif 'faible' in line_lower or 'low' in line_lower:
-                todo['priority'] = 'Faible'
-
-    def _update_todo_effort(self, todo: Dict, line: str) -> None:
-        """Met à jour le niveau d'effort d'un TODO."""
-        line_lower = line.lower()
-        if 'effort' in line_lower:
-            if 'élevé' in line_lower or 'high' in line_lower:
-                todo['effort'] = 'Élevé'
-            elif 'moyen' in line_lower or 'medium' in line_lower:
-                todo['effort'] = 'Moyen'
-            elif 'faible' in line_lower or 'low' in line_lower:
-                todo['effort'] = 'Faible'
+        return parse_text_todos(content)
 
 # Test unitaire simple si exécuté directement
 if __name__ == "__main__":
@@ -305,7 +539,7 @@ if __name__ == "__main__":
             mock_claude_analysis = f"# Analyse de {test_file}\n\nCe fichier présente quelques problèmes potentiels..."
             
             agent = GeminiAgent()
-            suggestions = agent.suggest_refactoring(code, mock_claude_analysis, test_file)
+            suggestions = asyncio.run(agent.suggest_refactoring(code, mock_claude_analysis, test_file))
             
             print(suggestions[:500] + "...\n[Suggestions tronquées pour l'affichage]")
         else:
@@ -8,11 +8,75 @@ Ce module est responsable de la conversion des rapports Markdown en HTML.
 
 import os
 import logging
-import markdown
-from pathlib import Path
+from functools import cached_property
+from string import Template
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, Tuple
 
 logger = logging.getLogger('llm_code_agent.html_exporter')
 
+# Nombre de fichiers à partir duquel batch_convert répartit les conversions sur plusieurs
+# processus (en dessous, le démarrage des processus coûte plus qu'il ne rapporte)
+PARALLEL_MIN_FILES = 8
+
+# Structure des pages HTML, découpée autour du CSS et du contenu converti qui sont
+# écrits tels quels entre ces morceaux (sans construire la page complète en mémoire)
+_HTML_DOCUMENT_START = Template("""<!DOCTYPE html>
+<html lang="fr">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>$title</title>
+""")
+
+# Styles intégrés à la page, ou feuille de style externe partagée (batch_convert)
+_HTML_STYLE_START = """    <style>
+"""
+_HTML_STYLE_END = """
+    </style>
+"""
+_HTML_STYLESHEET_LINK = Template("""    <link rel="stylesheet" href="$href">
+""")
+
+_HTML_BODY_START = Template("""</head>
+<body>
+    <div class="header">
+        <h1 class="header-title">Rapport d'analyse de code</h1>
+        <div class="header-meta">
+            Généré le $date
+        </div>
+    </div>
+    
+    """)
+
+_HTML_DOCUMENT_END = """
+    
+    <div class="footer">
+        <p>Généré par LLM Destekli Kod Analiz ve Refaktör Ajanı</p>
+    </div>
+</body>
+</html>"""
+
+# Feuille de style écrite une fois par dossier par batch_convert
+CSS_FILE_NAME = 'style.css'
+
+# Tampon d'écriture des pages HTML: les morceaux d'une page sont regroupés en un seul
+# appel système pour les rapports usuels
+HTML_WRITE_BUFFER_SIZE = 1 << 16
+
+# Exportateur propre à chaque processus de batch_convert, créé par _init_worker
+_worker_exporter = None
+
+def _init_worker(css_style: str):
+    """Crée l'exportateur d'un processus de conversion avec le style de l'exportateur parent."""
+    global _worker_exporter
+    _worker_exporter = HTMLExporter()
+    _worker_exporter.css_style = css_style
+
+def _convert_one(paths: Tuple[str, str, Optional[str]]) -> Optional[str]:
+    """Convertit un fichier Markdown dans un processus de conversion."""
+    return _worker_exporter.convert_to_html(*paths)
+
 class HTMLExporter:
     """
     Classe responsable de la conversion des rapports Markdown en HTML.
@@ -154,21 +218,33 @@ class HTMLExporter:
         
         logger.info("Exportateur HTML initialisé")
     
-    def convert_to_html(self, markdown_file, html_file=None):
+    @cached_property
+    def markdown(self):
+        """
+        Convertisseur partagé par toutes les conversions, créé à la première: les extensions
+        (et Pygments pour codehilite) ne sont chargées qu'une fois, et seulement si besoin.
+        """
+        import markdown
+        return markdown.Markdown(extensions=[
+            'markdown.extensions.tables',
+            'markdown.extensions.fenced_code',
+            'markdown.extensions.codehilite',
+            'markdown.extensions.toc'
+        ])
+    
+    def convert_to_html(self, markdown_file, html_file=None, css_href: Optional[str] = None):
         """
         Convertit un fichier Markdown en HTML.
         
         Args:
             markdown_file (str): Chemin du fichier Markdown à convertir
             html_file (str, optional): Chemin du fichier HTML de sortie
+            css_href (str, optional): Feuille de style externe à référencer au lieu
+                d'intégrer les styles CSS dans la page
             
         Returns:
             str: Chemin du fichier HTML généré
         """
-        if not os.path.isfile(markdown_file):
-            logger.error(f"Le fichier Markdown {markdown_file} n'existe pas")
-            return None
-        
         # Si le fichier HTML n'est pas spécifié, utiliser le même nom avec l'extension .html
         if html_file is None:
             html_file = os.path.splitext(markdown_file)[0] + '.html'
@@ -178,53 +254,30 @@ class HTMLExporter:
             with open(markdown_file, 'r', encoding='utf-8') as f:
                 markdown_content = f.read()
             
-            # Conversion en HTML
-            html_content = markdown.markdown(
-                markdown_content,
-                extensions=[
-                    'markdown.extensions.tables',
-                    'markdown.extensions.fenced_code',
-                    'markdown.extensions.codehilite',
-                    'markdown.extensions.toc'
-                ]
-            )
+            # Conversion en HTML (reset() vide l'état laissé par le document précédent)
+            html_content = self.markdown.reset().convert(markdown_content)
             
-            # Ajout des styles CSS et de la structure HTML complète
-            full_html = f"""<!DOCTYPE html>
-<html lang="fr">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>{os.path.basename(markdown_file)}</title>
-    <style>
-{self.css_style}
-    </style>
-</head>
-<body>
-    <div class="header">
-        <h1 class="header-title">Rapport d'analyse de code</h1>
-        <div class="header-meta">
-            Généré le {self._get_current_date()}
-        </div>
-    </div>
-    
-    {html_content}
-    
-    <div class="footer">
-        <p>Généré par LLM Destekli Kod Analiz ve Refaktör Ajanı</p>
-    </div>
-</body>
-</html>"""
+            # Écriture du fichier HTML: structure, styles CSS et contenu converti
+            with open(html_file, 'w', encoding='utf-8', buffering=HTML_WRITE_BUFFER_SIZE) as f:
+                f.write(_HTML_DOCUMENT_START.substitute(title=os.path.basename(markdown_file)))
+                if css_href is None:
+                    f.write(_HTML_STYLE_START)
+                    f.write(self.css_style)
+                    f.write(_HTML_STYLE_END)
+                else:
+                    f.write(_HTML_STYLESHEET_LINK.substitute(href=css_href))
+                f.write(_HTML_BODY_START.substitute(date=self._get_current_date()))
+                f.write(html_content)
+                f.write(_HTML_DOCUMENT_END)
             
-            # Écriture du fichier HTML
-            with open(html_file, 'w', encoding='utf-8') as f:
-                f.write(full_html)
-            
-            logger.info(f"Conversion de {markdown_file} en {html_file} réussie")
+            logger.info("Conversion de %s en %s réussie", markdown_file, html_file)
             return html_file
             
+        except (FileNotFoundError, IsADirectoryError):
+            logger.error("Le fichier Markdown %s n'existe pas", markdown_file)
+            return None
         except Exception as e:
-            logger.error(f"Erreur lors de la conversion de {markdown_file} en HTML: {str(e)}")
+            logger.error("Erreur lors de la conversion de %s en HTML: %s", markdown_file, e)
             return None
     
     def _get_current_date(self):
@@ -248,33 +301,42 @@ class HTMLExporter:
             bool: True si le style a été appliqué avec succès, False sinon
         """
         if not os.path.isfile(css_file):
-            logger.error(f"Le fichier CSS {css_file} n'existe pas")
+            logger.error("Le fichier CSS %s n'existe pas", css_file)
             return False
         
         try:
             with open(css_file, 'r', encoding='utf-8') as f:
                 self.css_style = f.read()
             
-            logger.info(f"Style CSS personnalisé appliqué depuis {css_file}")
+            logger.info("Style CSS personnalisé appliqué depuis %s", css_file)
             return True
             
         except Exception as e:
-            logger.error(f"Erreur lors de l'application du style CSS personnalisé: {str(e)}")
+            logger.error("Erreur lors de l'application du style CSS personnalisé: %s", e)
             return False
     
-    def batch_convert(self, markdown_dir, html_dir=None):
+    def batch_convert(self, markdown_dir, html_dir=None, workers: Optional[int] = None,
+                      external_css: bool = False):
         """
         Convertit tous les fichiers Markdown d'un répertoire en HTML.
+        La conversion (Markdown et coloration Pygments) sollicite le processeur: à partir de
+        PARALLEL_MIN_FILES fichiers, elle est répartie sur un pool de processus.
+        Avec external_css, les styles CSS sont écrits une seule fois dans CSS_FILE_NAME,
+        partagé par toutes les pages du répertoire, au lieu d'être répétés dans chacune;
+        les pages ne sont alors plus autonomes. Un CSS_FILE_NAME existant et différent
+        n'est jamais écrasé: les styles restent alors intégrés à chaque page.
         
         Args:
             markdown_dir (str): Chemin du répertoire contenant les fichiers Markdown
             html_dir (str, optional): Chemin du répertoire de sortie pour les fichiers HTML
+            workers (int, optional): Nombre de processus (par défaut, un par cœur)
+            external_css (bool): True pour partager les styles CSS dans CSS_FILE_NAME
             
         Returns:
             int: Nombre de fichiers convertis avec succès
         """
         if not os.path.isdir(markdown_dir):
-            logger.error(f"Le répertoire {markdown_dir} n'existe pas")
+            logger.error("Le répertoire %s n'existe pas", markdown_dir)
             return 0
         
         # Si le répertoire HTML n'est pas spécifié, utiliser le même répertoire
@@ -284,23 +346,45 @@ class HTMLExporter:
             # Créer le répertoire s'il n'existe pas
             os.makedirs(html_dir, exist_ok=True)
         
-        # Recherche des fichiers Markdown
-        markdown_files = [f for f in os.listdir(markdown_dir) if f.endswith('.md')]
+        # Recherche des fichiers Markdown (le type des entrées est fourni par le parcours du répertoire)
+        with os.scandir(markdown_dir) as entries:
+            markdown_files = [entry.name for entry in entries if entry.name.endswith('.md') and entry.is_file()]
         
         if not markdown_files:
-            logger.warning(f"Aucun fichier Markdown trouvé dans {markdown_dir}")
+            logger.warning("Aucun fichier Markdown trouvé dans %s", markdown_dir)
             return 0
         
+        css_href = None
+        if external_css:
+            css_path = os.path.join(html_dir, CSS_FILE_NAME)
+            try:
+                # Création exclusive: une feuille de style existante n'est pas remplacée
+                with open(css_path, 'x', encoding='utf-8') as f:
+                    f.write(self.css_style)
+                css_href = CSS_FILE_NAME
+            except FileExistsError:
+                with open(css_path, 'r', encoding='utf-8') as f:
+                    if f.read() == self.css_style:
+                        css_href = CSS_FILE_NAME
+                    else:
+                        logger.warning("%s existe déjà, styles intégrés à chaque page", css_path)
+        
+        paths = [
+            (os.path.join(markdown_dir, md_file), os.path.join(html_dir, os.path.splitext(md_file)[0] + '.html'), css_href)
+            for md_file in markdown_files
+        ]
+        workers = workers or os.cpu_count() or 1
+        
         # Conversion de chaque fichier
-        success_count = 0
-        for md_file in markdown_files:
-            md_path = os.path.join(markdown_dir, md_file)
-            html_path = os.path.join(html_dir, os.path.splitext(md_file)[0] + '.html')
-            
-            if self.convert_to_html(md_path, html_path):
-                success_count += 1
+        if workers > 1 and len(paths) >= PARALLEL_MIN_FILES:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                     initargs=(self.css_style,)) as executor:
+                results = list(executor.map(_convert_one, paths, chunksize=4))
+        else:
+            results = [self.convert_to_html(*file_paths) for file_paths in paths]
+        success_count = sum(1 for result in results if result)
         
-        logger.info(f"{success_count}/{len(markdown_files)} fichiers Markdown convertis en HTML")
+        logger.info("%d/%d fichiers Markdown convertis en HTML", success_count, len(markdown_files))
         return success_count
 
 # Test unitaire simple si exécuté directement
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Module de configuration des clients HTTP des agents.
+Le client synchrone des API Batch et les clients asynchrones des analyses partagent
+le même délai maximal et les mêmes limites de pool de connexions. Les connexions d'un
+client asynchrone sont liées à la boucle d'événements qui l'a créé: chaque agent crée
+un client par boucle, fermé lorsque la boucle s'arrête.
+"""
+
+import asyncio
+import logging
+from typing import Awaitable, Callable, Type
+
+import httpx
+
+logger = logging.getLogger('llm_code_agent.http_clients')
+
+# Délai maximal d'une requête et d'une connexion, en secondes (les analyses longues
+# dépassent largement le défaut de httpx)
+HTTP_TIMEOUT_SECONDS = 600.0
+HTTP_CONNECT_TIMEOUT_SECONDS = 10.0
+HTTP_TIMEOUT = httpx.Timeout(HTTP_TIMEOUT_SECONDS, connect=HTTP_CONNECT_TIMEOUT_SECONDS)
+
+# Nombre minimal de connexions simultanées par client
+DEFAULT_MAX_CONNECTIONS = 64
+
+def http_limits(max_connections: int = DEFAULT_MAX_CONNECTIONS, limits_type: Type = httpx.Limits):
+    """
+    Limites du pool de connexions d'un client HTTP.
+
+    Args:
+        max_connections (int): Nombre maximal de connexions simultanées
+        limits_type (type): Classe Limits du httpx utilisé par le client (celui du SDK
+            pour les clients des agents)
+
+    Returns:
+        Limites du pool (la moitié des connexions gardées ouvertes)
+    """
+    return limits_type(max_connections=max_connections, max_keepalive_connections=max_connections // 2)
+
+def close_on_loop_shutdown(close: Callable[[], Awaitable[None]]) -> asyncio.Task:
+    """
+    Planifie la fermeture d'un client à l'arrêt de la boucle courante.
+    asyncio.run annule les tâches encore en attente avant de fermer la boucle: la tâche
+    créée attend jusque-là, puis ferme le client et ses connexions.
+
+    Args:
+        close (Callable[[], Awaitable[None]]): Méthode de fermeture du client (aclose, close)
+
+    Returns:
+        asyncio.Task: Tâche de fermeture, à conserver (la boucle n'en garde qu'une référence faible)
+    """
+    async def wait_for_shutdown() -> None:
+        try:
+            await asyncio.Event().wait()
+        finally:
+            try:
+                await close()
+            except Exception as e:
+                logger.debug("Erreur lors de la fermeture d'un client HTTP: %s", e)
+
+    return asyncio.get_running_loop().create_task(wait_for_shutdown())
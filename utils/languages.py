@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Module de détection du langage de programmation d'un fichier.
+Partagé par les agents LLM pour construire leurs prompts.
+"""
+
+import re
+from functools import lru_cache
+from types import MappingProxyType
+
+# Table en lecture seule, partagée par tous les agents
+LANGUAGE_MAP = MappingProxyType({
+    '.py': 'Python',
+    '.js': 'JavaScript',
+    '.ts': 'TypeScript',
+    '.tsx': 'TypeScript React',
+    '.jsx': 'JavaScript React',
+    '.html': 'HTML',
+    '.css': 'CSS',
+    '.json': 'JSON',
+    '.md': 'Markdown'
+})
+
+# Extension finale reconnue, précédée d'au moins un caractère du nom (".py" seul n'a pas d'extension)
+_EXTENSION_RE = re.compile(
+    r'(?<=[^/\\])(' + '|'.join(re.escape(ext) for ext in LANGUAGE_MAP) + r')$',
+    re.IGNORECASE
+)
+
+@lru_cache(maxsize=256)
+def detect_language(file_path: str) -> str:
+    """
+    Détermine le langage de programmation à partir de l'extension du fichier.
+    Le résultat est mémorisé: les trois agents (et chaque bloc d'un fichier découpé)
+    le demandent pour le même chemin.
+
+    Args:
+        file_path (str): Chemin ou nom du fichier
+
+    Returns:
+        str: Nom du langage ('Code' si l'extension n'est pas reconnue)
+    """
+    match = _EXTENSION_RE.search(file_path)
+    return LANGUAGE_MAP[match.group(1).lower()] if match else 'Code'
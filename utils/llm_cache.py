@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Module de cache persistant des réponses LLM.
+Ce module évite de renvoyer aux API un prompt déjà traité en stockant les réponses dans SQLite.
+"""
+
+import os
+import json
+import time
+import zlib
+import sqlite3
+import hashlib
+import logging
+import functools
+import threading
+from typing import Optional
+
+logger = logging.getLogger('llm_code_agent.llm_cache')
+
+# Version des prompts: à incrémenter dès qu'un template ou un prompt système change
+PROMPT_VERSION = "2"
+
+DEFAULT_CACHE_PATH = os.path.join('.llm_cache', 'responses.sqlite3')
+
+class LLMCache:
+    """
+    Cache clé/valeur des réponses LLM stocké dans une base SQLite.
+    Les réponses sont compressées et peuvent expirer après un TTL.
+    """
+
+    def __init__(self, db_path: Optional[str] = None, ttl: Optional[float] = None):
+        """
+        Initialise le cache.
+
+        Args:
+            db_path (str, optional): Chemin de la base SQLite
+            ttl (float, optional): Durée de validité des entrées en secondes
+        """
+        self.db_path = db_path or os.getenv('LLM_CACHE_PATH', DEFAULT_CACHE_PATH)
+        self.ttl = ttl
+
+        cache_dir = os.path.dirname(self.db_path)
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value BLOB, created REAL)"
+        )
+        self._conn.commit()
+        logger.debug("Cache LLM initialisé dans %s", self.db_path)
+
+    @staticmethod
+    def make_key(provider: str, model: str, prompt: str) -> str:
+        """
+        Calcule la clé de cache d'un appel LLM.
+
+        Args:
+            provider (str): Fournisseur de l'API (anthropic, openai, google)
+            model (str): Modèle utilisé
+            prompt (str): Prompt envoyé au modèle
+
+        Returns:
+            str: Empreinte SHA256 de l'appel
+        """
+        payload = json.dumps(
+            {"p": provider, "m": model, "v": PROMPT_VERSION, "c": prompt},
+            sort_keys=True
+        ).encode('utf-8')
+        return hashlib.sha256(payload).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        Récupère une réponse du cache.
+
+        Args:
+            key (str): Clé de l'appel
+
+        Returns:
+            Optional[str]: Réponse mise en cache, ou None si absente ou expirée
+        """
+        query = "SELECT value FROM cache WHERE key = ?"
+        params = [key]
+        if self.ttl is not None:
+            query += " AND created > ?"
+            params.append(time.time() - self.ttl)
+
+        with self._lock:
+            row = self._conn.execute(query, params).fetchone()
+
+        if row is None:
+            return None
+        return zlib.decompress(row[0]).decode('utf-8')
+
+    def set(self, key: str, value: str) -> None:
+        """
+        Enregistre une réponse dans le cache.
+
+        Args:
+            key (str): Clé de l'appel
+            value (str): Réponse à stocker
+        """
+        blob = zlib.compress(value.encode('utf-8'))
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, created) VALUES (?, ?, ?)",
+                (key, blob, time.time())
+            )
+            self._conn.commit()
+
+    def close(self) -> None:
+        """Ferme la connexion à la base."""
+        with self._lock:
+            self._conn.close()
+
+_default_cache: Optional[LLMCache] = None
+
+def get_default_cache() -> Optional[LLMCache]:
+    """
+    Retourne le cache partagé par les agents, créé au premier appel.
+    Le cache est désactivé lorsque LLM_CACHE_ENABLED vaut 0.
+
+    Returns:
+        Optional[LLMCache]: Cache partagé, ou None si désactivé
+    """
+    global _default_cache
+    if os.getenv('LLM_CACHE_ENABLED', '1') == '0':
+        return None
+    if _default_cache is None:
+        ttl = os.getenv('LLM_CACHE_TTL')
+        _default_cache = LLMCache(ttl=float(ttl) if ttl else None)
+    return _default_cache
+
+def resolve_cache(cache_path: Optional[str] = None, use_cache: bool = True) -> Optional[LLMCache]:
+    """
+    Détermine le cache d'un agent à partir de ses options.
+
+    Args:
+        cache_path (str, optional): Base SQLite dédiée à l'agent (cache partagé sinon)
+        use_cache (bool): False pour désactiver le cache
+
+    Returns:
+        Optional[LLMCache]: Cache de l'agent, ou None si désactivé
+    """
+    if not use_cache:
+        return None
+    if cache_path is not None:
+        return LLMCache(cache_path)
+    return get_default_cache()
+
+def cached_call(provider: str):
+    """
+    Décorateur mettant en cache le résultat d'une méthode d'agent `async def m(self, prompt, ...)`.
+    La clé dépend du fournisseur, de `self.model`, de PROMPT_VERSION et du prompt.
+    Le cache utilisé est `self.cache` s'il est défini (None le désactive), sinon le cache partagé.
+    Seules les réponses obtenues sans exception sont mises en cache.
+
+    Args:
+        provider (str): Fournisseur de l'API
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(self, prompt: str, *args, **kwargs):
+            cache = self.cache if hasattr(self, 'cache') else get_default_cache()
+            if cache is None:
+                return await func(self, prompt, *args, **kwargs)
+
+            key = LLMCache.make_key(provider, self.model, prompt)
+            cached = cache.get(key)
+            if cached is not None:
+                logger.debug("Réponse %s trouvée dans le cache (%s)", provider, key[:12])
+                return cached
+
+            result = await func(self, prompt, *args, **kwargs)
+            cache.set(key, result)
+            return result
+        return wrapper
+    return decorator
@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Module de limitation du débit des appels aux API LLM.
+Un seau à jetons par fournisseur, partagé par tous les agents, retarde les requêtes
+avant que la limite de jetons par minute du fournisseur ne soit atteinte; un second seau
+fait de même pour la limite de requêtes par minute. Le seau est
+recalé sur les en-têtes de limite de débit renvoyés par Anthropic et OpenAI, et suspendu
+après une erreur 429 le temps annoncé par l'en-tête Retry-After.
+"""
+
+import os
+import re
+import math
+import time
+import asyncio
+import logging
+from datetime import datetime
+from typing import Dict, Mapping, Optional, Tuple
+
+logger = logging.getLogger('llm_code_agent.rate_limiter')
+
+# Période de renouvellement des limites des fournisseurs (jetons par minute)
+REFILL_PERIOD = 60.0
+
+# Pause appliquée à tous les appels d'un fournisseur après une erreur 429 sans Retry-After
+DEFAULT_RATE_LIMIT_PAUSE = 5.0
+
+_DURATION_PART = re.compile(r'(\d+(?:\.\d+)?)(ms|s|m|h)')
+_DURATION_UNITS = {'ms': 0.001, 's': 1.0, 'm': 60.0, 'h': 3600.0}
+
+class TokenBucket:
+    """
+    Seau à jetons asynchrone.
+    Sans limite configurée, le seau n'est contraint que par les en-têtes reçus des API.
+    """
+
+    def __init__(self, capacity: Optional[float] = None, refill_period: float = REFILL_PERIOD):
+        """
+        Initialise le seau.
+
+        Args:
+            capacity (float, optional): Nombre de jetons disponibles par période
+            refill_period (float): Durée de renouvellement complet du seau, en secondes
+        """
+        self.capacity = capacity
+        self.refill_period = refill_period
+        self._tokens = capacity if capacity is not None else math.inf
+        self._updated = time.monotonic()
+        self._reset_at: Optional[float] = None
+        self._lock: Optional[asyncio.Lock] = None
+        self._lock_loop = None
+
+    def _get_lock(self) -> asyncio.Lock:
+        """Retourne le verrou de la boucle courante (le seau survit aux appels à asyncio.run)."""
+        loop = asyncio.get_running_loop()
+        if self._lock is None or self._lock_loop is not loop:
+            self._lock = asyncio.Lock()
+            self._lock_loop = loop
+        return self._lock
+
+    def _refill(self) -> None:
+        """Met à jour les jetons disponibles en fonction du temps écoulé."""
+        now = time.monotonic()
+        if self._reset_at is not None and now >= self._reset_at:
+            self._tokens = self.capacity if self.capacity is not None else math.inf
+            self._reset_at = None
+        elif self.capacity is not None and self._reset_at is None:
+            elapsed = now - self._updated
+            self._tokens = min(self.capacity, self._tokens + elapsed * self.capacity / self.refill_period)
+        self._updated = now
+
+    def _wait_time(self, tokens: float) -> float:
+        """Durée d'attente estimée avant que `tokens` jetons soient disponibles."""
+        if self._reset_at is not None:
+            return max(self._reset_at - time.monotonic(), 0.0)
+        return (tokens - self._tokens) * self.refill_period / self.capacity
+
+    async def acquire(self, tokens: int) -> None:
+        """
+        Attend que `tokens` jetons soient disponibles puis les consomme.
+        Les appelants sont servis dans leur ordre d'arrivée.
+
+        Args:
+            tokens (int): Nombre de jetons nécessaires à la requête
+        """
+        if self.capacity is not None:
+            # Une requête plus grosse que le seau passe dès qu'il est plein
+            tokens = min(tokens, self.capacity)
+
+        async with self._get_lock():
+            self._refill()
+            while self._tokens < tokens:
+                delay = self._wait_time(tokens)
+                logger.debug("Limite de débit proche, attente de %.1f s", delay)
+                await asyncio.sleep(delay)
+                self._refill()
+            self._tokens -= tokens
+
+    def update(self, remaining: float, reset_after: float) -> None:
+        """
+        Recale le seau sur l'état annoncé par le fournisseur.
+
+        Args:
+            remaining (float): Jetons restants dans la fenêtre courante
+            reset_after (float): Délai avant renouvellement de la fenêtre, en secondes
+        """
+        self._tokens = remaining
+        self._updated = time.monotonic()
+        self._reset_at = self._updated + reset_after
+
+    def record_rate_limit(self, retry_after: Optional[float] = None) -> None:
+        """
+        Suspend le seau après une erreur 429: les requêtes en cours d'attente ou réessayées
+        patientent toutes jusqu'à la fin de la pause au lieu de relancer l'API en même temps.
+
+        Args:
+            retry_after (float, optional): Délai annoncé par le fournisseur, en secondes
+        """
+        pause = retry_after if retry_after is not None else DEFAULT_RATE_LIMIT_PAUSE
+        self._tokens = 0
+        self._updated = time.monotonic()
+        # Une fenêtre annoncée plus longue par les en-têtes est conservée
+        self._reset_at = max(self._reset_at or 0.0, self._updated + pause)
+        logger.debug("Limite de débit atteinte, appels suspendus pendant %.1f s", pause)
+
+def parse_openai_headers(headers: Mapping[str, str], resource: str = 'tokens') -> Optional[Tuple[float, float]]:
+    """
+    Lit les en-têtes de limite de débit d'OpenAI (`x-ratelimit-*-tokens` ou `x-ratelimit-*-requests`).
+
+    Args:
+        headers (Mapping[str, str]): En-têtes de la réponse
+        resource (str): Ressource limitée ('tokens' ou 'requests')
+
+    Returns:
+        Optional[Tuple[float, float]]: (quantité restante, délai de renouvellement en secondes)
+    """
+    remaining = headers.get(f'x-ratelimit-remaining-{resource}')
+    reset = headers.get(f'x-ratelimit-reset-{resource}')
+    if remaining is None or reset is None:
+        return None
+    # Durée au format "6m0s", "1.5s" ou "20ms"
+    reset_after = sum(float(value) * _DURATION_UNITS[unit] for value, unit in _DURATION_PART.findall(reset))
+    return float(remaining), reset_after
+
+def parse_anthropic_headers(headers: Mapping[str, str], resource: str = 'tokens') -> Optional[Tuple[float, float]]:
+    """
+    Lit les en-têtes de limite de débit d'Anthropic (`anthropic-ratelimit-tokens-*` ou
+    `anthropic-ratelimit-requests-*`).
+
+    Args:
+        headers (Mapping[str, str]): En-têtes de la réponse
+        resource (str): Ressource limitée ('tokens' ou 'requests')
+
+    Returns:
+        Optional[Tuple[float, float]]: (quantité restante, délai de renouvellement en secondes)
+    """
+    remaining = headers.get(f'anthropic-ratelimit-{resource}-remaining')
+    reset = headers.get(f'anthropic-ratelimit-{resource}-reset')
+    if remaining is None or reset is None:
+        return None
+    # Date de renouvellement au format RFC 3339
+    try:
+        reset_at = datetime.fromisoformat(reset.replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    return float(remaining), max(reset_at.timestamp() - time.time(), 0.0)
+
+def parse_retry_after(headers: Optional[Mapping[str, str]]) -> Optional[float]:
+    """
+    Lit le délai d'attente d'une réponse 429 (`retry-after-ms` ou `retry-after` en secondes).
+
+    Args:
+        headers (Mapping[str, str], optional): En-têtes de la réponse
+
+    Returns:
+        Optional[float]: Délai en secondes, None s'il est absent ou illisible
+    """
+    if not headers:
+        return None
+    try:
+        if headers.get('retry-after-ms') is not None:
+            return float(headers['retry-after-ms']) / 1000
+        if headers.get('retry-after') is not None:
+            return float(headers['retry-after'])
+    except ValueError:
+        # Retry-After au format date HTTP: la pause par défaut s'applique
+        pass
+    return None
+
+_rate_limiters: Dict[str, TokenBucket] = {}
+_request_limiters: Dict[str, TokenBucket] = {}
+
+def get_rate_limiter(provider: str) -> TokenBucket:
+    """
+    Retourne le seau partagé d'un fournisseur, créé au premier appel.
+    La limite se configure avec LLM_RATE_LIMIT_<FOURNISSEUR> (jetons par minute).
+
+    Args:
+        provider (str): Fournisseur de l'API (anthropic, openai, google)
+
+    Returns:
+        TokenBucket: Seau à jetons du fournisseur
+    """
+    if provider not in _rate_limiters:
+        capacity = os.getenv(f'LLM_RATE_LIMIT_{provider.upper()}')
+        _rate_limiters[provider] = TokenBucket(float(capacity) if capacity else None)
+    return _rate_limiters[provider]
+
+def get_request_limiter(provider: str) -> TokenBucket:
+    """
+    Retourne le seau partagé des requêtes d'un fournisseur (un jeton par requête).
+    La limite se configure avec LLM_REQUEST_LIMIT_<FOURNISSEUR> (requêtes par minute).
+
+    Args:
+        provider (str): Fournisseur de l'API (anthropic, openai, google)
+
+    Returns:
+        TokenBucket: Seau des requêtes du fournisseur
+    """
+    if provider not in _request_limiters:
+        capacity = os.getenv(f'LLM_REQUEST_LIMIT_{provider.upper()}')
+        _request_limiters[provider] = TokenBucket(float(capacity) if capacity else None)
+    return _request_limiters[provider]
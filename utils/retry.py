@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Module de gestion des nouvelles tentatives pour les appels aux API LLM.
+Les erreurs transitoires (limite de débit, timeout, erreur serveur) sont réessayées
+selon un calendrier d'attente fixe (avec gigue), les autres erreurs sont propagées immédiatement.
+"""
+
+import os
+import logging
+from typing import Type
+
+from tenacity import (
+    before_sleep_log,
+    retry,
+    retry_if_exception_type,
+    stop_after_attempt,
+    wait_chain,
+    wait_fixed,
+    wait_random,
+)
+
+logger = logging.getLogger('llm_code_agent.retry')
+
+RETRY_ATTEMPTS = int(os.getenv('LLM_RETRY_ATTEMPTS', '5'))
+# Attentes successives entre les tentatives, en secondes (la dernière est répétée au-delà).
+# L'attente totale au pire est donc connue: sum(BACKOFF_SCHEDULE) + une seconde de gigue par attente.
+BACKOFF_SCHEDULE = (1.0, 3.0, 9.0, 27.0)
+RETRY_JITTER = 1.0
+
+def llm_retry(*exception_types: Type[BaseException]):
+    """
+    Décorateur réessayant un appel LLM sur les erreurs transitoires du fournisseur.
+
+    Args:
+        *exception_types: Exceptions du SDK considérées comme transitoires
+
+    Returns:
+        Callable: Décorateur tenacity (compatible avec les coroutines)
+    """
+    return retry(
+        stop=stop_after_attempt(RETRY_ATTEMPTS),
+        wait=wait_chain(*(wait_fixed(delay) for delay in BACKOFF_SCHEDULE)) + wait_random(0, RETRY_JITTER),
+        retry=retry_if_exception_type(exception_types),
+        before_sleep=before_sleep_log(logger, logging.DEBUG),
+        reraise=True,
+    )
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Module de cache sémantique des analyses.
+Ce module réutilise les analyses d'un fichier quasi identique (formatage, commentaires,
+imports réordonnés) en comparant les embeddings du code normalisé.
+"""
+
+import io
+import logging
+import threading
+import tokenize
+from typing import Dict, List, Optional
+
+logger = logging.getLogger('llm_code_agent.semantic_cache')
+
+DEFAULT_MODEL = "all-MiniLM-L6-v2"
+DEFAULT_THRESHOLD = 0.95
+
+# Tokens sans influence sur la sémantique du code Python
+_IGNORED_TOKENS = {
+    tokenize.COMMENT, tokenize.NL, tokenize.NEWLINE,
+    tokenize.INDENT, tokenize.DEDENT, tokenize.ENCODING, tokenize.ENDMARKER
+}
+
+def normalize_code(code_content: str, file_path: str) -> str:
+    """
+    Normalise le code avant calcul de l'embedding.
+    Les commentaires et la mise en forme sont supprimés pour le Python; pour les autres
+    langages, les espaces sont simplement compactés.
+
+    Args:
+        code_content (str): Contenu du fichier
+        file_path (str): Chemin du fichier
+
+    Returns:
+        str: Code normalisé
+    """
+    if file_path.endswith('.py'):
+        try:
+            tokens = tokenize.generate_tokens(io.StringIO(code_content).readline)
+            return ' '.join(tok.string for tok in tokens if tok.type not in _IGNORED_TOKENS)
+        except (tokenize.TokenError, IndentationError, SyntaxError):
+            logger.debug("Tokenisation impossible pour %s, normalisation simple", file_path)
+
+    return ' '.join(code_content.split())
+
+class SemanticCache:
+    """
+    Index en mémoire des analyses déjà produites, interrogé par similarité cosinus.
+    Nécessite les paquets optionnels `sentence-transformers` et `faiss-cpu`.
+    """
+
+    def __init__(self, model_name: str = DEFAULT_MODEL, threshold: float = DEFAULT_THRESHOLD):
+        """
+        Initialise le cache sémantique.
+
+        Args:
+            model_name (str): Modèle sentence-transformers utilisé pour les embeddings
+            threshold (float): Similarité cosinus minimale pour réutiliser une analyse
+        """
+        try:
+            import faiss
+            from sentence_transformers import SentenceTransformer
+        except ImportError as e:
+            raise ImportError(
+                "Le cache sémantique nécessite les paquets sentence-transformers et faiss-cpu"
+            ) from e
+
+        self.threshold = threshold
+        self._encoder = SentenceTransformer(model_name)
+        self._index = faiss.IndexFlatIP(self._encoder.get_sentence_embedding_dimension())
+        self._entries: List[Dict] = []
+        self._lock = threading.Lock()
+        logger.info("Cache sémantique initialisé avec le modèle %s", model_name)
+
+    def embed(self, code_content: str, file_path: str):
+        """
+        Calcule l'embedding normalisé (norme 1) du code.
+
+        Args:
+            code_content (str): Contenu du fichier
+            file_path (str): Chemin du fichier
+
+        Returns:
+            numpy.ndarray: Embedding de forme (1, dimension)
+        """
+        normalized = normalize_code(code_content, file_path)
+        return self._encoder.encode(
+            [normalized], normalize_embeddings=True, convert_to_numpy=True
+        ).astype('float32')
+
+    def search(self, vector) -> Optional[Dict]:
+        """
+        Recherche l'analyse la plus proche d'un embedding.
+
+        Args:
+            vector (numpy.ndarray): Embedding calculé par `embed`
+
+        Returns:
+            Optional[Dict]: Entrée en cache si la similarité dépasse le seuil, None sinon
+        """
+        with self._lock:
+            if not self._entries:
+                return None
+            scores, ids = self._index.search(vector, 1)
+
+        if scores[0][0] >= self.threshold:
+            return self._entries[ids[0][0]]
+        return None
+
+    def add(self, vector, entry: Dict) -> None:
+        """
+        Ajoute une analyse à l'index.
+
+        Args:
+            vector (numpy.ndarray): Embedding calculé par `embed`
+            entry (Dict): Analyses à réutiliser (claude_analysis, gpt_review, gemini_suggestions)
+        """
+        with self._lock:
+            self._index.add(vector)
+            self._entries.append(entry)
@@ -0,0 +1,28 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Module de formatage des dates des rapports.
+Les rapports d'un même lot sont générés dans la même seconde ou presque: la date
+formatée est mise en cache pour la seconde courante au lieu d'appeler localtime()
+pour chaque rapport.
+"""
+
+import time
+from functools import lru_cache
+
+REPORT_DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+@lru_cache(maxsize=1)
+def _format_second(second: int) -> str:
+    """Formate une date exprimée en secondes depuis l'epoch (heure locale)."""
+    return time.strftime(REPORT_DATE_FORMAT, time.localtime(second))
+
+def report_timestamp() -> str:
+    """
+    Retourne la date courante au format des rapports.
+
+    Returns:
+        str: Date au format AAAA-MM-JJ HH:MM:SS
+    """
+    return _format_second(int(time.time()))
@@ -7,58 +7,278 @@ Ce module est responsable de l'extraction, de la validation et de la sauvegarde
 """
 
 import os
-import json
+import re
 import logging
+import mmap
+import sys
 import time
-from typing import List, Dict, Optional, Set
-from datetime import datetime
+from collections import Counter
+from contextlib import contextmanager
+from operator import itemgetter
+from typing import Iterator, List, Dict, Optional, Set, Tuple
+import orjson
 
 logger = logging.getLogger('llm_code_agent.todo_manager')
 
+# Mots d'un titre `##` qui ouvre un TODO dans le texte d'une analyse (en minuscules)
+TODO_TITLE_WORDS = ('todo', 'tâche', 'amélioration')
+
+# Fichier de tâches compressé en zstd (paquet optionnel zstandard) s'il porte ce suffixe
+ZSTD_SUFFIX = '.zst'
+ZSTD_LEVEL = 3
+_ZSTD_MAGIC = b'\x28\xb5\x2f\xfd'
+
+# Champs d'une tâche aux valeurs très répétées, partagées entre tâches au chargement
+INTERNED_FIELDS = ('priority', 'effort', 'source', 'file')
+
+# Champs indispensables d'une tâche enregistrée (index et statistiques)
+STORED_FIELDS = frozenset({'id', 'description', 'priority', 'effort', 'file'})
+
+TEXT_PRIORITY_LEVELS = {
+    'critique': 'Critique', 'critical': 'Critique',
+    'élevé': 'Élevée', 'élevée': 'Élevée', 'high': 'Élevée',
+    'moyenne': 'Moyenne', 'medium': 'Moyenne',
+    'faible': 'Faible', 'low': 'Faible'
+}
+
+TEXT_EFFORT_LEVELS = {
+    'élevé': 'Élevé', 'high': 'Élevé',
+    'moyen': 'Moyen', 'medium': 'Moyen',
+    'faible': 'Faible', 'low': 'Faible'
+}
+
+def _alternation(words) -> re.Pattern:
+    """Compile une alternative de mots, les plus longs d'abord ('élevée' avant 'élevé')."""
+    return re.compile('|'.join(sorted(words, key=len, reverse=True)))
+
+# Mot de tâche d'un titre, mot-clé de priorité (groupe 1) ou d'effort, puis valeur qui le
+# suit sur la même ligne; les lignes sont mises en minuscules avant la recherche
+_TITLE_WORD_RE = _alternation(TODO_TITLE_WORDS)
+_MARKER_KEYWORD_RE = re.compile(r'(priorité|priority)|effort')
+_PRIORITY_VALUE_RE = _alternation(TEXT_PRIORITY_LEVELS)
+_EFFORT_VALUE_RE = _alternation(TEXT_EFFORT_LEVELS)
+
+def parse_text_todos(content: str, file_path: Optional[str] = None) -> List[Dict]:
+    """
+    Extrait les tâches TODO du texte d'un rapport d'analyse.
+    Chaque titre `##` mentionnant une tâche ouvre un TODO; les priorités et niveaux
+    d'effort qui suivent, jusqu'au titre de tâche suivant, s'y appliquent.
+    Le texte est parcouru une fois, ligne par ligne: chaque ligne n'est mise en
+    minuscules qu'une fois, et mots-clés et valeurs y sont cherchés par des
+    alternatives compilées.
+    
+    Args:
+        content (str): Contenu du rapport
+        file_path (str, optional): Fichier analysé, renseigné dans chaque TODO s'il est fourni
+        
+    Returns:
+        List[Dict]: Liste des tâches TODO extraites
+    """
+    todos = []
+    current_todo = None
+    
+    for line in content.split('\n'):
+        lowered = line.lower()
+        if lowered.startswith('##') and _TITLE_WORD_RE.search(lowered, 2):
+            current_todo = {
+                'description': line.lstrip('#').strip(),
+                'priority': 'Moyenne',
+                'effort': 'Moyen'
+            }
+            if file_path is not None:
+                current_todo['file'] = file_path
+            todos.append(current_todo)
+            continue
+        if current_todo is None:
+            continue
+        
+        # Plusieurs marqueurs possibles sur une ligne: le plus à gauche est traité en premier
+        position = 0
+        while (marker := _MARKER_KEYWORD_RE.search(lowered, position)) is not None:
+            if marker.group(1):
+                field, levels, value_re = 'priority', TEXT_PRIORITY_LEVELS, _PRIORITY_VALUE_RE
+            else:
+                field, levels, value_re = 'effort', TEXT_EFFORT_LEVELS, _EFFORT_VALUE_RE
+            value = value_re.search(lowered, marker.end())
+            if value is None:
+                position = marker.start() + 1
+                continue
+            current_todo[field] = levels[value.group()]
+            position = value.end()
+    
+    return todos
+
+def _zstandard():
+    """Importe le module zstandard, requis pour les fichiers de tâches compressés."""
+    try:
+        import zstandard
+    except ImportError as e:
+        raise ImportError("Le fichier de tâches compressé nécessite le paquet zstandard") from e
+    return zstandard
+
+def _decompress(data) -> bytes:
+    """
+    Décompresse un fichier de tâches zstd.
+    
+    Args:
+        data: Contenu compressé (bytes ou memoryview)
+        
+    Returns:
+        bytes: JSON des tâches
+    """
+    zstandard = _zstandard()
+    try:
+        return zstandard.ZstdDecompressor().decompress(data)
+    except zstandard.ZstdError as e:
+        raise ValueError(f"Fichier zstd invalide: {e}") from e
+
 class TodoManager:
     """
     Gestionnaire de tâches TODO du projet.
     Responsable de l'extraction, de la validation et de la sauvegarde des tâches.
     """
     
-    def __init__(self, todo_file: str = "project_todo.json"):
+    def __init__(self, todo_file: str = "project_todo.json", durable: bool = False):
         """
         Initialise le gestionnaire de tâches TODO.
         
         Args:
-            todo_file (str): Chemin du fichier JSON contenant les tâches TODO
+            todo_file (str): Chemin du fichier JSON contenant les tâches TODO; avec le suffixe
+                `.zst`, le JSON est compressé en zstd (paquet zstandard requis)
+            durable (bool): True pour forcer l'écriture sur disque (fsync) à chaque sauvegarde;
+                plus lent, mais les tâches survivent à une coupure de courant et pas
+                seulement à l'arrêt du processus
         """
         self.todo_file = todo_file
+        self.durable = durable
+        self.compressed = todo_file.endswith(ZSTD_SUFFIX)
+        if self.compressed:
+            _zstandard()
         self.todos: List[Dict] = []
+        # Index des tâches par ID, par fichier, et des tâches ouvertes par (description, fichier)
+        self._by_id: Dict[str, Dict] = {}
+        self._by_file: Dict[str, List[Dict]] = {}
+        self._open_keys: Set[Tuple[str, str]] = set()
+        # Statistiques calculées depuis la dernière modification
+        self._stats: Optional[Dict] = None
+        # Modifications non écrites, et écriture immédiate hors d'un batch()
+        self._dirty = False
+        self._autoflush = True
         self._load_todos()
-        logger.info(f"Gestionnaire de tâches initialisé avec {len(self.todos)} tâches existantes")
+        logger.info("Gestionnaire de tâches initialisé avec %d tâches existantes", len(self.todos))
     
     def _load_todos(self) -> None:
         """Charge les tâches TODO depuis le fichier JSON."""
         if os.path.exists(self.todo_file):
             try:
-                with open(self.todo_file, 'r', encoding='utf-8') as f:
-                    self.todos = json.load(f)
-                logger.info(f"Chargement de {len(self.todos)} tâches depuis {self.todo_file}")
-            except json.JSONDecodeError as e:
-                logger.error(f"Erreur lors du chargement des tâches: {str(e)}")
+                # Le fichier projeté en mémoire est parsé sur place, sans copie intermédiaire
+                with open(self.todo_file, 'rb') as f, \
+                        mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped, \
+                        memoryview(mapped) as view:
+                    # Un fichier compressé est reconnu à sa signature, quel que soit son nom
+                    if view[:len(_ZSTD_MAGIC)] == _ZSTD_MAGIC:
+                        self.todos = orjson.loads(_decompress(view))
+                    else:
+                        self.todos = orjson.loads(view)
+                if not isinstance(self.todos, list):
+                    raise ValueError("liste de tâches attendue")
+                # Une entrée incomplète (fichier modifié à la main) est écartée plutôt que
+                # de faire échouer le chargement de toutes les autres
+                todos = [todo for todo in self.todos if isinstance(todo, dict) and STORED_FIELDS <= todo.keys()]
+                if len(todos) != len(self.todos):
+                    logger.warning("%d tâche(s) invalide(s) ignorée(s) dans %s",
+                                   len(self.todos) - len(todos), self.todo_file)
+                self.todos = todos
+                # Une seule chaîne par valeur distincte au lieu d'une copie par tâche
+                for todo in self.todos:
+                    for field in INTERNED_FIELDS:
+                        value = todo.get(field)
+                        if isinstance(value, str):
+                            todo[field] = sys.intern(value)
+                logger.info("Chargement de %d tâches depuis %s", len(self.todos), self.todo_file)
+            except (ValueError, ImportError) as e:
+                # JSON ou zstd invalide, fichier vide (mmap refuse une projection de taille nulle),
+                # ou fichier compressé sans le paquet zstandard
+                logger.error("Erreur lors du chargement des tâches: %s", e)
                 self.todos = []
         else:
-            logger.info(f"Fichier {self.todo_file} non trouvé, création d'une nouvelle liste de tâches")
+            logger.info("Fichier %s non trouvé, création d'une nouvelle liste de tâches", self.todo_file)
             self.todos = []
+        self._rebuild_index()
+    
+    @staticmethod
+    def _todo_key(todo: Dict) -> Tuple[str, str]:
+        """Clé de détection des doublons d'une tâche: (description, fichier)."""
+        return todo['description'], todo['file']
+    
+    def _rebuild_index(self) -> None:
+        """Reconstruit les index à partir de la liste des tâches."""
+        self._stats = None
+        self._by_id = {todo['id']: todo for todo in self.todos}
+        self._by_file = {}
+        for todo in self.todos:
+            self._by_file.setdefault(todo['file'], []).append(todo)
+        self._open_keys = {
+            self._todo_key(todo) for todo in self.todos if not todo.get('completed', False)
+        }
     
     def _save_todos(self) -> None:
-        """Sauvegarde les tâches TODO dans le fichier JSON."""
+        """Enregistre une modification des tâches: écrite aussitôt, ou à la fin du batch() en cours."""
+        self._stats = None
+        self._dirty = True
+        if self._autoflush:
+            self.flush()
+    
+    @contextmanager
+    def batch(self) -> Iterator['TodoManager']:
+        """
+        Regroupe les modifications: le fichier n'est réécrit qu'une fois, à la sortie du bloc,
+        au lieu d'une fois par ajout ou par tâche complétée.
+        
+        Yields:
+            TodoManager: Le gestionnaire lui-même
+        """
+        autoflush = self._autoflush
+        self._autoflush = False
         try:
-            with open(self.todo_file, 'w', encoding='utf-8') as f:
-                json.dump(self.todos, f, indent=2, ensure_ascii=False)
-            logger.info(f"{len(self.todos)} tâches sauvegardées dans {self.todo_file}")
+            yield self
+        finally:
+            self._autoflush = autoflush
+            if autoflush:
+                self.flush()
+    
+    def flush(self) -> None:
+        """
+        Sauvegarde les tâches TODO dans le fichier JSON si elles ont été modifiées.
+        Le fichier est écrit à côté puis renommé: un lecteur ou un arrêt brutal ne voit
+        jamais de fichier à moitié écrit.
+        """
+        if not self._dirty:
+            return
+        try:
+            # Nom propre au processus: plusieurs processus peuvent sauvegarder le même fichier
+            tmp_path = f"{self.todo_file}.{os.getpid()}.tmp"
+            try:
+                payload = orjson.dumps(self.todos, option=orjson.OPT_INDENT_2)
+                if self.compressed:
+                    payload = _zstandard().ZstdCompressor(level=ZSTD_LEVEL).compress(payload)
+                with open(tmp_path, 'wb') as f:
+                    f.write(payload)
+                    if self.durable:
+                        f.flush()
+                        os.fsync(f.fileno())
+                os.replace(tmp_path, self.todo_file)
+            except BaseException:
+                if os.path.exists(tmp_path):
+                    os.unlink(tmp_path)
+                raise
+            self._dirty = False
+            logger.debug("%d tâches sauvegardées dans %s", len(self.todos), self.todo_file)
         except Exception as e:
-            logger.error(f"Erreur lors de la sauvegarde des tâches: {str(e)}")
+            logger.error("Erreur lors de la sauvegarde des tâches: %s", e)
     
-    def _generate_todo_id(self) -> str:
-        """Génère un ID unique pour une tâche TODO."""
-        timestamp = int(time.time())
+    def _generate_todo_id(self, timestamp: int) -> str:
+        """Génère un ID unique pour une tâche TODO ajoutée à l'instant donné."""
         return f"todo_{timestamp}_{len(self.todos)}"
     
     def _validate_todo(self, todo: Dict) -> bool:
@@ -73,17 +293,17 @@ class TodoManager:
         """
         required_fields = {'description', 'priority', 'effort', 'file'}
         if not all(field in todo for field in required_fields):
-            logger.warning(f"Tâche invalide: champs requis manquants. Tâche: {todo}")
+            logger.warning("Tâche invalide: champs requis manquants. Tâche: %s", todo)
             return False
         
         valid_priorities = {'Critique', 'Élevée', 'Moyenne', 'Faible'}
         if todo['priority'] not in valid_priorities:
-            logger.warning(f"Priorité invalide: {todo['priority']}. Tâche: {todo}")
+            logger.warning("Priorité invalide: %s. Tâche: %s", todo['priority'], todo)
             return False
         
         valid_efforts = {'Élevé', 'Moyen', 'Faible'}
         if todo['effort'] not in valid_efforts:
-            logger.warning(f"Niveau d'effort invalide: {todo['effort']}. Tâche: {todo}")
+            logger.warning("Niveau d'effort invalide: %s. Tâche: %s", todo['effort'], todo)
             return False
         
         return True
@@ -98,12 +318,7 @@ class TodoManager:
         Returns:
             bool: True si la tâche est un doublon, False sinon
         """
-        for existing_todo in self.todos:
-            if (existing_todo['description'] == new_todo['description'] and
-                existing_todo['file'] == new_todo['file'] and
-                not existing_todo.get('completed', False)):
-                return True
-        return False
+        return self._todo_key(new_todo) in self._open_keys
     
     def add_todos(self, new_todos: List[Dict], source: str = "Unknown") -> None:
         """
@@ -114,23 +329,28 @@ class TodoManager:
             source (str): Source des tâches (Claude, ChatGPT, etc.)
         """
         added_count = 0
+        # Une seule lecture de l'horloge pour tout le lot
+        timestamp = int(time.time())
         for todo in new_todos:
             # Ajout des métadonnées
             todo['source'] = source
-            todo['id'] = self._generate_todo_id()
-            todo['timestamp'] = int(time.time())
+            todo['id'] = self._generate_todo_id(timestamp)
+            todo['timestamp'] = timestamp
             todo['completed'] = False
             
             # Validation et ajout
             if self._validate_todo(todo) and not self._is_duplicate(todo):
                 self.todos.append(todo)
+                self._by_id[todo['id']] = todo
+                self._by_file.setdefault(todo['file'], []).append(todo)
+                self._open_keys.add(self._todo_key(todo))
                 added_count += 1
             else:
-                logger.warning(f"Tâche ignorée: {todo['description']}")
+                logger.debug("Tâche ignorée: %s", todo['description'])
         
         if added_count > 0:
             self._save_todos()
-            logger.info(f"{added_count} nouvelles tâches ajoutées depuis {source}")
+            logger.debug("%d nouvelles tâches ajoutées depuis %s", added_count, source)
     
     def mark_completed(self, todo_id: str) -> bool:
         """
@@ -142,15 +362,17 @@ class TodoManager:
         Returns:
             bool: True si la tâche a été marquée, False sinon
         """
-        for todo in self.todos:
-            if todo['id'] == todo_id:
-                todo['completed'] = True
-                todo['completed_at'] = int(time.time())
-                self._save_todos()
-                logger.info(f"Tâche {todo_id} marquée comme complétée")
-                return True
-        logger.warning(f"Tâche {todo_id} non trouvée")
-        return False
+        todo = self._by_id.get(todo_id)
+        if todo is None:
+            logger.warning("Tâche %s non trouvée", todo_id)
+            return False
+        
+        todo['completed'] = True
+        todo['completed_at'] = int(time.time())
+        self._open_keys.discard(self._todo_key(todo))
+        self._save_todos()
+        logger.info("Tâche %s marquée comme complétée", todo_id)
+        return True
     
     def get_todos(self, 
                  file: Optional[str] = None,
@@ -169,56 +391,41 @@ class TodoManager:
         Returns:
             List[Dict]: Liste des tâches filtrées
         """
-        filtered_todos = self.todos
-        
-        if file is not None:
-            filtered_todos = [todo for todo in filtered_todos if todo['file'] == file]
-        
-        if priority is not None:
-            filtered_todos = [todo for todo in filtered_todos if todo['priority'] == priority]
-        
-        if effort is not None:
-            filtered_todos = [todo for todo in filtered_todos if todo['effort'] == effort]
-        
-        if completed is not None:
-            filtered_todos = [todo for todo in filtered_todos if todo.get('completed', False) == completed]
-        
-        return filtered_todos
+        if file is None and priority is None and effort is None and completed is None:
+            return self.todos
+        
+        # Le filtre par fichier part de l'index; les autres critères, à peu de valeurs
+        # distinctes, sont appliqués ensemble en une seule passe
+        candidates = self.todos if file is None else self._by_file.get(file, [])
+        return [
+            todo for todo in candidates
+            if (priority is None or todo['priority'] == priority)
+            and (effort is None or todo['effort'] == effort)
+            and (completed is None or todo.get('completed', False) == completed)
+        ]
     
     def get_todo_statistics(self) -> Dict:
         """
         Génère des statistiques sur les tâches TODO.
+        Le résultat est conservé jusqu'à la modification suivante des tâches: il est partagé
+        entre les appelants et ne doit pas être modifié.
         
         Returns:
             Dict: Statistiques des tâches
         """
-        stats = {
+        if self._stats is not None:
+            return self._stats
+        
+        # Comptage en C par Counter: une passe sur les tâches par critère, sans dict.get() en Python
+        self._stats = {
             'total': len(self.todos),
-            'completed': len([todo for todo in self.todos if todo.get('completed', False)]),
-            'by_priority': {},
-            'by_effort': {},
-            'by_file': {},
-            'by_source': {}
+            'completed': sum(1 for todo in self.todos if todo.get('completed', False)),
+            'by_priority': dict(Counter(map(itemgetter('priority'), self.todos))),
+            'by_effort': dict(Counter(map(itemgetter('effort'), self.todos))),
+            'by_file': dict(Counter(map(itemgetter('file'), self.todos))),
+            'by_source': dict(Counter(todo.get('source', 'Unknown') for todo in self.todos))
         }
-        
-        for todo in self.todos:
-            # Statistiques par priorité
-            priority = todo['priority']
-            stats['by_priority'][priority] = stats['by_priority'].get(priority, 0) + 1
-            
-            # Statistiques par niveau d'effort
-            effort = todo['effort']
-            stats['by_effort'][effort] = stats['by_effort'].get(effort, 0) + 1
-            
-            # Statistiques par fichier
-            file = todo['file']
-            stats['by_file'][file] = stats['by_file'].get(file, 0) + 1
-            
-            # Statistiques par source
-            source = todo.get('source', 'Unknown')
-            stats['by_source'][source] = stats['by_source'].get(source, 0) + 1
-        
-        return stats
+        return self._stats
     
     def cleanup_duplicates(self) -> int:
         """
@@ -227,22 +434,17 @@ class TodoManager:
         Returns:
             int: Nombre de tâches supprimées
         """
-        seen_descriptions: Set[str] = set()
-        unique_todos = []
-        removed_count = 0
-        
+        # Première occurrence de chaque tâche, dans l'ordre d'origine
+        unique_todos: Dict[Tuple[str, str, str, str], Dict] = {}
         for todo in self.todos:
-            description = todo['description']
-            if description not in seen_descriptions:
-                seen_descriptions.add(description)
-                unique_todos.append(todo)
-            else:
-                removed_count += 1
+            unique_todos.setdefault((todo['description'], todo['priority'], todo['effort'], todo['file']), todo)
+        removed_count = len(self.todos) - len(unique_todos)
         
         if removed_count > 0:
-            self.todos = unique_todos
+            self.todos = list(unique_todos.values())
+            self._rebuild_index()
             self._save_todos()
-            logger.info(f"{removed_count} tâches en double supprimées")
+            logger.info("%d tâches en double supprimées", removed_count)
         
         return removed_count
 
@@ -262,76 +464,31 @@ class TodoManager:
         todos = []
         
         # Extraction depuis l'analyse de Claude
-        claude_todos = self._extract_todos_from_text(claude_analysis)
+        claude_todos = self._extract_todos_from_text(claude_analysis, file_path)
         todos.extend(claude_todos)
         
         # Extraction depuis la review de ChatGPT
-        gpt_todos = self._extract_todos_from_text(gpt_review)
+        gpt_todos = self._extract_todos_from_text(gpt_review, file_path)
         todos.extend(gpt_todos)
         
         # Extraction depuis les suggestions de Gemini
-        gemini_todos = self._extract_todos_from_text(gemini_suggestions)
+        gemini_todos = self._extract_todos_from_text(gemini_suggestions, file_path)
         todos.extend(gemini_todos)
         
-        # Ajout du fichier source à chaque TODO
-        for todo in todos:
-            todo['file'] = file_path
-        
         return todos
 
-    def _extract_todos_from_text(self, content: str) -> List[Dict]:
+    def _extract_todos_from_text(self, content: str, file_path: Optional[str] = None) -> List[Dict]:
         """
         Extrait les tâches TODO à partir du texte d'une analyse.
         
         Args:
             content (str): Contenu de l'analyse
+            file_path (str, optional): Fichier analysé, renseigné dans chaque TODO
             
         Returns:
             List[Dict]: Liste des tâches TODO extraites
         """
-        todos = []
-        lines = content.split('\n')
-        current_todo = None
-        
-        for line in lines:
-            # Détection des titres qui pourraient indiquer une tâche TODO
-            if line.startswith('##') and ('todo' in line.lower() or 'tâche' in line.lower() or 'amélioration' in line.lower()):
-                # Sauvegarder la tâche précédente si elle existe
-                if current_todo:
-                    todos.append(current_todo)
-                
-                # Commencer une nouvelle tâche
-                current_todo = {
-                    'description': line.lstrip('#').strip(),
-                    'priority': 'Moyenne',
-                    'effort': 'Moyen'
-                }
-            
-            # Détection de la priorité
-            elif current_todo and ('priorité' in line.lower() or 'priority' in line.lower()):
-                if 'critique' in line.lower() or 'critical' in line.lower():
-                    current_todo['priority'] = 'Critique'
-                elif 'élevée' in line.lower() or 'high' in line.lower():
-                    current_todo['priority'] = 'Élevée'
-                elif 'moyenne' in line.lower() or 'medium' in line.lower():
-                    current_todo['priority'] = 'Moyenne'
-                elif 'faible' in line.lower() or 'low' in line.lower():
-                    current_todo['priority'] = 'Faible'
-            
-            # Détection du niveau d'effort
-            elif current_todo and 'effort' in line.lower():
-                if 'élevé' in line.lower() or 'high' in line.lower():
-                    current_todo['effort'] = 'Élevé'
-                elif 'moyen' in line.lower() or 'medium' in line.lower():
-                    current_todo['effort'] = 'Moyen'
-                elif 'faible' in line.lower() or 'low' in line.lower():
-                    current_todo['effort'] = 'Faible'
-        
-        # Ajouter la dernière tâche si elle existe
-        if current_todo:
-            todos.append(current_todo)
-        
-        return todos
+        return parse_text_todos(content, file_path)
 
 # Test unitaire simple si exécuté directement
 if __name__ == "__main__":
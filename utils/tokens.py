@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Module de comptage des jetons et de découpage des fichiers volumineux.
+Un fichier dont le nombre de jetons dépasse le budget d'un appel est découpé en blocs
+cohérents (définitions de premier niveau pour le Python, groupes de lignes sinon).
+"""
+
+import os
+import re
+import ast
+import logging
+from typing import List
+
+logger = logging.getLogger('llm_code_agent.tokens')
+
+# Budget de jetons par défaut du code envoyé dans un appel
+DEFAULT_MAX_TOKENS_PER_CALL = 60000
+
+_encoder = None
+_encoder_loaded = False
+
+_TRAILING_WHITESPACE_RE = re.compile(r'[ \t]+$', re.MULTILINE)
+_BLANK_LINES_RE = re.compile(r'\n{3,}')
+
+def _get_encoder():
+    """Retourne l'encodeur tiktoken partagé, chargé au premier appel (None si indisponible)."""
+    global _encoder, _encoder_loaded
+    if not _encoder_loaded:
+        try:
+            import tiktoken
+            _encoder = tiktoken.get_encoding("cl100k_base")
+        except ImportError:
+            logger.debug("tiktoken non installé, estimation approximative des jetons")
+        _encoder_loaded = True
+    return _encoder
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estime le nombre de jetons d'un texte.
+    Utilise tiktoken s'il est installé, sinon l'approximation d'un jeton pour quatre caractères.
+
+    Args:
+        text (str): Texte à évaluer
+
+    Returns:
+        int: Nombre de jetons estimé
+    """
+    encoder = _get_encoder()
+    if encoder is None:
+        return len(text) // 4 + 1
+    return len(encoder.encode(text, disallowed_special=()))
+
+def truncate_tokens(text: str, max_tokens: int) -> str:
+    """
+    Tronque un texte à un nombre de jetons: la taille du prompt ne dépend plus de la
+    langue (un caractère accentué ou non latin vaut souvent plusieurs jetons).
+    Sans tiktoken, le texte est tronqué à quatre caractères par jeton.
+    
+    Args:
+        text (str): Texte à tronquer
+        max_tokens (int): Nombre maximal de jetons
+        
+    Returns:
+        str: Texte tronqué
+    """
+    encoder = _get_encoder()
+    if encoder is None:
+        return text[:max_tokens * 4]
+    tokens = encoder.encode(text, disallowed_special=())
+    if len(tokens) <= max_tokens:
+        return text
+    # Un caractère coupé entre deux jetons est décodé en caractère de remplacement
+    return encoder.decode(tokens[:max_tokens]).rstrip('\ufffd')
+
+def compact_code(code_content: str) -> str:
+    """
+    Retire les espaces de fin de ligne et réduit les suites de lignes vides à une seule:
+    ces jetons sont facturés sans rien apporter à l'analyse.
+
+    Args:
+        code_content (str): Code source
+
+    Returns:
+        str: Code compacté
+    """
+    return _BLANK_LINES_RE.sub('\n\n', _TRAILING_WHITESPACE_RE.sub('', code_content))
+
+def _python_segments(code_content: str) -> List[str]:
+    """
+    Découpe un module Python en segments, un par instruction de premier niveau.
+    Chaque segment commence par les commentaires et décorateurs qui précèdent l'instruction.
+
+    Args:
+        code_content (str): Code source Python
+
+    Returns:
+        List[str]: Segments dont la concaténation redonne le code
+    """
+    lines = code_content.splitlines(keepends=True)
+    boundaries = []
+    for node in ast.parse(code_content).body[1:]:
+        # Début de l'instruction, décorateurs et commentaires immédiatement au-dessus compris
+        start = min([node.lineno] + [d.lineno for d in getattr(node, 'decorator_list', [])]) - 1
+        while start > 0 and lines[start - 1].lstrip().startswith('#'):
+            start -= 1
+        boundaries.append(start)
+
+    segments = []
+    previous = 0
+    for start in boundaries + [len(lines)]:
+        if start > previous:
+            segments.append(''.join(lines[previous:start]))
+            previous = start
+    return segments
+
+def _group_segments(segments: List[str], max_tokens: int) -> List[str]:
+    """
+    Regroupe des segments consécutifs en blocs ne dépassant pas le budget.
+    Un segment trop volumineux à lui seul est redécoupé par lignes.
+
+    Args:
+        segments (List[str]): Segments à regrouper
+        max_tokens (int): Budget de jetons par bloc
+
+    Returns:
+        List[str]: Blocs de code
+    """
+    chunks = []
+    current: List[str] = []
+    current_tokens = 0
+    for segment in segments:
+        tokens = estimate_tokens(segment)
+        if tokens > max_tokens and '\n' in segment.rstrip('\n'):
+            sub_segments = segment.splitlines(keepends=True)
+        else:
+            sub_segments = [segment]
+
+        for sub_segment in sub_segments:
+            tokens = estimate_tokens(sub_segment) if len(sub_segments) > 1 else tokens
+            if current and current_tokens + tokens > max_tokens:
+                chunks.append(''.join(current))
+                current, current_tokens = [], 0
+            current.append(sub_segment)
+            current_tokens += tokens
+
+    if current:
+        chunks.append(''.join(current))
+    return chunks
+
+def split_code(code_content: str, file_path: str, max_tokens: int = DEFAULT_MAX_TOKENS_PER_CALL) -> List[str]:
+    """
+    Découpe un fichier en blocs respectant le budget de jetons d'un appel.
+
+    Args:
+        code_content (str): Contenu du fichier
+        file_path (str): Chemin du fichier
+        max_tokens (int): Budget de jetons par bloc
+
+    Returns:
+        List[str]: Blocs de code (le fichier entier s'il tient dans le budget)
+    """
+    if estimate_tokens(code_content) <= max_tokens:
+        return [code_content]
+
+    segments = code_content.splitlines(keepends=True)
+    if os.path.splitext(file_path)[1] == '.py':
+        try:
+            segments = _python_segments(code_content)
+        except SyntaxError:
+            logger.debug("Analyse syntaxique impossible pour %s, découpage par lignes", file_path)
+
+    return _group_segments(segments, max_tokens) or [code_content]